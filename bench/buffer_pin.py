@@ -0,0 +1,62 @@
+"""BufferManager.pinのレイテンシを計測するマイクロベンチマーク
+
+使い方: python -m bench.buffer_pin
+"""
+
+import random
+import shutil
+import tempfile
+import time
+
+from db.buffer.buffer_manager import BufferManager
+from db.file.block_id import BlockID
+from db.file.file_manager import FileManager
+from db.log.log_manager import LogManager
+
+BLOCK_SIZE = 512
+POOL_SIZES = [100, 1_000, 10_000, 100_000]
+NUM_OPERATIONS = 20_000
+FILE_NAME = "bench.tbl"
+
+
+def measure_pin_latency(file_manager: FileManager, log_manager: LogManager, num_buffers: int) -> tuple[float, float]:
+    """プール内のブロック（ヒット）と新しいブロック（ミス）のpin+unpinの平均時間をマイクロ秒で返す"""
+    buffer_manager = BufferManager(file_manager, log_manager, num_buffers)
+
+    # プールをすべてのフレームが使われた状態にする
+    for block_number in range(num_buffers):
+        buffer_manager.unpin(buffer_manager.pin(BlockID(FILE_NAME, block_number)))
+
+    resident = [BlockID(FILE_NAME, random.randrange(num_buffers)) for _ in range(NUM_OPERATIONS)]
+    start = time.perf_counter()
+    for block in resident:
+        buffer_manager.unpin(buffer_manager.pin(block))
+    hit_latency = (time.perf_counter() - start) / NUM_OPERATIONS * 1_000_000
+
+    missing = [BlockID(FILE_NAME, num_buffers + i) for i in range(NUM_OPERATIONS)]
+    start = time.perf_counter()
+    for block in missing:
+        buffer_manager.unpin(buffer_manager.pin(block))
+    miss_latency = (time.perf_counter() - start) / NUM_OPERATIONS * 1_000_000
+
+    return hit_latency, miss_latency
+
+
+def main() -> None:
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_manager = FileManager(temp_dir, BLOCK_SIZE, defer_sync=True)
+        log_manager = LogManager(file_manager, "bench.log")
+
+        print(f"{'num_buffers':>12} {'hit (us)':>10} {'miss (us)':>10}")
+        for num_buffers in POOL_SIZES:
+            hit_latency, miss_latency = measure_pin_latency(file_manager, log_manager, num_buffers)
+            print(f"{num_buffers:>12} {hit_latency:>10.2f} {miss_latency:>10.2f}")
+
+        file_manager.close_all()
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
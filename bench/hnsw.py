@@ -0,0 +1,59 @@
+"""HNSWIndexの構築と検索のスループットを計測するベンチマーク
+
+使い方: python -m bench.hnsw [ベクトル数]
+"""
+
+import random
+import sys
+import time
+
+from db.index.hnsw.hnsw_index import HNSWIndex
+from db.query.vector import cosine_distance
+from db.record.record_id import RecordID
+
+NUM_VECTORS = 100_000
+DIMENSIONS = 32
+NUM_QUERIES = 200
+K = 10
+
+
+def random_vectors(rng: random.Random, count: int) -> list[list[float]]:
+    return [[rng.uniform(-1.0, 1.0) for _ in range(DIMENSIONS)] for _ in range(count)]
+
+
+def recall(index: HNSWIndex, vectors: list[list[float]], queries: list[list[float]]) -> float:
+    """線形探索の上位K件のうち、インデックスの検索で見つかった割合を返す"""
+    found = 0
+    for query in queries:
+        exact = sorted(range(len(vectors)), key=lambda i: cosine_distance(query, vectors[i]))[:K]
+        results = {record_id.slot for record_id in index.search(query, K)}
+        found += len(results.intersection(exact))
+    return found / (len(queries) * K)
+
+
+def main() -> None:
+    num_vectors = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_VECTORS
+    rng = random.Random(0)
+    random.seed(0)
+    vectors = random_vectors(rng, num_vectors)
+    queries = random_vectors(rng, NUM_QUERIES)
+
+    index = HNSWIndex()
+    start = time.perf_counter()
+    for i, vector in enumerate(vectors):
+        index.insert(vector, RecordID(0, i))
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, K)
+    query_seconds = time.perf_counter() - start
+
+    print(f"vectors: {num_vectors}, dimensions: {DIMENSIONS}")
+    print(f"build: {num_vectors / build_seconds:.1f} inserts/s ({build_seconds:.1f}s)")
+    print(f"query: {NUM_QUERIES / query_seconds:.1f} queries/s (k={K}, ef={index.ef_search})")
+    print(f"recall@{K}: {recall(index, vectors, queries[:20]):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import threading
+from typing import Optional
+
+from db.buffer.buffer_manager import BufferManager
+
+
+class BackgroundWriter:
+    """変更済みのバッファを定期的に書き出すスレッド
+
+    置き換え対象のバッファがすでに書き出されていれば、pinするスレッドは
+    ページの書き込みとfsyncを待たずにブロックを読み込める。
+    """
+
+    INTERVAL = 0.2
+    MAX_PAGES = 100
+
+    def __init__(self, buffer_manager: BufferManager, interval: float = INTERVAL, max_pages: int = MAX_PAGES) -> None:
+        self.buffer_manager = buffer_manager
+        self.interval = interval
+        self.max_pages = max_pages
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            raise RuntimeError("Background writer is already running")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="background-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """スレッドを止め、終了を待つ"""
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.buffer_manager.write_dirty_buffers(self.max_pages)
@@ -15,12 +15,15 @@ class Buffer:
         self.pins = 0
         self.transaction_number = -1
         self.log_sequence_number = -1
+        # set_modifiedの呼び出し回数。書き出し中に変更されたかどうかを調べるために使う
+        self.modification_count = 0
 
     def get_contents(self) -> Page:
         return self.contents
 
     def set_modified(self, transaction_number: int, log_sequence_number: int) -> None:
         self.transaction_number = transaction_number
+        self.modification_count += 1
         if log_sequence_number >= 0:
             self.log_sequence_number = log_sequence_number
 
@@ -33,7 +36,8 @@ class Buffer:
         self.log_sequence_number = -1
 
     def flush(self) -> None:
-        if self.block is None:
+        # 変更されていないページはディスクの内容と同じなので書き込まない
+        if self.block is None or not self.is_modified():
             return
 
         if self.log_sequence_number >= 0:
@@ -43,6 +47,11 @@ class Buffer:
 
         self.transaction_number = -1
 
+    def mark_written(self, modification_count: int) -> None:
+        """内容の写しを書き出した後、写しを取ってから変更されていなければ変更なしとする"""
+        if self.modification_count == modification_count:
+            self.transaction_number = -1
+
     def pin(self) -> None:
         self.pins += 1
 
@@ -57,3 +66,6 @@ class Buffer:
 
     def modifying_tx(self) -> int:
         return self.transaction_number
+
+    def is_modified(self) -> bool:
+        return self.transaction_number >= 0
@@ -3,8 +3,13 @@ from threading import Condition
 from typing import Optional
 
 from db.buffer.buffer import Buffer
+from db.buffer.buffer_ring import BufferRing
+from db.buffer.prefetcher import Prefetcher
+from db.buffer.replacement_policy import create_replacement_policy
+from db.constants import ReplacementPolicyType
 from db.file.block_id import BlockID
 from db.file.file_manager import FileManager
+from db.file.page import Page
 from db.log.log_manager import LogManager
 
 
@@ -14,21 +19,58 @@ class BufferAbortException(Exception):
 
 class BufferManager:
     MAX_TIME = 100
-
-    def __init__(self, file_manager: FileManager, log_manager: LogManager, num_buffers: int) -> None:
+    RING_SIZE = 16
+
+    def __init__(
+        self,
+        file_manager: FileManager,
+        log_manager: LogManager,
+        num_buffers: int,
+        replacement_policy: str = ReplacementPolicyType.LRU,
+        prefetch_blocks: int = 0,
+    ) -> None:
+        """バッファプールを管理するクラス
+
+        :param prefetch_blocks: 順次アクセスを検出したときに先読みするブロック数。0なら先読みしない
+        """
         self.file_manager = file_manager
         self.log_manager = log_manager
         self.buffer_pool = [Buffer(file_manager, log_manager) for _ in range(num_buffers)]
         self.num_available = num_buffers
         self.condition = Condition()
+        # ブロックからバッファへの対応表
+        self.buffer_map: dict[BlockID, Buffer] = {}
+        self.policy = create_replacement_policy(replacement_policy, self.buffer_pool)
+        self.num_hits = 0
+        self.num_misses = 0
+        self.prefetcher = Prefetcher(file_manager, prefetch_blocks) if prefetch_blocks > 0 else None
+        # write_dirty_buffersがロックの外で書き出しているバッファ
+        self.writing: set[Buffer] = set()
 
     def available(self) -> int:
         with self.condition:
             return self.num_available
 
+    def new_ring(self, num_blocks: int) -> Optional[BufferRing]:
+        """プールの1/4より大きいファイルを順に読むためのリングを返す。小さいファイルにはNoneを返す"""
+        num_buffers = len(self.buffer_pool)
+        if num_blocks <= num_buffers // 4:
+            return None
+        return BufferRing(max(1, min(self.RING_SIZE, num_buffers // 8)))
+
+    def hit_ratio(self) -> float:
+        """pinのうち、ブロックがすでにバッファにあった割合を返す"""
+        with self.condition:
+            total = self.num_hits + self.num_misses
+            return self.num_hits / total if total > 0 else 0.0
+
     def flush_all(self, tx_num: int) -> None:
         """指定されたトランザクションの全バッファをフラッシュ"""
         with self.condition:
+            # 書き出し中の古い写しが、この後の書き込みを上書きしないように待つ
+            while any(buffer.modifying_tx() == tx_num for buffer in self.writing):
+                self.condition.wait()
+
             # バッファのスナップショットを取得
             buffers_to_flush = []
             for buffer in self.buffer_pool:
@@ -40,22 +82,69 @@ class BufferManager:
             for buffer in buffers_to_flush:
                 buffer.flush()
 
+    def write_dirty_buffers(self, max_pages: int) -> int:
+        """pinされていない変更済みのバッファを最大max_pages個書き出し、書き出した数を返す
+
+        ロック中に対象を選んでpinし、内容の写しを取る。書き込みはロックの外で行うので、
+        その間も他のスレッドはpinできる。ログはページより先に永続化する
+        """
+        with self.condition:
+            writes: list[tuple[Buffer, BlockID, Page, int, int]] = []
+            for buffer in self.buffer_pool:
+                if len(writes) >= max_pages:
+                    break
+                if buffer.block is None or buffer.is_pinned() or not buffer.is_modified():
+                    continue
+
+                # pinされていないバッファは誰も変更していないので、写しは一貫している。
+                # pinして、書き出すまで別のブロックに置き換えられないようにする
+                buffer.pin()
+                self.num_available -= 1
+                self.writing.add(buffer)
+                contents = Page(bytes(buffer.contents.buffer))
+                writes.append((buffer, buffer.block, contents, buffer.log_sequence_number, buffer.modification_count))
+
+        for _, block, contents, lsn, _ in writes:
+            if lsn >= 0:
+                self.log_manager.flush(lsn)
+            self.file_manager.write(block, contents)
+
+        with self.condition:
+            for buffer, _, _, _, modification_count in writes:
+                self.writing.discard(buffer)
+                buffer.unpin()
+                # 他のスレッドがpinしていれば変更の途中かもしれないので、変更済みのままにする
+                if not buffer.is_pinned():
+                    buffer.mark_written(modification_count)
+                    self.num_available += 1
+            self.condition.notify_all()
+
+        return len(writes)
+
+    def close(self) -> None:
+        """先読みのスレッドを止め、終了を待つ。以降のミスでは先読みしない"""
+        if self.prefetcher is not None:
+            prefetcher = self.prefetcher
+            self.prefetcher = None
+            prefetcher.stop()
+
     def unpin(self, buffer: Buffer) -> None:
         with self.condition:
             buffer.unpin()
             if not buffer.is_pinned():
                 self.num_available += 1
+                self.policy.record_unpin(buffer)
                 self.condition.notify_all()
 
-    def pin(self, block: BlockID) -> Buffer:
+    def pin(self, block: BlockID, ring: Optional[BufferRing] = None) -> Buffer:
         with self.condition:
             time_stamp = time.time()
-            buffer = self._try_to_pin(block)
+            buffer = self._try_to_pin(block, ring)
 
             while buffer is None and not self._waiting_too_long(time_stamp):
                 try:
                     self.condition.wait(self.MAX_TIME)
-                    buffer = self._try_to_pin(block)
+                    buffer = self._try_to_pin(block, ring)
                 except KeyboardInterrupt:
                     raise BufferAbortException()
 
@@ -67,13 +156,26 @@ class BufferManager:
     def _waiting_too_long(self, time_stamp: float) -> bool:
         return time.time() - time_stamp >= self.MAX_TIME
 
-    def _try_to_pin(self, block: BlockID) -> Optional[Buffer]:
+    def _try_to_pin(self, block: BlockID, ring: Optional[BufferRing] = None) -> Optional[Buffer]:
         buffer = self._find_existing_buffer(block)
         if buffer is None:
-            buffer = self._choose_unpinned_buffer()
+            if ring is not None:
+                buffer = ring.next_reusable()
+            if buffer is None:
+                buffer = self._choose_unpinned_buffer()
             if buffer is None:
                 return None
-            buffer.assign_to_block(block)
+            if self.prefetcher is not None:
+                # リングを使うのは順次スキャンなので、最初のミスから先読みする
+                self.prefetcher.record_miss(block, sequential=ring is not None)
+            self._assign_block(buffer, block)
+            if ring is not None:
+                ring.remember(buffer, block)
+            self.num_misses += 1
+            self.policy.record_load(buffer)
+        else:
+            self.num_hits += 1
+            self.policy.record_hit(buffer)
 
         if not buffer.is_pinned():
             self.num_available -= 1
@@ -81,16 +183,18 @@ class BufferManager:
         buffer.pin()
         return buffer
 
+    def _assign_block(self, buffer: Buffer, block: BlockID) -> None:
+        """バッファをブロックに割り当て、対応表を更新する"""
+        if buffer.block is not None and self.buffer_map.get(buffer.block) is buffer:
+            del self.buffer_map[buffer.block]
+
+        buffer.assign_to_block(block)
+        self.buffer_map[block] = buffer
+
     def _find_existing_buffer(self, block: BlockID) -> Optional[Buffer]:
         """既存のバッファを検索"""
-        for buffer in self.buffer_pool:
-            buffer_block = buffer.block
-            if buffer_block is not None and buffer_block == block:
-                return buffer
-        return None
+        return self.buffer_map.get(block)
 
     def _choose_unpinned_buffer(self) -> Optional[Buffer]:
-        for buffer in self.buffer_pool:
-            if not buffer.is_pinned():
-                return buffer
-        return None
+        """置き換え方針に従ってpinされていないバッファを選ぶ"""
+        return self.policy.choose_victim()
@@ -0,0 +1,35 @@
+from collections import deque
+from typing import Optional
+
+from db.buffer.buffer import Buffer
+from db.file.block_id import BlockID
+
+
+class BufferRing:
+    """順次スキャンが使い回す少数のバッファ（PostgreSQLのバッファアクセス戦略に相当）
+
+    リングが埋まった後は、共有プールから新しいバッファを奪う代わりに
+    自分が前に読み込んだバッファを再利用するため、一度しか読まないブロックで
+    他のトランザクションのワーキングセットを追い出さない。
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries: deque[tuple[Buffer, BlockID]] = deque()
+
+    def next_reusable(self) -> Optional[Buffer]:
+        """再利用できるリング内のバッファを返す。リングが埋まっていなければNoneを返す"""
+        if len(self.entries) < self.size:
+            return None
+
+        buffer, block = self.entries.popleft()
+
+        # 他のスキャンに使われている、または別のブロックに置き換えられたバッファは再利用しない
+        if buffer.is_pinned() or buffer.block != block:
+            return None
+
+        return buffer
+
+    def remember(self, buffer: Buffer, block: BlockID) -> None:
+        """リング経由で読み込んだバッファを記録する"""
+        self.entries.append((buffer, block))
@@ -0,0 +1,66 @@
+import queue
+import threading
+from typing import Optional
+
+from db.file.block_id import BlockID
+from db.file.file_manager import FileManager
+
+
+class Prefetcher:
+    """順次アクセスされているファイルの後続ブロックを別スレッドで先読みする
+
+    先読みしたブロックはFileManagerが保持し、次のreadでディスクを読まずに返す。
+    """
+
+    def __init__(self, file_manager: FileManager, num_blocks: int) -> None:
+        self.file_manager = file_manager
+        self.num_blocks = num_blocks
+        # ファイルごとの、最後にミスしたブロック番号と先読みを依頼した最後のブロック番号
+        self._last_missed: dict[str, int] = {}
+        self._requested_until: dict[str, int] = {}
+        self._requests: queue.Queue[Optional[tuple[BlockID, int]]] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="prefetcher", daemon=True)
+        self._thread.start()
+
+    def record_miss(self, block: BlockID, sequential: bool = False) -> None:
+        """バッファプールにないブロックが読まれたことを記録し、順次アクセスなら先読みを依頼する
+
+        :param sequential: 呼び出し側が順次スキャンであることを知っている場合はTrue
+        """
+        file_name = block.file_name
+        number = block.number()
+        sequential = sequential or self._last_missed.get(file_name) == number - 1
+        self._last_missed[file_name] = number
+        if not sequential:
+            return
+
+        # 先読みした範囲の前半を読んでいる間は、次の範囲を依頼しない
+        requested_until = self._requested_until.get(file_name, -1)
+        if requested_until - self.num_blocks < number < requested_until - self.num_blocks // 2:
+            return
+
+        # スキャンをやり直した場合は、先読みした範囲に関係なく次のブロックから読む
+        start = max(number + 1, requested_until + 1) if number > requested_until - self.num_blocks else number + 1
+        end = number + self.num_blocks
+        if start > end:
+            return
+
+        self._requested_until[file_name] = end
+        self._requests.put((BlockID(file_name, start), end - start + 1))
+
+    def stop(self) -> None:
+        self._requests.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+
+            block, count = request
+            try:
+                self.file_manager.read_ahead(block, count)
+            except RuntimeError:
+                # 先読みは最適化にすぎないので、失敗しても通常のreadに任せる
+                pass
@@ -0,0 +1,171 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from db.buffer.buffer import Buffer
+from db.constants import ReplacementPolicyType
+from db.file.block_id import BlockID
+
+
+class ReplacementPolicy(ABC):
+    """置き換え対象のバッファを選ぶ方針"""
+
+    def __init__(self, buffers: list[Buffer]) -> None:
+        # まだ一度もブロックに割り当てられていないバッファ
+        self.free_buffers = list(reversed(buffers))
+
+    def choose_victim(self) -> Optional[Buffer]:
+        """置き換えるバッファを返す。未使用のバッファがあればそれを優先する"""
+        if self.free_buffers:
+            return self.free_buffers.pop()
+        return self._choose_victim()
+
+    @abstractmethod
+    def record_hit(self, buffer: Buffer) -> None:
+        """割り当て済みのブロックがpinされたことを記録する"""
+        pass
+
+    @abstractmethod
+    def record_load(self, buffer: Buffer) -> None:
+        """バッファに新しいブロックが読み込まれたことを記録する"""
+        pass
+
+    @abstractmethod
+    def record_unpin(self, buffer: Buffer) -> None:
+        """バッファのpinがすべて外れたことを記録する"""
+        pass
+
+    @abstractmethod
+    def _choose_victim(self) -> Optional[Buffer]:
+        pass
+
+
+class LRUPolicy(ReplacementPolicy):
+    """最も前にunpinされたバッファを置き換える"""
+
+    def __init__(self, buffers: list[Buffer]) -> None:
+        super().__init__(buffers)
+        self.unpinned_buffers: OrderedDict[Buffer, None] = OrderedDict()
+
+    def record_hit(self, buffer: Buffer) -> None:
+        self.unpinned_buffers.pop(buffer, None)
+
+    def record_load(self, buffer: Buffer) -> None:
+        self.unpinned_buffers.pop(buffer, None)
+
+    def record_unpin(self, buffer: Buffer) -> None:
+        self.unpinned_buffers[buffer] = None
+
+    def _choose_victim(self) -> Optional[Buffer]:
+        # バックグラウンドライタが書き出し中のバッファは、pinされたまま順番を保って残っている
+        for buffer in self.unpinned_buffers:
+            if not buffer.is_pinned():
+                del self.unpinned_buffers[buffer]
+                return buffer
+        return None
+
+
+class ClockPolicy(ReplacementPolicy):
+    """参照ビットを持つバッファを一周分見逃すClock方式"""
+
+    def __init__(self, buffers: list[Buffer]) -> None:
+        super().__init__(buffers)
+        self.buffers = buffers
+        self.positions = {buffer: position for position, buffer in enumerate(buffers)}
+        self.referenced = [False] * len(buffers)
+        self.hand = 0
+
+    def record_hit(self, buffer: Buffer) -> None:
+        self.referenced[self.positions[buffer]] = True
+
+    def record_load(self, buffer: Buffer) -> None:
+        self.referenced[self.positions[buffer]] = True
+
+    def record_unpin(self, buffer: Buffer) -> None:
+        pass
+
+    def _choose_victim(self) -> Optional[Buffer]:
+        # 参照ビットを落としながら最大二周する
+        for _ in range(2 * len(self.buffers)):
+            position = self.hand
+            self.hand = (self.hand + 1) % len(self.buffers)
+            buffer = self.buffers[position]
+
+            if buffer.is_pinned():
+                continue
+            if self.referenced[position]:
+                self.referenced[position] = False
+                continue
+            return buffer
+
+        return None
+
+
+class TwoQueuePolicy(ReplacementPolicy):
+    """2Q方式（Johnson & Shasha）
+
+    初めて読み込まれたブロックはFIFOのA1inに入り、A1inから追い出された後に
+    再び参照されたブロックだけがLRUのAmに入る。一度しか読まれない全件スキャンの
+    ブロックがAmのホットなブロックを追い出さない。
+    """
+
+    def __init__(self, buffers: list[Buffer]) -> None:
+        super().__init__(buffers)
+        self.max_a1in = max(1, len(buffers) // 4)
+        self.max_a1out = max(1, len(buffers) // 2)
+        self.a1in: OrderedDict[Buffer, None] = OrderedDict()
+        self.a1out: OrderedDict[BlockID, None] = OrderedDict()
+        self.am: OrderedDict[Buffer, None] = OrderedDict()
+
+    def record_hit(self, buffer: Buffer) -> None:
+        if buffer in self.am:
+            self.am.move_to_end(buffer)
+
+    def record_load(self, buffer: Buffer) -> None:
+        # リングで再利用されたバッファはキューに残っている
+        self.a1in.pop(buffer, None)
+        self.am.pop(buffer, None)
+
+        if buffer.block is not None and buffer.block in self.a1out:
+            del self.a1out[buffer.block]
+            self.am[buffer] = None
+        else:
+            self.a1in[buffer] = None
+
+    def record_unpin(self, buffer: Buffer) -> None:
+        pass
+
+    def _choose_victim(self) -> Optional[Buffer]:
+        if len(self.a1in) > self.max_a1in:
+            return self._take_from_a1in() or self._take_unpinned(self.am)
+        return self._take_unpinned(self.am) or self._take_from_a1in()
+
+    def _take_from_a1in(self) -> Optional[Buffer]:
+        """A1inから追い出し、そのブロックをA1outに記憶する"""
+        buffer = self._take_unpinned(self.a1in)
+        if buffer is not None and buffer.block is not None:
+            self.a1out[buffer.block] = None
+            if len(self.a1out) > self.max_a1out:
+                self.a1out.popitem(last=False)
+        return buffer
+
+    @staticmethod
+    def _take_unpinned(queue: OrderedDict[Buffer, None]) -> Optional[Buffer]:
+        """キューの先頭に最も近いpinされていないバッファを取り出す"""
+        for buffer in queue:
+            if not buffer.is_pinned():
+                del queue[buffer]
+                return buffer
+        return None
+
+
+def create_replacement_policy(policy_type: str, buffers: list[Buffer]) -> ReplacementPolicy:
+    """名前に対応する置き換え方針を作成する"""
+    if policy_type == ReplacementPolicyType.LRU:
+        return LRUPolicy(buffers)
+    elif policy_type == ReplacementPolicyType.Clock:
+        return ClockPolicy(buffers)
+    elif policy_type == ReplacementPolicyType.TwoQueue:
+        return TwoQueuePolicy(buffers)
+    else:
+        raise ValueError(f"Unknown replacement policy: {policy_type}")
@@ -2,6 +2,8 @@ class Format:
     IntBigEndian = ">i"
     IntLittleEndian = "<i"
     FloatLittleEndian = "<f"
+    # 次元数を埋めて使う
+    FloatsLittleEndian = "<{}f"
 
 
 class ByteSize:
@@ -64,3 +66,9 @@ class ListIndex:
 class Buffers:
     Reserved = 2
     Minimum = 1
+
+
+class ReplacementPolicyType:
+    LRU = "lru"
+    Clock = "clock"
+    TwoQueue = "2q"
@@ -1,7 +1,9 @@
+import mmap
 import os
 import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import BinaryIO, cast
+from typing import BinaryIO, Optional, cast
 
 from db.constants import FileMode
 from db.file.block_id import BlockID
@@ -9,16 +11,49 @@ from db.file.page import Page
 
 
 class FileManager:
-    def __init__(self, db_directory: str | Path, block_size: int):
-        """ファイルを管理するクラス"""
+    # 先読みしたブロックを保持する最大数
+    MAX_READ_AHEAD_BLOCKS = 256
+    # 一度に確保するエクステントのブロック数の範囲
+    MIN_EXTENT_BLOCKS = 64
+    MAX_EXTENT_BLOCKS = 1024
+
+    def __init__(
+        self,
+        db_directory: str | Path,
+        block_size: int,
+        defer_sync: bool = False,
+        use_mmap: bool = False,
+        preallocate: bool = False,
+    ):
+        """ファイルを管理するクラス
+
+        :param defer_sync: Trueの場合、書き込みごとのfsyncを行わず、sync/sync_allの呼び出しまで遅延する
+        :param use_mmap: Trueの場合、readはファイルのメモリマップからコピーし、seekとロックを使わない
+        :param preallocate: Trueの場合、appendはまとめて確保したエクステントからブロックを割り当てる
+        """
         self.db_directory: Path = Path(db_directory)
         self.block_size: int = block_size
         self.is_new: bool = not self.db_directory.exists() or not any(self.db_directory.iterdir())
         self.open_files: dict[str, BinaryIO] = {}
+        self.defer_sync = defer_sync
+        self._unsynced_files: set[str] = set()
+        # 先読みしたがまだreadされていないブロックの内容
+        self._read_ahead_pages: OrderedDict[BlockID, bytes] = OrderedDict()
+        self.read_ahead_hits = 0
+        self.use_mmap = use_mmap
+        self._mapped_files: dict[str, mmap.mmap] = {}
 
-        # スレッドセーフなロックを使用
+        # ファイル単位のブロック数と、先読みとの競合を検出するための書き込み回数
+        self._file_lengths: dict[str, int] = {}
+        self._write_generations: dict[str, int] = {}
+        # 確保済みのブロック数。ブロック数を超える分が、まだappendされていない空きエクステント
+        self.preallocate = preallocate
+        self._allocated_blocks: dict[str, int] = {}
+        # ファイルごとのエクステント確保のロック。確保とfsyncの間、他のファイルの操作を止めない
+        self._extent_locks: dict[str, threading.Lock] = {}
+
+        # 開いたファイルと上記の状態を守るロック。読み書き自体はロックの外で行う
         self._lock = threading.RLock()
-        self._file_locks: dict[str, threading.RLock] = {}
 
         if self.is_new:
             self.db_directory.mkdir(parents=True, exist_ok=True)
@@ -29,35 +64,117 @@ class FileManager:
                 file.unlink()
 
     def read(self, block_id: BlockID, page: Page) -> None:
-        """ブロックIDに対応するファイルからデータを読み込む"""
+        """ブロックIDに対応するファイルからデータを読み込む
+
+        位置指定の読み込みを使うので、同じファイルを読む複数のスレッドは互いを待たない
+        """
         if not block_id.file_name:
             raise ValueError("File name cannot be empty")
 
         if block_id.number() < 0:
             raise ValueError(f"Invalid block number: {block_id.number()}")
 
-        with self._get_file_lock(block_id.file_name):
-            try:
-                f = self._get_file(block_id.file_name)
-                f.seek(block_id.number() * self.block_size)
-                data = f.read(self.block_size)
-                page.buffer[: len(data)] = data
+        with self._lock:
+            prefetched = self._read_ahead_pages.pop(block_id, None)
+            if prefetched is not None:
+                self.read_ahead_hits += 1
+        if prefetched is not None:
+            page.buffer[:] = prefetched
+            return
+
+        if self.use_mmap and self._read_mapped(block_id, page):
+            return
+
+        try:
+            fd = self._get_file(block_id.file_name).fileno()
+            os.preadv(fd, [page.buffer], block_id.number() * self.block_size)
+
+        except (OSError, IOError) as e:
+            raise RuntimeError(f"Cannot read block {block_id} from file: {e}")
+        except PermissionError as e:
+            raise RuntimeError(f"Permission denied reading block {block_id}: {e}")
+        except ValueError as e:
+            raise RuntimeError(f"Invalid block or buffer for {block_id}: {e}")
+
+    def _read_mapped(self, block_id: BlockID, page: Page) -> bool:
+        """メモリマップからブロックをコピーする。ブロックがファイルの末尾を超える場合はFalseを返す"""
+        offset = block_id.number() * self.block_size
+        end = offset + self.block_size
+
+        try:
+            mapped = self._mapped_files.get(block_id.file_name)
+            if mapped is None or end > len(mapped):
+                # appendでファイルが伸びたので、マップを作り直す
+                mapped = self._map_file(block_id.file_name)
+                if mapped is None or end > len(mapped):
+                    return False
+
+            page.buffer[:] = mapped[offset:end]
+            return True
+
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"Cannot read block {block_id} from mapped file: {e}")
+
+    def _map_file(self, file_name: str) -> Optional[mmap.mmap]:
+        """ファイル全体を読み取り専用でメモリマップする。空のファイルはマップできないのでNoneを返す
+
+        古いマップは閉じない。他のスレッドがコピー中の場合があり、参照がなくなれば解放される
+        """
+        with self._lock:
+            f = self._get_file(file_name)
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return None
+
+            mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self._mapped_files[file_name] = mapped
+            return mapped
+
+    def read_ahead(self, block_id: BlockID, count: int) -> int:
+        """block_idから連続するcount個のブロックを一度の読み込みで取得し、次のreadのために保持する
+
+        ファイルの末尾を超える分は読まない。読み込んだブロック数を返す
+        """
+        file_name = block_id.file_name
+        try:
+            fd = self._get_file(file_name).fileno()
+            with self._lock:
+                generation = self._write_generations.get(file_name, 0)
+            data = os.pread(fd, count * self.block_size, block_id.number() * self.block_size)
+        except (OSError, IOError) as e:
+            raise RuntimeError(f"Cannot read ahead from block {block_id}: {e}")
+
+        num_blocks = len(data) // self.block_size
+        with self._lock:
+            # 読んでいる間に書き込まれたブロックがあれば、古い内容かもしれないので捨てる
+            if self._write_generations.get(file_name, 0) != generation:
+                return 0
+
+            for i in range(num_blocks):
+                block = BlockID(file_name, block_id.number() + i)
+                self._read_ahead_pages[block] = data[i * self.block_size : (i + 1) * self.block_size]
+                self._read_ahead_pages.move_to_end(block)
+            while len(self._read_ahead_pages) > self.MAX_READ_AHEAD_BLOCKS:
+                self._read_ahead_pages.popitem(last=False)
 
-            except (OSError, IOError) as e:
-                raise RuntimeError(f"Cannot read block {block_id} from file: {e}")
-            except PermissionError as e:
-                raise RuntimeError(f"Permission denied reading block {block_id}: {e}")
-            except ValueError as e:
-                raise RuntimeError(f"Invalid block or buffer for {block_id}: {e}")
+        return num_blocks
 
     def write(self, block: BlockID, page: Page) -> None:
         """ブロックIDに対応するファイルにデータを書き込む"""
         try:
-            f = self._get_file(block.file_name)
-            f.seek(block.block_number * self.block_size)
-            f.write(page.buffer)
-            f.flush()
-            os.fsync(f.fileno())  # 確実にディスクに書き込み
+            fd = self._get_file(block.file_name).fileno()
+            os.pwrite(fd, page.buffer, block.block_number * self.block_size)
+
+            with self._lock:
+                self._read_ahead_pages.pop(block, None)
+                self._write_generations[block.file_name] = self._write_generations.get(block.file_name, 0) + 1
+                # ファイルの末尾を超えて書き込んだ場合はファイルが伸びる
+                if block.block_number >= self._file_lengths[block.file_name]:
+                    self._file_lengths[block.file_name] = block.block_number + 1
+                if block.block_number >= self._allocated_blocks[block.file_name]:
+                    self._allocated_blocks[block.file_name] = block.block_number + 1
+
+            self._flush_file(block.file_name, fd)
 
         except (OSError, IOError) as e:
             raise RuntimeError(f"Cannot write block {block} to file: {e}")
@@ -67,18 +184,28 @@ class FileManager:
             raise RuntimeError(f"Invalid block or page data for {block}: {e}")
 
     def append(self, file_name: str) -> BlockID:
-        """ファイルに新しいブロックを追加して、そのブロックIDを返す"""
+        """ファイルに新しいブロックを追加して、そのブロックIDを返す
+
+        ブロック番号はロックの中で確保するので、同時にappendしても同じブロックを返さない
+        """
         try:
-            new_block_number = self.length(file_name)
-            block = BlockID(file_name, new_block_number)
+            fd = self._get_file(file_name).fileno()
+            with self._lock:
+                block = BlockID(file_name, self._file_lengths[file_name])
+                self._file_lengths[file_name] += 1
 
-            f = self._get_file(file_name)
-            f.seek(block.block_number * self.block_size)
+            # 最初のブロックは通常どおり追加する。ログファイルのように一度しかappendしないファイルを伸ばさない
+            if self.preallocate and block.block_number > 0:
+                with self._extent_locks[file_name]:
+                    with self._lock:
+                        allocated = self._allocated_blocks[file_name]
+                    if block.block_number >= allocated:
+                        self._allocate_extent(file_name, fd, block.block_number)
+                # 確保済みの領域は0で埋まっているので、書き込みもfsyncも不要
+                return block
 
-            empty_data = b"\x00" * self.block_size
-            f.write(empty_data)
-            f.flush()
-            os.fsync(f.fileno())  # 確実にディスクに書き込み
+            os.pwrite(fd, bytes(self.block_size), block.block_number * self.block_size)
+            self._flush_file(file_name, fd)
             return block
 
         except (OSError, IOError) as e:
@@ -88,47 +215,103 @@ class FileManager:
         except ValueError as e:
             raise RuntimeError(f"Invalid file name or block data: {file_name}: {e}")
 
+    def _allocate_extent(self, file_name: str, fd: int, start: int) -> None:
+        """startから始まるエクステントを確保する。大きなファイルほど大きく確保する
+
+        ファイルのエクステント確保のロックを持って呼ぶ。全体のロックは状態の更新にだけ使う
+        """
+        num_blocks = min(self.MAX_EXTENT_BLOCKS, max(self.MIN_EXTENT_BLOCKS, start))
+        offset = start * self.block_size
+        size = num_blocks * self.block_size
+
+        try:
+            os.posix_fallocate(fd, offset, size)
+        except (AttributeError, OSError):
+            # posix_fallocateがないプラットフォームや、対応していないファイルシステムでは疎なファイルとして伸ばす
+            os.ftruncate(fd, offset + size)
+
+        with self._lock:
+            self._allocated_blocks[file_name] = max(self._allocated_blocks[file_name], start + num_blocks)
+        self._flush_file(file_name, fd)
+
     def length(self, file_name: str) -> int:
-        """ファイルのブロック数を返す"""
+        """ファイルのブロック数を返す。ファイルを開いたときに数え、以降はappendとwriteで更新した値を返す"""
         try:
-            f = self._get_file(file_name)
-            f.seek(0, os.SEEK_END)
-            file_size = f.tell()
-            return file_size // self.block_size
+            self._get_file(file_name)
+            return self._file_lengths[file_name]
         except (OSError, IOError) as e:
             raise RuntimeError(f"Cannot get length of file {file_name}: {e}")
         except PermissionError as e:
             raise RuntimeError(f"Permission denied accessing file {file_name}: {e}")
 
-    def _get_file(self, file_name: str) -> BinaryIO:
-        """ファイルを取得する"""
+    def sync(self, file_name: str) -> None:
+        """遅延しているファイルの書き込みをディスクに反映する"""
+        with self._lock:
+            if file_name not in self._unsynced_files:
+                return
+            self._unsynced_files.discard(file_name)
 
-        if file_name in self.open_files:
-            return self.open_files[file_name]
+        try:
+            os.fsync(self._get_file(file_name).fileno())
+        except (OSError, IOError) as e:
+            raise RuntimeError(f"Cannot sync file {file_name}: {e}")
 
-        file_path = self.db_directory / file_name
+    def sync_all(self) -> None:
+        """遅延しているすべてのファイルの書き込みをディスクに反映する"""
+        with self._lock:
+            file_names = list(self._unsynced_files)
 
-        if file_name not in self.open_files:
-            mode = FileMode.ReadWrite if file_path.exists() else FileMode.WriteNew
+        for file_name in file_names:
+            self.sync(file_name)
 
-            self.open_files[file_name] = cast(BinaryIO, open(file_path, mode))
+    def _flush_file(self, file_name: str, fd: int) -> None:
+        """遅延モードでなければfsyncする"""
+        if self.defer_sync:
+            with self._lock:
+                self._unsynced_files.add(file_name)
+        else:
+            os.fsync(fd)  # 確実にディスクに書き込み
 
-        return self.open_files[file_name]
+    def _get_file(self, file_name: str) -> BinaryIO:
+        """ファイルを取得する。読み書きはファイル位置を使わないため、バッファリングせずに開く"""
+        f = self.open_files.get(file_name)
+        if f is not None:
+            return f
+
+        with self._lock:
+            if file_name not in self.open_files:
+                file_path = self.db_directory / file_name
+                mode = FileMode.ReadWrite if file_path.exists() else FileMode.WriteNew
+                f = cast(BinaryIO, open(file_path, mode, buffering=0))
+                self._file_lengths[file_name] = os.fstat(f.fileno()).st_size // self.block_size
+                self._allocated_blocks[file_name] = self._file_lengths[file_name]
+                self._extent_locks[file_name] = threading.Lock()
+                self.open_files[file_name] = f
+
+            return self.open_files[file_name]
 
     def close_all(self) -> None:
         """すべてのファイルを閉じるリソース管理メソッド"""
         with self._lock:
+            # ファイルを切り詰める前にマップを閉じる
+            for mapped in self._mapped_files.values():
+                mapped.close()
+            self._mapped_files.clear()
+
             for file_name, file_obj in self.open_files.items():
                 try:
+                    # 使われなかったエクステントを切り詰め、次に開いたときのブロック数を正しくする
+                    if self._allocated_blocks.get(file_name, 0) > self._file_lengths.get(file_name, 0):
+                        os.ftruncate(file_obj.fileno(), self._file_lengths[file_name] * self.block_size)
+                        self._unsynced_files.add(file_name)
+                    if file_name in self._unsynced_files:
+                        os.fsync(file_obj.fileno())
                     file_obj.close()
                 except Exception:
                     pass  # ファイルクローズエラーを無視
             self.open_files.clear()
-            self._file_locks.clear()
-
-    def _get_file_lock(self, file_name: str) -> threading.RLock:
-        """ファイル単位のロックを取得"""
-        with self._lock:
-            if file_name not in self._file_locks:
-                self._file_locks[file_name] = threading.RLock()
-            return self._file_locks[file_name]
+            self._file_lengths.clear()
+            self._allocated_blocks.clear()
+            self._extent_locks.clear()
+            self._unsynced_files.clear()
+            self._read_ahead_pages.clear()
@@ -1,5 +1,6 @@
 import codecs
 import struct
+from functools import lru_cache
 from typing import Optional
 
 from db.constants import ByteSize, Format
@@ -8,8 +9,10 @@ from db.constants import ByteSize, Format
 class Page:
 
     CHARSET = "ascii"
+    INT = struct.Struct(Format.IntLittleEndian)
 
     def __init__(self, block_size: int | bytes | bytearray):
+        self.buffer: bytearray | memoryview
         if isinstance(block_size, int):
             self.buffer = bytearray(block_size)
         elif isinstance(block_size, (bytes, bytearray)):
@@ -18,16 +21,23 @@ class Page:
 
             raise TypeError("block_size must be an int, bytes, or bytearray")
 
+    @classmethod
+    def wrap(cls, buffer: bytearray | memoryview) -> "Page":
+        """既存のバッファをコピーせずにページとして扱う。読み取り専用のmemoryviewも渡せる"""
+        page = cls.__new__(cls)
+        page.buffer = buffer
+        return page
+
     def get_int(self, offset: int) -> int:
         """指定されたオフセットから4バイトの整数を取得"""
 
-        result: int = struct.unpack_from(Format.IntLittleEndian, self.buffer, offset)[0]
+        result: int = self.INT.unpack_from(self.buffer, offset)[0]
 
         return result
 
     def set_int(self, offset: int, value: int) -> None:
         """指定されたオフセットに4バイトの整数を書き込む"""
-        struct.pack_into(Format.IntLittleEndian, self.buffer, offset, value)
+        self.INT.pack_into(self.buffer, offset, value)
 
     def get_bytes(self, offset: int) -> bytes:
         """指定されたオフセットからバイト列を取得"""
@@ -36,6 +46,12 @@ class Page:
         end = start + length
         return bytes(self.buffer[start:end])
 
+    def get_bytes_view(self, offset: int) -> memoryview:
+        """指定されたオフセットのバイト列をコピーせずに返す。ページの内容が変わると見える値も変わる"""
+        length = self.get_int(offset)
+        start = offset + ByteSize.Int
+        return memoryview(self.buffer)[start : start + length]
+
     def set_bytes(self, offset: int, byte_data: bytes) -> None:
         """指定されたオフセットにバイト列を書き込む"""
         self.set_int(offset, len(byte_data))
@@ -44,8 +60,7 @@ class Page:
 
     def get_string(self, offset: int) -> str:
         """指定されたオフセットから文字列を取得"""
-        byte_string = self.get_bytes(offset)
-        return byte_string.decode(self.CHARSET)
+        return str(self.get_bytes_view(offset), self.CHARSET)
 
     def set_string(self, offset: int, value: str, max_length: Optional[int] = None) -> None:
         """指定されたオフセットに文字列を書き込む"""
@@ -58,25 +73,31 @@ class Page:
 
     def get_vector(self, offset: int, dimensions: int) -> list[float]:
         """指定されたオフセットからfloat配列を取得"""
-        return [
-            struct.unpack_from(Format.FloatLittleEndian, self.buffer, offset + i * ByteSize.Float)[0]
-            for i in range(dimensions)
-        ]
+        return list(self.vector_struct(dimensions).unpack_from(self.buffer, offset))
 
     def set_vector(self, offset: int, vector: list[float]) -> None:
         """指定されたオフセットにfloat配列を書き込む"""
-        for i, value in enumerate(vector):
-            struct.pack_into(Format.FloatLittleEndian, self.buffer, offset + i * ByteSize.Float, value)
+        self.vector_struct(len(vector)).pack_into(self.buffer, offset, *vector)
 
     def get_contents(self) -> bytes:
         """バッファ全体を含むバイト列を取得"""
         return bytes(self.buffer)
 
+    def view(self) -> memoryview:
+        """バッファ全体をコピーせずに返す"""
+        return memoryview(self.buffer)
+
     @staticmethod
     def get_max_length(string_length: int) -> int:
         bytes_per_char = len(codecs.lookup(Page.CHARSET).incrementalencoder().encode("a"))
         return ByteSize.Int + (string_length * bytes_per_char)
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def vector_struct(dimensions: int) -> struct.Struct:
+        """指定した次元数のfloat配列を一度に読み書きするStructを返す"""
+        return struct.Struct(Format.FloatsLittleEndian.format(dimensions))
+
     @staticmethod
     def get_vector_length(dimensions: int) -> int:
         return dimensions * ByteSize.Float
@@ -1,5 +1,6 @@
 from db.constants import ByteSize, FieldType
 from db.file.block_id import BlockID
+from db.file.page import Page
 from db.query.constant import Constant
 from db.record.layout import Layout
 from db.record.record_id import RecordID
@@ -14,10 +15,26 @@ class BtreePage:
         self.transaction.pin(current_block)
 
     def find_slot_before(self, search_key: Constant) -> int:
+        """search_keyより小さいキーを持つ最後のスロットを返す
+
+        ページをコピーせずに読み、文字列のキーはデコードせずにバイト列のまま比較する
+        """
+        page = Page.wrap(self.transaction.view_block(self.current_block))
+        num_records = page.get_int(ByteSize.Int)
+        position = self.get_field_position(0, "data_value")
+        slot_size = self.layout.get_slot_size()
         slot = 0
 
-        while slot < self.get_num_records() and self.get_data_value(slot) < search_key:
-            slot += 1
+        if self.layout.get_schema().get_type("data_value") == FieldType.Integer:
+            int_key = search_key.as_int()
+            while slot < num_records and page.get_int(position + slot * slot_size) < int_key:
+                slot += 1
+        else:
+            if search_key.is_int():
+                raise TypeError("Cannot compare Constants of mismatched types")
+            bytes_key = search_key.as_string().encode(Page.CHARSET)
+            while slot < num_records and page.get_bytes(position + slot * slot_size) < bytes_key:
+                slot += 1
 
         return slot - 1
 
@@ -142,23 +159,18 @@ class BtreePage:
         return block
 
     def format(self, block: BlockID, flag: int) -> None:
-        self.transaction.set_int(block, 0, flag, False)
-        self.transaction.set_int(block, ByteSize.Int, 0, False)
+        """ヘッダと空のレコードを並べたページを作り、まとめて書き込む"""
+        page = Page(self.transaction.block_size())
+        page.set_int(0, flag)
+        page.set_int(ByteSize.Int, 0)
+
         record_size = self.layout.get_slot_size()
         header_size = ByteSize.Int * 2
-        last_valid_position = self.transaction.block_size() - record_size + 1
-
-        for position in range(header_size, last_valid_position, record_size):
-            self.make_default_record(block, position)
-
-    def make_default_record(self, block: BlockID, position: int) -> None:
-        for field_name in self.layout.schema.get_fields():
-            offset = self.layout.get_offset(field_name)
+        num_records = (self.transaction.block_size() - header_size) // record_size
+        records_end = header_size + num_records * record_size
+        page.buffer[header_size:records_end] = self.layout.empty_slot() * num_records
 
-            if self.layout.schema.get_type(field_name) == FieldType.Integer:
-                self.transaction.set_int(block, position + offset, 0, False)
-            else:
-                self.transaction.set_string(block, position + offset, "", False)
+        self.transaction.initialize_block(block, page.buffer)
 
     def get_child_number(self, slot: int) -> int:
         return self.get_int(slot, "block")
@@ -1,22 +1,32 @@
+import heapq
 import math
 import random
+from typing import Optional
 
 from db.index.vector_index import VectorIndex
-from db.query.vector import Vector, cosine_distance
+from db.query.vector import Vector
+from db.query.vector_store import VectorStore, cosine_distances, create_vector_store
 from db.record.record_id import RecordID
 
 type Neighbors = list[HNSWNode]
 type MultiLayerNeighbors = dict[int, Neighbors]
 type NodeWithDistance = tuple[float, HNSWNode]
+type HeapEntry = tuple[float, int, HNSWNode]
+# 近傍リストが変わったノードとレイヤー
+type NeighborChange = tuple[HNSWNode, int]
 
 
 BASE_LAYER = 0
 
 
 class HNSWNode:
-    def __init__(self, vector: Vector, record_id: RecordID):
+    def __init__(self, vector: Vector, record_id: RecordID, node_id: int):
+        if node_id < 0:
+            raise ValueError(f"Invalid node id {node_id}")
         self.vector = vector
         self.record_id = record_id
+        # インデックス内での挿入順の番号。探索の訪問済み集合とディスク上の近傍リストはこの番号でノードを区別する
+        self.node_id = node_id
         self.neighbors: MultiLayerNeighbors = {}
 
     def get_neighbors(self, layer: int) -> Neighbors:
@@ -26,38 +36,60 @@ class HNSWNode:
         self.neighbors[layer] = neighbors
 
 
+def node_distances(query: Vector, nodes: Neighbors, vectors: Optional[VectorStore]) -> list[float]:
+    """queryと各ノードのコサイン距離をまとめて計算する。vectorsがあればノード番号の行のベクトルを使う"""
+    if vectors is not None:
+        return vectors.distances(query, [node.node_id for node in nodes])
+    return cosine_distances(query, [node.vector for node in nodes])
+
+
 class SearchState:
-    def __init__(self, entry_points: Neighbors, query: Vector) -> None:
-        self.visited: set[int] = {id(ep) for ep in entry_points}
-        self.candidates: list[NodeWithDistance] = []
-        self.nearest_set: list[NodeWithDistance] = []
+    """1つのレイヤーの探索状態
+
+    候補は距離の小さい順に取り出す最小ヒープ、結果は最も遠いノードを先頭に置く大きさef以下の最大ヒープで持つ。
+    ヒープの要素は(距離, ノード番号, ノード)で、距離が等しいときはノード番号で比べる
+    """
+
+    def __init__(self, entry_points: Neighbors, query: Vector, vectors: Optional[VectorStore] = None) -> None:
+        """vectorsを渡すと、ノード番号を行番号としてベクトルの距離をまとめて計算する"""
+        self.vectors = vectors
+        self.visited: set[int] = {ep.node_id for ep in entry_points}
+        self.candidates: list[HeapEntry] = []
+        # 距離の符号を反転して最大ヒープにする
+        self.nearest_set: list[HeapEntry] = []
 
-        for ep in entry_points:
-            dist = cosine_distance(query, ep.vector)
-            self.candidates.append((dist, ep))
-            self.nearest_set.append((dist, ep))
+        for ep, dist in zip(entry_points, node_distances(query, entry_points, vectors)):
+            self.candidates.append((dist, ep.node_id, ep))
+            self.nearest_set.append((-dist, ep.node_id, ep))
 
-        self.candidates.sort(key=lambda x: x[0])
-        self.nearest_set.sort(key=lambda x: x[0])
+        heapq.heapify(self.candidates)
+        heapq.heapify(self.nearest_set)
 
     @classmethod
-    def greedy_descend(cls, query: Vector, ep: Neighbors, from_layer: int, to_layer: int) -> Neighbors:
+    def greedy_descend(
+        cls, query: Vector, ep: Neighbors, from_layer: int, to_layer: int, vectors: Optional[VectorStore] = None
+    ) -> Neighbors:
         for layer in range(from_layer, to_layer, -1):
-            state = cls(ep, query)
+            state = cls(ep, query, vectors)
             nearest_set = state.search_layer(query, ef=1, layer=layer)
             ep = [nearest_set[0][1]]
         return ep
 
     def search_layer(self, query: Vector, ef: int, layer: int) -> list[NodeWithDistance]:
+        """近い順に最大ef個のノードと距離を返す"""
+        while len(self.nearest_set) > ef:
+            heapq.heappop(self.nearest_set)
+
         while self.candidates:
-            current_dist, current_node = self.candidates.pop(0)
+            current_dist, _, current_node = heapq.heappop(self.candidates)
 
-            if self.nearest_set and current_dist > self.nearest_set[-1][0]:
+            if self.nearest_set and current_dist > -self.nearest_set[0][0]:
                 break
 
             self.update(current_node, query, ef, layer)
 
-        return self.nearest_set
+        nearest = sorted(self.nearest_set, key=lambda x: (-x[0], x[1]))
+        return [(-dist, node) for dist, _, node in nearest]
 
     def update(
         self,
@@ -66,34 +98,33 @@ class SearchState:
         ef: int,
         layer: int,
     ) -> None:
-        for neighbor in current_node.get_neighbors(layer):
-            if id(neighbor) in self.visited:
-                continue
-
-            self.visited.add(id(neighbor))
-            dist = cosine_distance(query, neighbor.vector)
-            worst_dist = self.nearest_set[-1][0] if self.nearest_set else float("inf")
-
-            if dist < worst_dist or len(self.nearest_set) < ef:
-                self.candidates.append((dist, neighbor))
-                self.candidates.sort(key=lambda x: x[0])
-                self.nearest_set.append((dist, neighbor))
-                self.nearest_set.sort(key=lambda x: x[0])
+        neighbors = [neighbor for neighbor in current_node.get_neighbors(layer) if neighbor.node_id not in self.visited]
+        self.visited.update(neighbor.node_id for neighbor in neighbors)
+
+        # 未訪問の近傍との距離は1回の呼び出しでまとめて計算する
+        for neighbor, dist in zip(neighbors, node_distances(query, neighbors, self.vectors)):
+            if len(self.nearest_set) < ef or dist < -self.nearest_set[0][0]:
+                heapq.heappush(self.candidates, (dist, neighbor.node_id, neighbor))
+                heapq.heappush(self.nearest_set, (-dist, neighbor.node_id, neighbor))
                 if len(self.nearest_set) > ef:
-                    self.nearest_set.pop()
+                    heapq.heappop(self.nearest_set)
 
 
 class HNSWIndex(VectorIndex):
 
-    def __init__(self, max_node_conn: int = 16, ef_construction: int = 200) -> None:
+    def __init__(self, max_node_conn: int = 16, ef_construction: int = 200, ef_search: Optional[int] = None) -> None:
 
         self.nodes: Neighbors = []
         self.max_layer: int = BASE_LAYER
         self.max_node_conn = max_node_conn
         self.base_layer_max_conn = max_node_conn * 2
         self.ef_construction = ef_construction
+        # 検索時の候補数の下限。kがこれより大きければkまで広げる
+        self.ef_search = ef_construction if ef_search is None else ef_search
         self.layer_decay = 1.0 / math.log(max_node_conn)
         self.entry_point: HNSWNode | None = None
+        # ノード番号を行番号とするベクトル。最初のノードを追加したときに次元数から作る
+        self.vectors: Optional[VectorStore] = None
 
     def _random_level(self) -> int:
         """
@@ -109,47 +140,75 @@ class HNSWIndex(VectorIndex):
         return int(-1 * math.log(random.random()) * self.layer_decay)
 
     def insert(self, vector: Vector, record_id: RecordID) -> None:
-        # ベクトルをHNSWインデックスに挿入するロジックをここに追加します
-        new_node = HNSWNode(vector, record_id)
+        self.add(vector, record_id)
+
+    def add(self, vector: Vector, record_id: RecordID) -> list[NeighborChange]:
+        """ベクトルを挿入し、近傍リストが変わったノードとレイヤーの組を返す"""
+        new_node = HNSWNode(vector, record_id, len(self.nodes))
+        self._store_vector(new_node)
         top_level = self._random_level()
 
         # 各レイヤーの最初のノードを作成する
         if self.entry_point is None:
             self._insert_first_node_to_all_layers(new_node, top_level)
-            return
+            return [(new_node, layer) for layer in range(top_level + 1)]
 
         entry_point = [self.entry_point]
         max_layer = self.max_layer
 
         # 新ノードが存在しない上位レイヤーをgreedy降下してエントリポイントを絞り込む
-        ep = SearchState.greedy_descend(vector, entry_point, max_layer, top_level)
+        ep = SearchState.greedy_descend(vector, entry_point, max_layer, top_level, self.vectors)
 
+        changes: list[NeighborChange] = []
         for layer in range(min(max_layer, top_level), -1, -1):
-            state = SearchState(ep, vector)
+            state = SearchState(ep, vector, self.vectors)
             nearest_set = state.search_layer(vector, ef=self.ef_construction, layer=layer)
             current_layer_max_conn = self.base_layer_max_conn if layer == BASE_LAYER else self.max_node_conn
             neighbors = self._select_neighbors(nearest_set, current_layer_max_conn)
 
             self._link_both_neighbors(new_node, neighbors, layer, current_layer_max_conn)
+            changes.append((new_node, layer))
+            changes.extend((neighbor, layer) for neighbor in neighbors)
 
             ep = [w[1] for w in nearest_set]
 
+        # 上位レイヤーでは新ノードだけが存在する
+        for layer in range(max_layer + 1, top_level + 1):
+            new_node.set_neighbors(layer, [])
+            changes.append((new_node, layer))
         self.nodes.append(new_node)
         self._update_entry_point(new_node, top_level)
+        return changes
 
     def _link_both_neighbors(self, new_node: HNSWNode, neighbors: Neighbors, layer: int, max_conn: int) -> None:
+        new_node.set_neighbors(layer, list(neighbors))
         for neighbor in neighbors:
             neighbor_neighbors = neighbor.get_neighbors(layer)
             neighbor_neighbors.append(new_node)
 
             if len(neighbor_neighbors) > max_conn:
-                neighbor_distance: list[NodeWithDistance] = [
-                    (cosine_distance(neighbor.vector, n.vector), n) for n in neighbor_neighbors
-                ]
+                distances = node_distances(neighbor.vector, neighbor_neighbors, self.vectors)
+                neighbor_distance: list[NodeWithDistance] = list(zip(distances, neighbor_neighbors))
                 neighbor.set_neighbors(layer, self._select_neighbors(neighbor_distance, max_conn))
             else:
                 neighbor.set_neighbors(layer, neighbor_neighbors)
 
+    def restore(self, nodes: Neighbors, entry_point: Optional[HNSWNode], max_layer: int) -> None:
+        """保存されていたグラフを設定する。ノードはノード番号の順に並んでいること"""
+        self.nodes = []
+        self.vectors = None
+        for node in nodes:
+            self._store_vector(node)
+            self.nodes.append(node)
+        self.entry_point = entry_point
+        self.max_layer = max_layer
+
+    def _store_vector(self, node: HNSWNode) -> None:
+        if self.vectors is None:
+            self.vectors = create_vector_store(len(node.vector))
+        if self.vectors.add(node.vector) != node.node_id:
+            raise RuntimeError(f"Node {node.node_id} is out of order")
+
     def _update_entry_point(self, new_node: HNSWNode, top_level: int) -> None:
         if top_level > self.max_layer:
             self.entry_point = new_node
@@ -167,7 +226,7 @@ class HNSWIndex(VectorIndex):
         """
         エントリポイントがなければ空リストを返す
         上位レイヤーをgreedy_descendで降下
-        レイヤー0でef=max(k, ef_construction)で探索
+        レイヤー0でef=max(k, ef_search)で探索
         RecordIDのリストを返す
         """
 
@@ -177,12 +236,11 @@ class HNSWIndex(VectorIndex):
         entry_point = [self.entry_point]
         max_layer = self.max_layer
 
-        ep = SearchState.greedy_descend(query, entry_point, max_layer, BASE_LAYER)
+        ep = SearchState.greedy_descend(query, entry_point, max_layer, BASE_LAYER, self.vectors)
 
-        ef = max(k, self.ef_construction)
-        state = SearchState(ep, query)
+        ef = max(k, self.ef_search)
+        state = SearchState(ep, query, self.vectors)
         nearest_set = state.search_layer(query, ef, layer=BASE_LAYER)
-        nearest_set.sort(key=lambda x: x[0])
 
         return [node.record_id for _, node in nearest_set[:k]]
 
@@ -0,0 +1,139 @@
+from typing import Optional
+
+from db.index.hnsw.hnsw_index import HNSWIndex, HNSWNode, NeighborChange
+from db.record.layout import Layout
+from db.record.record_id import RecordID
+from db.record.schema import Schema
+from db.record.table_scan import TableScan
+from db.transaction.transaction import Transaction
+
+NO_ENTRY_POINT = -1
+
+
+class HNSWStore:
+    """HNSWのグラフをテーブルファイルに保存する
+
+    3つのテーブルを使う。書き込みはTableScan経由なので、バッファマネージャとWALを通る
+      {index_name}hnswhead: ノード数、エントリポイント、最上位レイヤーの1行
+      {index_name}hnswnode: ノード番号、データレコードのRID、ベクトル
+      {index_name}hnswedge: ノード番号、レイヤー、近傍の数と、近傍のノード番号を並べた行
+    """
+
+    def __init__(self, index_name: str, dimensions: int, max_conn: int) -> None:
+        self.head_table = f"{index_name}hnswhead"
+        self.node_table = f"{index_name}hnswnode"
+        self.edge_table = f"{index_name}hnswedge"
+        self.max_conn = max_conn
+
+        head_schema = Schema()
+        head_schema.add_int_field("node_count")
+        head_schema.add_int_field("entry_point")
+        head_schema.add_int_field("max_layer")
+        self.head_layout = Layout(head_schema)
+
+        node_schema = Schema()
+        node_schema.add_int_field("node")
+        node_schema.add_int_field("block")
+        node_schema.add_int_field("id")
+        node_schema.add_vector_field("data_value", dimensions)
+        self.node_layout = Layout(node_schema)
+
+        edge_schema = Schema()
+        edge_schema.add_int_field("node")
+        edge_schema.add_int_field("layer")
+        edge_schema.add_int_field("count")
+        for i in range(max_conn):
+            edge_schema.add_int_field(self._neighbor_field(i))
+        self.edge_layout = Layout(edge_schema)
+
+        # ノード番号とレイヤーごとの、近傍リストの行のRID
+        self.edge_rids: dict[tuple[int, int], RecordID] = {}
+        # ヘッダの行のRID
+        self.head_rid: Optional[RecordID] = None
+
+    def load(self, transaction: Transaction, index: HNSWIndex) -> None:
+        """保存されているグラフを空のインデックスに読み込む"""
+        self.edge_rids = {}
+        self.head_rid = None
+        head_scan = TableScan(transaction, self.head_table, self.head_layout)
+        if not head_scan.next():
+            head_scan.close()
+            return
+        self.head_rid = head_scan.get_rid()
+        node_count = head_scan.get_int("node_count")
+        entry_point = head_scan.get_int("entry_point")
+        max_layer = head_scan.get_int("max_layer")
+        head_scan.close()
+
+        nodes: list[Optional[HNSWNode]] = [None] * node_count
+        node_scan = TableScan(transaction, self.node_table, self.node_layout)
+        while node_scan.next():
+            node_id = node_scan.get_int("node")
+            record_id = RecordID(node_scan.get_int("block"), node_scan.get_int("id"))
+            nodes[node_id] = HNSWNode(node_scan.get_vector("data_value"), record_id, node_id)
+        node_scan.close()
+
+        if any(node is None for node in nodes):
+            raise RuntimeError(f"HNSW index {self.node_table} is missing nodes")
+        loaded = [node for node in nodes if node is not None]
+
+        edge_scan = TableScan(transaction, self.edge_table, self.edge_layout)
+        while edge_scan.next():
+            node_id = edge_scan.get_int("node")
+            layer = edge_scan.get_int("layer")
+            neighbors = [loaded[edge_scan.get_int(self._neighbor_field(i))] for i in range(edge_scan.get_int("count"))]
+            loaded[node_id].set_neighbors(layer, neighbors)
+            self.edge_rids[(node_id, layer)] = edge_scan.get_rid()
+        edge_scan.close()
+
+        index.restore(loaded, loaded[entry_point] if entry_point != NO_ENTRY_POINT else None, max_layer)
+
+    def save(self, transaction: Transaction, index: HNSWIndex, changes: list[NeighborChange]) -> None:
+        """最後に追加したノードと、近傍リストが変わった行、ヘッダを書き込む"""
+        node = index.nodes[-1]
+        node_scan = TableScan(transaction, self.node_table, self.node_layout)
+        node_scan.insert()
+        node_scan.set_int("node", node.node_id)
+        node_scan.set_int("block", node.record_id.block_number)
+        node_scan.set_int("id", node.record_id.slot)
+        node_scan.set_vector("data_value", node.vector)
+        node_scan.close()
+
+        edge_scan = TableScan(transaction, self.edge_table, self.edge_layout)
+        for changed, layer in changes:
+            self._write_neighbors(edge_scan, changed, layer)
+        edge_scan.close()
+
+        head_scan = TableScan(transaction, self.head_table, self.head_layout)
+        if self.head_rid is not None:
+            head_scan.move_to_rid(self.head_rid)
+        elif not head_scan.next():
+            head_scan.insert()
+        self.head_rid = head_scan.get_rid()
+        head_scan.set_int("node_count", len(index.nodes))
+        entry_point = index.entry_point.node_id if index.entry_point is not None else NO_ENTRY_POINT
+        head_scan.set_int("entry_point", entry_point)
+        head_scan.set_int("max_layer", index.max_layer)
+        head_scan.close()
+
+    def _write_neighbors(self, edge_scan: TableScan, node: HNSWNode, layer: int) -> None:
+        neighbors = node.get_neighbors(layer)
+        if len(neighbors) > self.max_conn:
+            raise ValueError(f"Too many neighbors: {len(neighbors)} > {self.max_conn}")
+
+        key = (node.node_id, layer)
+        if key in self.edge_rids:
+            edge_scan.move_to_rid(self.edge_rids[key])
+        else:
+            edge_scan.insert()
+            edge_scan.set_int("node", node.node_id)
+            edge_scan.set_int("layer", layer)
+            self.edge_rids[key] = edge_scan.get_rid()
+
+        edge_scan.set_int("count", len(neighbors))
+        for i, neighbor in enumerate(neighbors):
+            edge_scan.set_int(self._neighbor_field(i), neighbor.node_id)
+
+    @staticmethod
+    def _neighbor_field(i: int) -> str:
+        return f"neighbor{i}"
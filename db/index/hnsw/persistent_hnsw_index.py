@@ -0,0 +1,60 @@
+from threading import Lock
+
+from db.index.hnsw.hnsw_index import HNSWIndex
+from db.index.hnsw.hnsw_store import HNSWStore
+from db.index.vector_index import VectorIndex
+from db.query.vector import Vector
+from db.record.record_id import RecordID
+from db.transaction.transaction import Transaction
+
+
+class VectorGraphs:
+    """インデックス名ごとの、読み込み済みのグラフとストアと、グラフを守るロック"""
+
+    def __init__(self) -> None:
+        self.graphs: dict[str, tuple[HNSWIndex, HNSWStore]] = {}
+        self._locks: dict[str, Lock] = {}
+        self._locks_lock = Lock()
+
+    def lock(self, index_name: str) -> Lock:
+        """インデックスのグラフの読み込み、変更、探索を直列化するロックを返す。別のインデックスは互いを待たない"""
+        with self._locks_lock:
+            return self._locks.setdefault(index_name, Lock())
+
+
+class PersistentHNSWIndex(VectorIndex):
+    """ディスクに保存されたHNSWインデックスをトランザクションから使うためのハンドル
+
+    グラフ本体はトランザクションをまたいで共有し、挿入した内容はトランザクション経由でストアに書き込む。
+    挿入したトランザクションがロールバックしたら、共有しているグラフを捨てて次に開くときに読み込み直させる
+    """
+
+    def __init__(self, transaction: Transaction, index_name: str, vector_graphs: VectorGraphs) -> None:
+        self.transaction = transaction
+        self.index_name = index_name
+        self.vector_graphs = vector_graphs
+        self.lock = vector_graphs.lock(index_name)
+        self.graph, self.store = vector_graphs.graphs[index_name]
+        self.modified = False
+
+    def insert(self, vector: Vector, data_record_id: RecordID) -> None:
+        with self.lock:
+            if not self.modified:
+                self.transaction.on_rollback(self._discard_graph)
+                self.modified = True
+            changes = self.graph.add(vector, data_record_id)
+            self.store.save(self.transaction, self.graph, changes)
+
+    def search(self, data_value: Vector, k: int) -> list[RecordID]:
+        with self.lock:
+            return self.graph.search(data_value, k)
+
+    def close(self) -> None:
+        pass
+
+    def _discard_graph(self) -> None:
+        """ロールバックで取り消された挿入を含むグラフを、共有から外す"""
+        with self.lock:
+            loaded = self.vector_graphs.graphs.get(self.index_name)
+            if loaded is not None and loaded[0] is self.graph:
+                del self.vector_graphs.graphs[self.index_name]
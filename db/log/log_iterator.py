@@ -6,24 +6,29 @@ from db.file.file_manager import FileManager
 from db.file.page import Page
 
 
-class LogIterator(Iterator[bytes]):
+class LogIterator(Iterator[memoryview]):
+    """ログを新しいものから順に返すイテレータ
+
+    レコードはページをコピーしないmemoryviewで返す。ブロックごとに新しいページに読み込むため、
+    返したレコードは後続のブロックを読んでも変わらない
+    """
+
     def __init__(self, file_manager: FileManager, block: BlockID) -> None:
         self.file_manager = file_manager
         self.block = block
-        self.page = Page(file_manager.block_size)
         self.current_offset = 0
         self.move_to_block(block)
 
     def __iter__(self) -> "LogIterator":
         return self
 
-    def __next__(self) -> bytes:
+    def __next__(self) -> memoryview:
 
         if self.current_offset == self.file_manager.block_size:
             next_block = BlockID(self.block.file_name, self.block.block_number - 1)
             self.move_to_block(next_block)
 
-        record = self.page.get_bytes(self.current_offset)
+        record = self.page.get_bytes_view(self.current_offset)
         self.current_offset += ByteSize.Int + len(record)
 
         return record
@@ -32,5 +37,7 @@ class LogIterator(Iterator[bytes]):
         return self.current_offset < self.file_manager.block_size or self.block.number() > 0
 
     def move_to_block(self, block: BlockID) -> None:
+        self.block = block
+        self.page = Page(self.file_manager.block_size)
         self.file_manager.read(block, self.page)
         self.current_offset = self.page.get_int(0)
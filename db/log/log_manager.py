@@ -1,3 +1,5 @@
+import threading
+
 from db.constants import ByteSize
 from db.file.block_id import BlockID
 from db.file.file_manager import FileManager
@@ -14,6 +16,13 @@ class LogManager:
         self.current_lsn = 0
         self.last_saved_lsn = 0
 
+        # appendとflushの状態を守るロック
+        self._lock = threading.Lock()
+        # ディスクへの書き込みを一度に一つのスレッドだけが行うためのロック
+        self._flush_lock = threading.Lock()
+        # 書き込み待ちの満杯になったログページ
+        self._pending_pages: list[tuple[BlockID, Page]] = []
+
         log_size = self.file_manager.length(log_file)
 
         if log_size == 0:
@@ -25,11 +34,19 @@ class LogManager:
             self.file_manager.read(self.current_block, self.log_page)
 
     def flush(self, lsn: int) -> None:
-        if lsn >= self.last_saved_lsn:
-            self._flush()
+        """指定したLSNまでのログをディスクに書き込む
+
+        同時にコミットするトランザクションは、先に書き込みを始めたスレッドの
+        fsyncでまとめて永続化される（グループコミット）
+        """
+        with self._lock:
+            if lsn <= self.last_saved_lsn:
+                return
+
+        self._flush(lsn)
 
     def iterator(self) -> LogIterator:
-        self._flush()
+        self._flush(self.current_lsn)
 
         if self.current_block is None:
             raise ValueError("No log records to read")
@@ -37,31 +54,53 @@ class LogManager:
         return LogIterator(self.file_manager, self.current_block)
 
     def append(self, log_record: bytes) -> int:
-        boundary = self.log_page.get_int(0)
-        record_size = len(log_record)
-        bytes_needed = record_size + ByteSize.Int
-
-        if boundary - bytes_needed < ByteSize.Int:
-            self._flush()
-            self.current_block = self._append_new_block()
+        with self._lock:
             boundary = self.log_page.get_int(0)
+            record_size = len(log_record)
+            bytes_needed = record_size + ByteSize.Int
+
+            if boundary - bytes_needed < ByteSize.Int:
+                self.current_block = self._append_new_block()
+                boundary = self.log_page.get_int(0)
 
-        record_position = boundary - bytes_needed
-        self.log_page.set_bytes(record_position, log_record)
-        self.log_page.set_int(0, record_position)
-        self.current_lsn += 1
-        return self.current_lsn
+            record_position = boundary - bytes_needed
+            self.log_page.set_bytes(record_position, log_record)
+            self.log_page.set_int(0, record_position)
+            self.current_lsn += 1
+            return self.current_lsn
 
     def _append_new_block(self) -> BlockID:
-        block = self.file_manager.append(self.log_file)
+        """現在のページを書き込み待ちにし、次のブロックに新しいページを用意する
+
+        ブロックの確保は次のflushでページを書き込むときにまとめて行う
+        """
+        if self.current_block is None:
+            raise ValueError("Current block is not set.")
+
+        self._pending_pages.append((self.current_block, self.log_page))
+        block = BlockID(self.log_file, self.current_block.number() + 1)
         self.log_page = Page(self.file_manager.block_size)
         self.log_page.set_int(0, self.file_manager.block_size)
-        self.file_manager.write(block, self.log_page)
         return block
 
-    def _flush(self) -> None:
-        if self.current_block is None:
-            raise ValueError("Current block is not set.")
+    def _flush(self, lsn: int) -> None:
+        with self._flush_lock:
+            with self._lock:
+                if self.current_block is None:
+                    raise ValueError("Current block is not set.")
+
+                # 待っている間に他のスレッドの書き込みで永続化済みになった
+                if lsn <= self.last_saved_lsn:
+                    return
+
+                pages = self._pending_pages + [(self.current_block, Page(self.log_page.buffer))]
+                self._pending_pages = []
+                target_lsn = self.current_lsn
+
+            # 書き込み中も他のスレッドはログを追加できる
+            for block, page in pages:
+                self.file_manager.write(block, page)
+            self.file_manager.sync(self.log_file)
 
-        self.file_manager.write(self.current_block, self.log_page)
-        self.last_saved_lsn = self.current_lsn
+            with self._lock:
+                self.last_saved_lsn = max(self.last_saved_lsn, target_lsn)
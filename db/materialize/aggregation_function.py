@@ -21,3 +21,8 @@ class AggregationFunction(ABC):
     @abstractmethod
     def get_value(self) -> Constant:
         pass
+
+    @abstractmethod
+    def clone(self) -> "AggregationFunction":
+        """同じフィールドを集計する、まだ何も処理していない新しいインスタンスを返す"""
+        pass
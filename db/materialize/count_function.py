@@ -21,3 +21,6 @@ class CountFunction(AggregationFunction, ABC):
 
     def get_value(self) -> Constant:
         return Constant(self._count)
+
+    def clone(self) -> "CountFunction":
+        return CountFunction(self._field_name)
@@ -0,0 +1,99 @@
+from abc import ABC
+from math import ceil
+from typing import Optional
+
+from db.constants import Buffers
+from db.materialize.aggregation_function import AggregationFunction
+from db.materialize.group_by_plan import GroupByPlan
+from db.materialize.hash_group_by_scan import HashGroupByScan
+from db.plan.plan import Plan
+from db.query.scan import Scan
+from db.record.layout import Layout
+from db.record.schema import Schema
+from db.transaction.transaction import Transaction
+
+
+class HashGroupByPlan(Plan, ABC):
+    """入力を並べ替えずにハッシュ表で集計するGROUP BYの計画
+
+    メモリに置くグループ数は、空いているバッファに集計結果の行が収まる数までとする
+    """
+
+    def __init__(
+        self,
+        transaction: Transaction,
+        plan: Plan,
+        group_fields: list[str],
+        agg_fns: list[AggregationFunction],
+        max_groups: Optional[int] = None,
+    ) -> None:
+        super().__init__()
+        self.transaction = transaction
+        self.plan = plan
+        self.group_fields = group_fields
+        self.agg_fns = agg_fns
+        self.max_groups = max_groups
+        self._schema = Schema()
+
+        for field_name in group_fields:
+            self._schema.add(field_name, plan.schema())
+
+        for agg_fn in agg_fns:
+            self._schema.add_int_field(agg_fn.field_name())
+
+    def open(self) -> Scan:
+        max_groups = self.groups_in_memory()
+        num_partitions = min(
+            max(Buffers.Minimum, self.transaction.available_buffers() - Buffers.Reserved),
+            ceil(self.records_output() / max_groups),
+        )
+        return HashGroupByScan(
+            self.transaction,
+            self.plan.open,
+            self.plan.schema(),
+            self.group_fields,
+            self.agg_fns,
+            max_groups,
+            num_partitions,
+        )
+
+    def groups_in_memory(self) -> int:
+        """ハッシュ表に置くグループの最大数を返す"""
+        if self.max_groups is not None:
+            return self.max_groups
+        available = max(Buffers.Minimum, self.transaction.available_buffers() - Buffers.Reserved)
+        groups_per_block = self.transaction.block_size() // Layout(self._schema).get_slot_size()
+        return max(1, available * groups_per_block)
+
+    def blocks_accessed(self) -> int:
+        blocks = self.plan.blocks_accessed()
+        if self.records_output() <= self.groups_in_memory():
+            return blocks
+        # 入りきらなかったグループの行を一時テーブルに書き出して読み直す
+        return 3 * blocks
+
+    def records_output(self) -> int:
+        num_groups = 1
+        for field_name in self.group_fields:
+            num_groups *= self.plan.distinct_values(field_name)
+        return num_groups
+
+    def distinct_values(self, field_name: str) -> int:
+        if self.plan.schema().has_field(field_name):
+            return self.plan.distinct_values(field_name)
+
+        return self.records_output()
+
+    def schema(self) -> Schema:
+        return self._schema
+
+
+def create_group_by_plan(
+    transaction: Transaction, plan: Plan, group_fields: list[str], agg_fns: list[AggregationFunction]
+) -> Plan:
+    """グループ数が行数に比べて少なければハッシュ集計、そうでなければ並べ替えによる集計の計画を返す"""
+    hash_plan = HashGroupByPlan(transaction, plan, group_fields, agg_fns)
+    num_groups = hash_plan.records_output()
+    if num_groups <= hash_plan.groups_in_memory() or num_groups * 2 <= plan.records_output():
+        return hash_plan
+    return GroupByPlan(transaction, plan, group_fields, agg_fns)
@@ -0,0 +1,146 @@
+from abc import ABC
+from typing import Iterator, Optional
+
+from db.constants import FieldType
+from db.materialize.aggregation_function import AggregationFunction
+from db.materialize.group_value import GroupValue
+from db.materialize.temp_table import TempTable
+from db.query.constant import Constant
+from db.query.scan import Scan, ScanOpener
+from db.query.update_scan import UpdateScan
+from db.record.schema import Schema
+from db.transaction.transaction import Transaction
+
+type Groups = dict[GroupValue, list[AggregationFunction]]
+
+
+class HashGroupByScan(Scan, ABC):
+    """入力を並べ替えずに、グループごとの集計をハッシュ表で求めるスキャン
+
+    ハッシュ表のグループ数がmax_groupsに達した後に現れた新しいグループの行は、
+    グループのハッシュ値で一時テーブルに振り分け、メモリ上のグループを返し終えてから
+    一時テーブルごとに同じ方法で集計する。入力は最初にnextを呼んだときに読む
+    """
+
+    def __init__(
+        self,
+        transaction: Transaction,
+        open_source: ScanOpener,
+        source_schema: Schema,
+        group_fields: list[str],
+        agg_fns: list[AggregationFunction],
+        max_groups: int,
+        num_partitions: int,
+    ) -> None:
+        self.transaction = transaction
+        self.open_source = open_source
+        self.source_schema = source_schema
+        self.group_fields = group_fields
+        self.agg_fns = agg_fns
+        self.max_groups = max(1, max_groups)
+        self.num_partitions = max(2, num_partitions)
+
+        # 集計待ちの一時テーブルと、振り分けたときの深さ
+        self.pending: list[tuple[TempTable, int]] = []
+        self.results: Iterator[tuple[GroupValue, list[AggregationFunction]]] = iter(())
+        self.group_value: Optional[GroupValue] = None
+        self.current_fns: list[AggregationFunction] = []
+        self.aggregated = False
+
+    def before_first(self) -> None:
+        self.pending = []
+        self.results = iter(())
+        self.group_value = None
+        self.aggregated = False
+
+    def next(self) -> bool:
+        if not self.aggregated:
+            self.aggregated = True
+            self._aggregate(self.open_source(), 0)
+
+        while True:
+            item = next(self.results, None)
+            if item is not None:
+                self.group_value, self.current_fns = item
+                return True
+
+            if not self.pending:
+                self.group_value = None
+                return False
+
+            table, depth = self.pending.pop(0)
+            self._aggregate(table.open(), depth)
+
+    def get_value(self, field_name: str) -> Constant:
+        if self.group_value is None:
+            raise RuntimeError("No group value set yet")
+
+        if field_name in self.group_fields:
+            return self.group_value.get_value(field_name)
+
+        for agg_fn in self.current_fns:
+            if field_name == agg_fn.field_name():
+                return agg_fn.get_value()
+
+        raise RuntimeError(f"Field {field_name} not found")
+
+    def get_int(self, field_name: str) -> int:
+        return self.get_value(field_name).as_int()
+
+    def get_string(self, field_name: str) -> str:
+        return self.get_value(field_name).as_string()
+
+    def get_vector(self, field_name: str) -> list[float]:
+        raise RuntimeError("Vector fields not supported in HashGroupByScan")
+
+    def has_field(self, field_name: str) -> bool:
+        return field_name in self.group_fields or any(field_name == agg_fn.field_name() for agg_fn in self.agg_fns)
+
+    def close(self) -> None:
+        self.pending = []
+        self.results = iter(())
+        self.group_value = None
+
+    def _aggregate(self, source: Scan, depth: int) -> None:
+        """sourceの行を集計する。ハッシュ表に入りきらないグループの行は一時テーブルに書き出す"""
+        groups: Groups = {}
+        spill: Optional[list[UpdateScan]] = None
+        spill_tables: list[TempTable] = []
+
+        while source.next():
+            group_value = GroupValue(source, self.group_fields)
+            fns = groups.get(group_value)
+            if fns is not None:
+                for fn in fns:
+                    fn.process_next(source)
+                continue
+
+            if len(groups) < self.max_groups:
+                fns = [agg_fn.clone() for agg_fn in self.agg_fns]
+                for fn in fns:
+                    fn.process_first(source)
+                groups[group_value] = fns
+                continue
+
+            if spill is None:
+                spill_tables = [TempTable(self.transaction, self.source_schema) for _ in range(self.num_partitions)]
+                spill = [table.open() for table in spill_tables]
+            # 深さごとに異なる振り分けにして、同じ一時テーブルに偏り続けないようにする
+            partition = hash((depth, group_value)) % self.num_partitions
+            self._copy_row(source, spill[partition])
+
+        source.close()
+        if spill is not None:
+            for destination in spill:
+                destination.close()
+            self.pending.extend((table, depth + 1) for table in spill_tables)
+
+        self.results = iter(groups.items())
+
+    def _copy_row(self, source: Scan, destination: UpdateScan) -> None:
+        destination.insert()
+        for field_name in self.source_schema.get_fields():
+            if self.source_schema.get_type(field_name) == FieldType.Vector:
+                destination.set_vector(field_name, source.get_vector(field_name))
+            else:
+                destination.set_value(field_name, source.get_value(field_name))
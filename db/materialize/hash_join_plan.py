@@ -0,0 +1,115 @@
+from abc import ABC
+from math import ceil
+
+from db.constants import Buffers, FieldType
+from db.materialize.hash_join_scan import HashJoinScan
+from db.materialize.materialize_plan import MaterializePlan
+from db.materialize.temp_table import TempTable
+from db.plan.plan import Plan
+from db.query.scan import Scan, ScanOpener
+from db.record.schema import Schema
+from db.transaction.transaction import Transaction
+
+
+class HashJoinPlan(Plan, ABC):
+    """結合キーが等しい行を結ぶハッシュ結合の計画
+
+    ビルド側がバッファプールの空きに収まればメモリ上で結合する。収まらなければ両側を
+    結合キーのハッシュ値で一時テーブルに分割し（Grace方式）、パーティションごとに結合する
+    """
+
+    def __init__(
+        self,
+        transaction: Transaction,
+        build_plan: Plan,
+        probe_plan: Plan,
+        build_field: str,
+        probe_field: str,
+    ) -> None:
+        super().__init__()
+        self.transaction = transaction
+        self.build_plan = build_plan
+        self.probe_plan = probe_plan
+        self.build_field = build_field
+        self.probe_field = probe_field
+
+        for plan, field_name in ((build_plan, build_field), (probe_plan, probe_field)):
+            if plan.schema().get_type(field_name) == FieldType.Vector:
+                raise ValueError(f"Cannot hash join on vector field {field_name}")
+
+        self._schema = Schema()
+        self._schema.add_all(build_plan.schema())
+        self._schema.add_all(probe_plan.schema())
+
+    def open(self) -> Scan:
+        num_partitions = self.num_partitions()
+        partitions: list[tuple[ScanOpener, ScanOpener]]
+        if num_partitions == 1:
+            partitions = [(self.build_plan.open, self.probe_plan.open)]
+        else:
+            build_tables = self._partition(self.build_plan, self.build_field, num_partitions)
+            probe_tables = self._partition(self.probe_plan, self.probe_field, num_partitions)
+            partitions = [(build.open, probe.open) for build, probe in zip(build_tables, probe_tables)]
+
+        return HashJoinScan(
+            partitions, self.build_plan.schema(), self.probe_plan.schema(), self.build_field, self.probe_field
+        )
+
+    def num_partitions(self) -> int:
+        """ビルド側の各パーティションがバッファプールの空きに収まるパーティション数を返す"""
+        available = max(Buffers.Minimum, self.transaction.available_buffers() - Buffers.Reserved)
+        build_blocks = MaterializePlan(self.transaction, self.build_plan).blocks_accessed()
+        if build_blocks <= available:
+            return 1
+        # 分割中は各パーティションの一時テーブルが1ブロックずつpinする
+        return max(2, min(ceil(build_blocks / available), available))
+
+    def blocks_accessed(self) -> int:
+        blocks = self.build_plan.blocks_accessed() + self.probe_plan.blocks_accessed()
+        if self.num_partitions() == 1:
+            return blocks
+
+        # 分割した一時テーブルの書き込みと読み直し
+        materialized = (
+            MaterializePlan(self.transaction, self.build_plan).blocks_accessed()
+            + MaterializePlan(self.transaction, self.probe_plan).blocks_accessed()
+        )
+        return blocks + 2 * materialized
+
+    def records_output(self) -> int:
+        max_values = max(
+            1,
+            self.build_plan.distinct_values(self.build_field),
+            self.probe_plan.distinct_values(self.probe_field),
+        )
+        return self.build_plan.records_output() * self.probe_plan.records_output() // max_values
+
+    def distinct_values(self, field_name: str) -> int:
+        if self.build_plan.schema().has_field(field_name):
+            return self.build_plan.distinct_values(field_name)
+        return self.probe_plan.distinct_values(field_name)
+
+    def schema(self) -> Schema:
+        return self._schema
+
+    def _partition(self, plan: Plan, field_name: str, num_partitions: int) -> list[TempTable]:
+        """結合キーのハッシュ値で行を一時テーブルに振り分ける"""
+        schema = plan.schema()
+        fields = [(name, schema.get_type(name)) for name in schema.get_fields()]
+        tables = [TempTable(self.transaction, schema) for _ in range(num_partitions)]
+        destinations = [table.open() for table in tables]
+
+        source = plan.open()
+        while source.next():
+            destination = destinations[hash(source.get_value(field_name)) % num_partitions]
+            destination.insert()
+            for name, field_type in fields:
+                if field_type == FieldType.Vector:
+                    destination.set_vector(name, source.get_vector(name))
+                else:
+                    destination.set_value(name, source.get_value(name))
+
+        source.close()
+        for destination in destinations:
+            destination.close()
+        return tables
@@ -0,0 +1,147 @@
+from abc import ABC
+from typing import Optional
+
+from db.constants import FieldType
+from db.query.constant import Constant
+from db.query.scan import Scan, ScanOpener
+from db.query.vector import Vector
+from db.record.schema import Schema
+
+type BuildRow = dict[str, Constant | Vector]
+
+
+class HashJoinScan(Scan, ABC):
+    """ハッシュ結合のスキャン
+
+    パーティションごとにビルド側の行をメモリ上のハッシュ表に読み込み、プローブ側の行ごとに
+    結合キーが等しいビルド側の行を返す。パーティションが1つならビルド側とプローブ側の元のスキャンを使う
+    """
+
+    def __init__(
+        self,
+        partitions: list[tuple[ScanOpener, ScanOpener]],
+        build_schema: Schema,
+        probe_schema: Schema,
+        build_field: str,
+        probe_field: str,
+    ) -> None:
+        self.partitions = partitions
+        self.build_schema = build_schema
+        self.probe_schema = probe_schema
+        self.build_field = build_field
+        self.probe_field = probe_field
+
+        self.partition_index = -1
+        self.table: dict[Constant, list[BuildRow]] = {}
+        self.probe_scan: Optional[Scan] = None
+        self.matches: list[BuildRow] = []
+        self.match_index = 0
+
+    def before_first(self) -> None:
+        self._close_probe()
+        self.partition_index = -1
+        self.table = {}
+        self.matches = []
+        self.match_index = 0
+
+    def next(self) -> bool:
+        while True:
+            if self.match_index + 1 < len(self.matches):
+                self.match_index += 1
+                return True
+
+            if self.probe_scan is not None and self.probe_scan.next():
+                self.matches = self.table.get(self.probe_scan.get_value(self.probe_field), [])
+                self.match_index = -1
+                continue
+
+            if not self._next_partition():
+                return False
+
+    def get_int(self, field_name: str) -> int:
+        if self.build_schema.has_field(field_name):
+            value = self._build_value(field_name)
+            assert isinstance(value, Constant)
+            return value.as_int()
+        return self._probe().get_int(field_name)
+
+    def get_string(self, field_name: str) -> str:
+        if self.build_schema.has_field(field_name):
+            value = self._build_value(field_name)
+            assert isinstance(value, Constant)
+            return value.as_string()
+        return self._probe().get_string(field_name)
+
+    def get_vector(self, field_name: str) -> list[float]:
+        if self.build_schema.has_field(field_name):
+            value = self._build_value(field_name)
+            if not isinstance(value, list):
+                raise ValueError(f"Field {field_name} is not a vector")
+            return value
+        return self._probe().get_vector(field_name)
+
+    def get_value(self, field_name: str) -> Constant:
+        if self.build_schema.has_field(field_name):
+            value = self._build_value(field_name)
+            if not isinstance(value, Constant):
+                raise ValueError("Vector fields cannot be converted to Constant")
+            return value
+        return self._probe().get_value(field_name)
+
+    def has_field(self, field_name: str) -> bool:
+        return self.build_schema.has_field(field_name) or self.probe_schema.has_field(field_name)
+
+    def close(self) -> None:
+        self._close_probe()
+        self.table = {}
+        self.matches = []
+
+    def _next_partition(self) -> bool:
+        """次のパーティションのハッシュ表を作り、プローブ側のスキャンを開く"""
+        self._close_probe()
+        self.matches = []
+        self.match_index = 0
+        self.partition_index += 1
+        if self.partition_index >= len(self.partitions):
+            self.table = {}
+            return False
+
+        open_build, open_probe = self.partitions[self.partition_index]
+        self.table = self._build(open_build())
+        self.probe_scan = open_probe()
+        return True
+
+    def _build(self, build_scan: Scan) -> dict[Constant, list[BuildRow]]:
+        """ビルド側の行を結合キーごとにまとめる"""
+        table: dict[Constant, list[BuildRow]] = {}
+        fields = [(field_name, self.build_schema.get_type(field_name)) for field_name in self.build_schema.get_fields()]
+
+        while build_scan.next():
+            row: BuildRow = {}
+            for field_name, field_type in fields:
+                if field_type == FieldType.Vector:
+                    row[field_name] = build_scan.get_vector(field_name)
+                else:
+                    row[field_name] = build_scan.get_value(field_name)
+
+            key = row[self.build_field]
+            assert isinstance(key, Constant)
+            table.setdefault(key, []).append(row)
+
+        build_scan.close()
+        return table
+
+    def _build_value(self, field_name: str) -> Constant | Vector:
+        if not 0 <= self.match_index < len(self.matches):
+            raise RuntimeError("No current record. Call next() first.")
+        return self.matches[self.match_index][field_name]
+
+    def _probe(self) -> Scan:
+        if self.probe_scan is None:
+            raise RuntimeError("No current record. Call next() first.")
+        return self.probe_scan
+
+    def _close_probe(self) -> None:
+        if self.probe_scan is not None:
+            self.probe_scan.close()
+            self.probe_scan = None
@@ -1,5 +1,9 @@
+from typing import Optional
+
+from db.query.batch import Batch
 from db.query.constant import Constant
 from db.query.scan import Scan
+from db.record.schema import Schema
 
 
 class LimitScan(Scan):
@@ -20,6 +24,11 @@ class LimitScan(Scan):
         self.count += 1
         return self.scan.next()
 
+    def next_batch(self, n: int, schema: Optional[Schema] = None) -> Batch:
+        batch = self.scan.next_batch(max(0, min(n, self.limit - self.count)), schema)
+        self.count += len(batch)
+        return batch
+
     def get_int(self, field_name: str) -> int:
         return self.scan.get_int(field_name)
 
@@ -28,3 +28,6 @@ class MaxFunction(AggregationFunction, ABC):
             raise RuntimeError("No max value")
 
         return self.current_max
+
+    def clone(self) -> "MaxFunction":
+        return MaxFunction(self._field_name)
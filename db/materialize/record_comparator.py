@@ -36,6 +36,13 @@ class RecordComparator:
 
         return 0
 
+    def key(self, scan: Scan) -> tuple[Constant | _Reverse, ...]:
+        """スキャンの現在の行のソートキーを返す"""
+        return tuple(
+            scan.get_value(f.field_name) if f.ascending else _Reverse(scan.get_value(f.field_name))
+            for f in self.sort_fields
+        )
+
     def compare_row(self, row: dict[str, Constant | list[float]]) -> tuple[Constant | _Reverse, ...]:
         result = []
         for f in self.sort_fields:
@@ -1,6 +1,8 @@
+import heapq
 from abc import ABC
+from typing import Any, Optional
 
-from db.constants import FieldType
+from db.constants import Buffers, FieldType
 from db.materialize.materialize_plan import MaterializePlan
 from db.materialize.record_comparator import RecordComparator
 from db.materialize.sort_scan import SortScan
@@ -10,108 +12,153 @@ from db.plan.plan import Plan
 from db.query.constant import Constant
 from db.query.scan import Scan
 from db.query.update_scan import UpdateScan
+from db.record.layout import Layout
 from db.record.schema import Schema
+from db.record.table_scan import TableScan
 from db.transaction.transaction import Transaction
 
+type Row = dict[str, Constant | list[float]]
+# ランの番号、ソートキー、読み込んだ順番、行
+type RunEntry = tuple[int, tuple[Any, ...], int, Row]
 
-class SortPlan(Plan, ABC):
-    MAX_RUNS_FOR_MERGE = 2
-    LIST_FIRST_INDEX = 0
 
-    def __init__(self, transaction: Transaction, source_plan: Plan, sort_fields: list[OrderByField]) -> None:
+class SortPlan(Plan, ABC):
+    """外部マージソートの計画
+
+    空いているバッファに収まる行数のヒープで置換選択を行ってランを作り、
+    ランの数が同時に開けるスキャンの数を超える間はk-wayマージでランをまとめる
+    """
+
+    def __init__(
+        self,
+        transaction: Transaction,
+        source_plan: Plan,
+        sort_fields: list[OrderByField],
+        max_records: Optional[int] = None,
+    ) -> None:
         super().__init__()
         self.transaction = transaction
         self.source_plan = source_plan
         self._schema = self.source_plan.schema()
         self.comparator = RecordComparator(sort_fields)
+        self.max_records = max_records
 
     def open(self) -> Scan:
         source_scan = self.source_plan.open()
         runs = self._split_into_runs(source_scan)
         source_scan.close()
 
-        while len(runs) > self.MAX_RUNS_FOR_MERGE:
-            runs = self._do_a_merge_iteration(runs)
+        fan_in = self.fan_in()
+        while len(runs) > fan_in:
+            runs = self._do_a_merge_iteration(runs, fan_in)
 
         return SortScan(runs, self.comparator)
 
-    def _split_into_runs(self, source_scan: Scan) -> list[TempTable]:
-        # すべてのレコードをメモリに読み込み、ソートしてから一時テーブルに書き出す
-        # 現状未使用だが、将来的にメモリ制限を考慮して分割してソートするための基盤
-        schema = self.source_plan.schema()
-        records = []
-
-        while source_scan.next():
-            row: dict[str, Constant | list[float]] = {}
-            for field in schema.get_fields():
-                if schema.get_type(field) == FieldType.Vector:
-                    row[field] = source_scan.get_vector(field)
-                else:
-                    row[field] = source_scan.get_value(field)
-            records.append(row)
-
-        records.sort(key=lambda r: self.comparator.compare_row(r))
-
-        run = TempTable(self.transaction, schema)
-        dest = run.open()
-        for record in records:
-            dest.insert()
-            for field_name in schema.get_fields():
-                value = record[field_name]
-                if isinstance(value, list):
-                    dest.set_vector(field_name, value)
-                else:
-                    dest.set_value(field_name, value)
-
-        dest.close()
-        return [run]
-
-    def _do_a_merge_iteration(self, runs: list[TempTable]) -> list[TempTable]:
-        result = []
-
-        while len(runs) > self.LIST_FIRST_INDEX + 1:
-            left = runs.pop(self.LIST_FIRST_INDEX)
-            right = runs.pop(self.LIST_FIRST_INDEX)
-            result.append(self._merge_two_runs(left, right))
-
-        if len(runs) == self.LIST_FIRST_INDEX + 1:
-            result.append(runs[self.LIST_FIRST_INDEX])
-
-        return result
-
-    def _merge_two_runs(self, left: TempTable, right: TempTable) -> TempTable:
-        source_left = left.open()
-        source_right = right.open()
+    def records_in_memory(self) -> int:
+        """ラン作成時にメモリ上に置く行の最大数を返す"""
+        if self.max_records is not None:
+            return max(1, self.max_records)
+        records_per_block = self.transaction.block_size() // Layout(self._schema).get_slot_size()
+        return max(1, self.fan_in() * records_per_block)
 
-        result_temp_table = TempTable(self.transaction, self._schema)
-        dest_scan = result_temp_table.open()
-
-        has_more_left = source_left.next()
-        has_more_right = source_right.next()
+    def fan_in(self) -> int:
+        """1回のマージで同時に開くランの数を返す。ランごとに1つのバッファをpinする"""
+        return max(2, self.transaction.available_buffers() - Buffers.Reserved)
 
-        while has_more_left and has_more_right:
-            if self.comparator.compare(source_left, source_right) < 0:
-                has_more_left = self._copy(source_left, dest_scan)
+    def _split_into_runs(self, source_scan: Scan) -> list[TempTable]:
+        """置換選択でランを作る
+
+        書き出した行のキーより小さい行は現在のランに入れられないので次のランに回す。
+        入力がランダムな順序なら、ランの長さはメモリに置ける行数の約2倍になる
+        """
+        capacity = self.records_in_memory()
+        heap: list[RunEntry] = []
+        sequence = 0
+
+        has_more = source_scan.next()
+        while has_more and len(heap) < capacity:
+            row = self._read_row(source_scan)
+            heapq.heappush(heap, (0, self.comparator.compare_row(row), sequence, row))
+            sequence += 1
+            has_more = source_scan.next()
+
+        runs: list[TempTable] = []
+        dest: Optional[UpdateScan] = None
+        run_number = -1
+        while heap:
+            number, key, _, row = heapq.heappop(heap)
+            if number != run_number:
+                if dest is not None:
+                    dest.close()
+                runs.append(TempTable(self.transaction, self._schema))
+                dest = runs[-1].open()
+                run_number = number
+            assert dest is not None
+            self._write_row(row, dest)
+
+            if has_more:
+                row = self._read_row(source_scan)
+                new_key = self.comparator.compare_row(row)
+                new_number = number + 1 if new_key < key else number
+                heapq.heappush(heap, (new_number, new_key, sequence, row))
+                sequence += 1
+                has_more = source_scan.next()
+
+        if dest is not None:
+            dest.close()
+        if not runs:
+            runs.append(TempTable(self.transaction, self._schema))
+        return runs
+
+    def _read_row(self, source_scan: Scan) -> Row:
+        row: Row = {}
+        for field in self._schema.get_fields():
+            if self._schema.get_type(field) == FieldType.Vector:
+                row[field] = source_scan.get_vector(field)
             else:
-                has_more_right = self._copy(source_right, dest_scan)
+                row[field] = source_scan.get_value(field)
+        return row
+
+    def _write_row(self, row: Row, dest: UpdateScan) -> None:
+        dest.insert()
+        for field_name, value in row.items():
+            if isinstance(value, list):
+                dest.set_vector(field_name, value)
+            else:
+                dest.set_value(field_name, value)
+
+    def _do_a_merge_iteration(self, runs: list[TempTable], fan_in: int) -> list[TempTable]:
+        return [self._merge_runs(runs[i : i + fan_in]) for i in range(0, len(runs), fan_in)]
 
-        while has_more_left:
-            has_more_left = self._copy(source_left, dest_scan)
+    def _merge_runs(self, runs: list[TempTable]) -> TempTable:
+        """複数のランをk-wayマージして1つのランにする"""
+        if len(runs) == 1:
+            return runs[0]
 
-        while has_more_right:
-            has_more_right = self._copy(source_right, dest_scan)
+        source = SortScan(runs, self.comparator)
+        result_temp_table = TempTable(self.transaction, self._schema)
+        dest_scan = result_temp_table.open()
 
-        source_left.close()
-        source_right.close()
-        dest_scan.before_first()
+        while source.next():
+            assert source.current_scan is not None
+            self._copy(source.current_scan, dest_scan)
 
+        source.close()
+        dest_scan.close()
         return result_temp_table
 
-    def _copy(self, source: Scan, dest_scan: UpdateScan) -> bool:
+    def _copy(self, source: Scan, dest_scan: UpdateScan) -> None:
         dest_scan.insert()
+        if isinstance(source, TableScan) and isinstance(dest_scan, TableScan):
+            # 一時テーブル同士はフィールドを取り出さずにスロットをそのままコピーする
+            dest_scan.copy_record_from(source)
+            return
+
         for field_name in self._schema.get_fields():
-            dest_scan.set_value(field_name, source.get_value(field_name))
-        return source.next()
+            if self._schema.get_type(field_name) == FieldType.Vector:
+                dest_scan.set_vector(field_name, source.get_vector(field_name))
+            else:
+                dest_scan.set_value(field_name, source.get_value(field_name))
 
     def schema(self) -> Schema:
         return self.source_plan.schema()
@@ -1,5 +1,6 @@
+import heapq
 from abc import ABC
-from typing import Optional
+from typing import Any, Optional
 
 from db.materialize.record_comparator import RecordComparator
 from db.materialize.temp_table import TempTable
@@ -8,63 +9,50 @@ from db.query.scan import Scan
 from db.query.update_scan import UpdateScan
 from db.record.record_id import RecordID
 
+# 各ランの現在の行のソートキーと、ランの番号
+type MergeEntry = tuple[tuple[Any, ...], int]
+
 
 class SortScan(Scan, ABC):
+    """ソート済みのランをヒープでk-wayマージしながら返すスキャン
+
+    ヒープには現在の行を返しているラン以外の、まだ行が残っているランを置く
+    """
 
     def __init__(self, runs: list[TempTable], comparator: RecordComparator) -> None:
-        sorted_first = runs[0].open()
-        sorted_second = runs[1].open() if len(runs) > 1 else None
-        self.scan_first = sorted_first
-        self.scan_second: Optional[UpdateScan] = sorted_second
-        self.current_scan: Optional[UpdateScan] = None
+        self.scans: list[UpdateScan] = [run.open() for run in runs]
         self.comparator = comparator
-
-        self.has_more_first = self.scan_first.next()
-        self.has_more_second = self.scan_second.next() if self.scan_second else False
+        self.current_scan: Optional[UpdateScan] = None
+        self.current_index = -1
+        self.heap: list[MergeEntry] = []
+        # ランごとの保存した位置。行が残っていなかったランはNone
         self.saved_position: list[Optional[RecordID]] = []
+        self.saved_index = -1
+        self._fill_heap()
 
     def before_first(self) -> None:
         self.current_scan = None
-        self.scan_first.before_first()
-        self.has_more_first = self.scan_first.next()
-
-        if self.scan_second:
-            self.scan_second.before_first()
-            self.has_more_second = self.scan_second.next()
+        self.current_index = -1
+        for scan in self.scans:
+            scan.before_first()
+        self._fill_heap()
 
     def next(self) -> bool:
+        if self.current_scan is not None and self.current_scan.next():
+            heapq.heappush(self.heap, self._entry(self.current_index))
 
-        if self.current_scan:
-            if self.current_scan == self.scan_first:
-                self.has_more_first = self.scan_first.next()
-            elif self.current_scan == self.scan_second:
-                self.has_more_second = self.scan_second.next()
-
-        if not self.has_more_first and not self.has_more_second:
+        if not self.heap:
+            self.current_scan = None
+            self.current_index = -1
             return False
 
-        if not self.has_more_first and not self.has_more_second:
-            return False
-
-        if self.has_more_first and self.has_more_second:
-            if self.scan_first and self.scan_second:
-                self.current_scan = (
-                    self.scan_first
-                    if self.comparator.compare(self.scan_first, self.scan_second) < 0
-                    else self.scan_second
-                )
-
-        elif self.has_more_first:
-            self.current_scan = self.scan_first
-        elif self.has_more_second:
-            self.current_scan = self.scan_second
-
+        _, self.current_index = heapq.heappop(self.heap)
+        self.current_scan = self.scans[self.current_index]
         return True
 
     def close(self) -> None:
-        self.scan_first.close()
-        if self.scan_second:
-            self.scan_second.close()
+        for scan in self.scans:
+            scan.close()
 
     def get_value(self, field: str) -> Constant:
 
@@ -101,22 +89,35 @@ class SortScan(Scan, ABC):
         raise RuntimeError("No current scan is selected")
 
     def save_position(self) -> None:
-
-        record_id_first = self.scan_first.get_rid()
-        record_id_second = self.scan_second.get_rid() if self.scan_second else None
-
-        self.saved_position = [record_id_first, record_id_second]
+        in_heap = {index for _, index in self.heap}
+        self.saved_position = [
+            scan.get_rid() if index in in_heap or index == self.current_index else None
+            for index, scan in enumerate(self.scans)
+        ]
+        self.saved_index = self.current_index
 
     def restore_position(self) -> None:
 
         if not self.saved_position:
             raise RuntimeError("No position saved")
 
-        first_position = self.saved_position[0]
-        second_position = self.saved_position[1]
-
-        if first_position is not None:
-            self.scan_first.move_to_rid(first_position)
-
-        if self.scan_second and first_position and second_position:
-            self.scan_second.move_to_rid(first_position)
+        self.heap = []
+        for index, rid in enumerate(self.saved_position):
+            if rid is None:
+                continue
+            self.scans[index].move_to_rid(rid)
+            if index != self.saved_index:
+                self.heap.append(self._entry(index))
+        heapq.heapify(self.heap)
+
+        self.current_index = self.saved_index
+        self.current_scan = self.scans[self.saved_index] if self.saved_index >= 0 else None
+
+    def _fill_heap(self) -> None:
+        """各ランの先頭の行をヒープに置く"""
+        self.heap = [self._entry(index) for index, scan in enumerate(self.scans) if scan.next()]
+        heapq.heapify(self.heap)
+
+    def _entry(self, index: int) -> MergeEntry:
+        # キーが等しい行はランの番号順に返し、ソートを安定にする
+        return self.comparator.key(self.scans[index]), index
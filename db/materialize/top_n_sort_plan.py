@@ -0,0 +1,54 @@
+import heapq
+from itertools import count
+from typing import Iterator
+
+from db.materialize.sort_plan import Row, SortPlan
+from db.materialize.temp_table import TempTable
+from db.parse.query_data import OrderByField
+from db.plan.plan import Plan
+from db.query.scan import Scan
+from db.transaction.transaction import Transaction
+
+
+class TopNSortPlan(SortPlan):
+    """ORDER BYの先頭limit行だけを求める計画
+
+    入力を一度だけ読み、上位limit行を大きさlimitのヒープに保つ。
+    結果の行だけを一時テーブルに書き出すので、全体をランに書き出してマージする必要がない
+    """
+
+    def __init__(
+        self, transaction: Transaction, source_plan: Plan, sort_fields: list[OrderByField], limit: int
+    ) -> None:
+        super().__init__(transaction, source_plan, sort_fields)
+        self.limit = limit
+
+    def open(self) -> Scan:
+        source_scan = self.source_plan.open()
+        # キーが等しい行は読み込んだ順に並べる
+        rows = heapq.nsmallest(self.limit, self._keyed_rows(source_scan))
+        source_scan.close()
+
+        temp = TempTable(self.transaction, self._schema)
+        destination_scan = temp.open()
+        for _, _, row in rows:
+            self._write_row(row, destination_scan)
+
+        destination_scan.before_first()
+        return destination_scan
+
+    def fits_in_memory(self) -> bool:
+        """上位limit行がラン作成時と同じメモリ量に収まるか"""
+        return self.limit <= self.records_in_memory()
+
+    def records_output(self) -> int:
+        return min(self.limit, self.source_plan.records_output())
+
+    def blocks_accessed(self) -> int:
+        return self.source_plan.blocks_accessed()
+
+    def _keyed_rows(self, source_scan: Scan) -> Iterator[tuple[tuple[object, ...], int, Row]]:
+        sequence = count()
+        while source_scan.next():
+            row = self._read_row(source_scan)
+            yield self.comparator.compare_row(row), next(sequence), row
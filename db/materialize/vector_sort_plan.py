@@ -1,5 +1,6 @@
+import heapq
 from abc import ABC
-from typing import Optional, cast
+from typing import Iterator, Optional, cast
 
 from db.constants import FieldType
 from db.index.vector_index import VectorIndex
@@ -9,6 +10,7 @@ from db.plan.plan import Plan
 from db.query.constant import Constant
 from db.query.scan import Scan
 from db.query.vector import Vector, cosine_distance
+from db.query.vector_store import cosine_distances
 from db.record.schema import Schema
 from db.record.table_scan import TableScan
 from db.transaction.transaction import Transaction
@@ -17,21 +19,32 @@ type VectorSearchResult = tuple[float, dict[str, Constant | Vector]]
 
 
 class VectorSortPlan(Plan, ABC):
+    # 線形探索で一度に距離を計算する行数
+    DISTANCE_BATCH = 256
+
     def __init__(
         self,
         transaction: Transaction,
         plan: Plan,
         vector_order_by: VectorOrderBy,
         vector_index: Optional[VectorIndex] = None,
+        field_names: Optional[list[str]] = None,
+        limit: Optional[int] = None,
     ) -> None:
+        """field_namesを指定すると、そのフィールドだけを一時テーブルにコピーする
+
+        limitを指定すると、距離が近い順にlimit行だけを求める
+        """
         super().__init__()
         self.transaction = transaction
         self.plan = plan
         self.vector_order_by = vector_order_by
         self.vector_index = vector_index
+        self.limit = limit
+        self._schema = plan.schema() if field_names is None else plan.schema().project(field_names)
 
     def open(self) -> Scan:
-        schema = self.plan.schema()
+        schema = self._schema
         field_name = self.vector_order_by.field_name
         query_vector = self.vector_order_by.query_vector
 
@@ -56,12 +69,14 @@ class VectorSortPlan(Plan, ABC):
         return destination_scan
 
     def schema(self) -> Schema:
-        return self.plan.schema()
+        return self._schema
 
     def distinct_values(self, field_name: str) -> int:
         return self.plan.distinct_values(field_name)
 
     def records_output(self) -> int:
+        if self.limit is not None:
+            return min(self.limit, self.plan.records_output())
         return self.plan.records_output()
 
     def blocks_accessed(self) -> int:
@@ -70,30 +85,49 @@ class VectorSortPlan(Plan, ABC):
     def _search_by_linear(self, schema: Schema, field_name: str, query_vector: list[float]) -> list[VectorSearchResult]:
 
         source_scan = self.plan.open()
-        rows: list[VectorSearchResult] = []
-
-        while source_scan.next():
-            row: dict[str, Constant | Vector] = {}
-            for f in schema.get_fields():
-                if schema.get_type(f) == FieldType.Vector:
-                    row[f] = source_scan.get_vector(f)
-                else:
-                    row[f] = source_scan.get_value(f)
-
-            vector = source_scan.get_vector(field_name)
-            distance = cosine_distance(vector, query_vector)
-            rows.append((distance, row))
+        rows = self._distances(source_scan, schema, field_name, query_vector)
+        if self.limit is not None:
+            # 上位limit行だけを大きさlimitのヒープに保つ
+            result = heapq.nsmallest(self.limit, rows, key=lambda x: x[0])
+        else:
+            result = sorted(rows, key=lambda x: x[0])
 
         source_scan.close()
-        rows.sort(key=lambda x: x[0])
-        return rows
+        return result
+
+    @classmethod
+    def _distances(
+        cls, source_scan: Scan, schema: Schema, field_name: str, query_vector: list[float]
+    ) -> Iterator[VectorSearchResult]:
+        """行をDISTANCE_BATCH行ずつ読み、まとめて距離を計算する"""
+        rows: list[dict[str, Constant | Vector]] = []
+        vectors: list[Vector] = []
+        while True:
+            has_more = source_scan.next()
+            if has_more:
+                row: dict[str, Constant | Vector] = {}
+                for f in schema.get_fields():
+                    if schema.get_type(f) == FieldType.Vector:
+                        row[f] = source_scan.get_vector(f)
+                    else:
+                        row[f] = source_scan.get_value(f)
+                rows.append(row)
+                vectors.append(source_scan.get_vector(field_name))
+
+            if len(rows) == cls.DISTANCE_BATCH or (not has_more and rows):
+                yield from zip(cosine_distances(query_vector, vectors), rows)
+                rows = []
+                vectors = []
+
+            if not has_more:
+                return
 
     def _search_by_index(self, schema: Schema, field_name: str, query_vector: Vector) -> list[VectorSearchResult]:
 
         if self.vector_index is None:
             raise RuntimeError("Vector index is not provided for index-based search")
 
-        k = self.vector_index.default_k
+        k = self.vector_index.default_k if self.limit is None else self.limit
         records_ids = self.vector_index.search(query_vector, k=k)
         source_scan = self.plan.open()
         table_scan = cast(TableScan, source_scan)
@@ -1,9 +1,11 @@
 from typing import Optional
 
-from db.constants import FieldType
+from db.constants import ByteSize, FieldType
 from db.index.btree.btree_index import BtreeIndex
 from db.index.hash.hash_index import HashIndex
 from db.index.hnsw.hnsw_index import HNSWIndex
+from db.index.hnsw.hnsw_store import HNSWStore
+from db.index.hnsw.persistent_hnsw_index import PersistentHNSWIndex, VectorGraphs
 from db.index.index import Index
 from db.index.vector_index import VectorIndex
 from db.metadata.stat_info import StatInfo
@@ -14,7 +16,13 @@ from db.transaction.transaction import Transaction
 
 class IndexDef:
     def __init__(
-        self, index_name: str, field_name: str, table_schema: Schema, stat_info: StatInfo, index_type: str = "hash"
+        self,
+        index_name: str,
+        field_name: str,
+        table_schema: Schema,
+        stat_info: StatInfo,
+        index_type: str = "hash",
+        vector_graphs: Optional[VectorGraphs] = None,
     ) -> None:
         self.index_name = index_name
         self.field_name = field_name
@@ -22,7 +30,8 @@ class IndexDef:
         self.index_layout = self._create_index_layout()
         self.stat_info = stat_info
         self.index_type = index_type
-        self._vector_index: Optional[VectorIndex] = None
+        # 読み込んだHNSWのグラフ。IndexManagerから渡されれば、IndexDefを作り直しても共有される
+        self.vector_graphs = VectorGraphs() if vector_graphs is None else vector_graphs
 
     def open(self, transaction: Transaction) -> Index:
         """インデックスを開く"""
@@ -30,12 +39,21 @@ class IndexDef:
             return BtreeIndex(transaction, self.index_name, self.index_layout)
         return HashIndex(transaction, self.index_name, self.index_layout)
 
-    def open_vector(self) -> VectorIndex:
-        """ベクトルインデックスを開く"""
-        if self._vector_index is None:
-            self._vector_index = HNSWIndex()
+    def open_vector(self, transaction: Transaction) -> VectorIndex:
+        """ベクトルインデックスを開く
 
-        return self._vector_index
+        グラフは初めて開いたときと、挿入したトランザクションがロールバックしてグラフが捨てられた後にだけ
+        ディスクから読み込む。ノード数はヘッダの行に保存されており、読み込むときに一度だけ読む
+        """
+        with self.vector_graphs.lock(self.index_name):
+            if self.index_name not in self.vector_graphs.graphs:
+                graph = HNSWIndex()
+                dimensions = self.table_schema.get_length(self.field_name) // ByteSize.Float
+                store = HNSWStore(self.index_name, dimensions, graph.base_layer_max_conn)
+                store.load(transaction, graph)
+                self.vector_graphs.graphs[self.index_name] = (graph, store)
+
+        return PersistentHNSWIndex(transaction, self.index_name, self.vector_graphs)
 
     def blocks_accessed(self, transaction: Transaction) -> int:
         """アクセスしたブロック数を返す"""
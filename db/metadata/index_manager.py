@@ -1,3 +1,4 @@
+from db.index.hnsw.persistent_hnsw_index import VectorGraphs
 from db.metadata.index_def import IndexDef
 from db.metadata.stat_manager import StatManager
 from db.metadata.table_manager import TableManager
@@ -22,6 +23,8 @@ class IndexManager:
         self.table_manager = table_manager
         self.stat_manager = stat_manager
         self.layout = table_manager.get_layout("index_catalog", transaction)
+        # HNSWのグラフはクエリごとにIndexDefを作り直しても読み込み直さないように共有する
+        self.vector_graphs = VectorGraphs()
 
     def create_index(
         self,
@@ -43,17 +46,23 @@ class IndexManager:
         # 2. 実際のインデックス構造を作成
         table_layout = self.table_manager.get_layout(table_name, transaction)
         stat_info = self.stat_manager.get_stat_info(table_name, transaction)
-        index_info = IndexDef(index_name, field_name, table_layout.schema, stat_info, index_type)
-        hash_index = index_info.open(transaction)
+        index_info = IndexDef(index_name, field_name, table_layout.schema, stat_info, index_type, self.vector_graphs)
 
         # 3. 既存のデータでインデックスを埋める
         data_scan = TableScan(transaction, table_name, table_layout)
-        while data_scan.next():
-            dataval = data_scan.get_value(field_name)
-            rid = data_scan.get_rid()
-            hash_index.insert(dataval, rid)
+        if index_type == "hnsw":
+            vector_index = index_info.open_vector(transaction)
+            while data_scan.next():
+                vector_index.insert(data_scan.get_vector(field_name), data_scan.get_rid())
+            vector_index.close()
+        else:
+            hash_index = index_info.open(transaction)
+            while data_scan.next():
+                dataval = data_scan.get_value(field_name)
+                rid = data_scan.get_rid()
+                hash_index.insert(dataval, rid)
+            hash_index.close()
         data_scan.close()
-        hash_index.close()
 
     def get_index_info(self, table_name: str, transaction: Transaction) -> dict[str, IndexDef]:
 
@@ -67,7 +76,9 @@ class IndexManager:
                 table_layout = self.table_manager.get_layout(table_name, transaction)
                 stat_info = self.stat_manager.get_stat_info(table_name, transaction)
                 indextype = table_scan.get_string("index_type")
-                index_info = IndexDef(index_name, field_name, table_layout.get_schema(), stat_info, indextype)
+                index_info = IndexDef(
+                    index_name, field_name, table_layout.get_schema(), stat_info, indextype, self.vector_graphs
+                )
                 result[field_name] = index_info
 
         table_scan.close()
@@ -1,4 +1,4 @@
-from threading import Lock
+from threading import RLock
 
 from db.metadata.stat_info import StatInfo
 from db.metadata.table_manager import TableManager
@@ -12,7 +12,7 @@ class StatManager:
         self.table_manager = table_manager
         self.table_stats: dict[str, StatInfo] = {}
         self.num_calls = 0
-        self.lock = Lock()
+        self.lock = RLock()
         # Don't refresh on init - let it be lazy loaded
         # self.refresh_statistics(transaction)
 
@@ -1,11 +1,15 @@
 from abc import ABC
+from typing import Optional
 
+from db.buffer.buffer_ring import BufferRing
 from db.constants import ByteSize, FieldType
 from db.file.block_id import BlockID
+from db.query.batch import Batch
 from db.query.constant import Constant
 from db.query.scan import Scan
 from db.record.layout import Layout
 from db.record.record_page import RecordPage
+from db.record.schema import Schema
 from db.transaction.transaction import Transaction
 
 
@@ -13,7 +17,13 @@ class ChunkScan(Scan, ABC):
     INVALID_SLOT = -1
 
     def __init__(
-        self, transaction: Transaction, file_name: str, layout: Layout, start_block: int, end_block: int
+        self,
+        transaction: Transaction,
+        file_name: str,
+        layout: Layout,
+        start_block: int,
+        end_block: int,
+        ring: Optional[BufferRing] = None,
     ) -> None:
         super().__init__()
         self.transaction = transaction
@@ -24,13 +34,13 @@ class ChunkScan(Scan, ABC):
         self.current_block = start_block
         self.buffers: list[RecordPage] = []
         self.current_slot = self.INVALID_SLOT
-        self.record_page: RecordPage = RecordPage(transaction, BlockID(file_name, start_block), layout)
+        self.record_page: RecordPage = RecordPage(transaction, BlockID(file_name, start_block), layout, ring)
 
         inclusive_end_block = end_block + 1
 
         for block_number in range(start_block, inclusive_end_block):
             block = BlockID(file_name, block_number)
-            self.buffers.append(RecordPage(transaction, block, layout))
+            self.buffers.append(RecordPage(transaction, block, layout, ring))
 
         self._move_to_block(start_block)
 
@@ -54,6 +64,20 @@ class ChunkScan(Scan, ABC):
 
         return True
 
+    def next_batch(self, n: int, schema: Optional[Schema] = None) -> Batch:
+        """チャンク内の次の最大n行をページ単位でまとめて読む"""
+        batch = Batch(self.layout.get_schema())
+        while len(batch) < n:
+            last_slot, _ = self.record_page.read_batch(self.current_slot, n - len(batch), batch)
+            if last_slot >= 0:
+                self.current_slot = last_slot
+                continue
+            if self.current_block == self.end_block:
+                break
+            self._move_to_block(self.current_block + 1)
+
+        return batch
+
     def get_int(self, field_name: str) -> int:
         return self.record_page.get_int(self.current_slot, field_name)
 
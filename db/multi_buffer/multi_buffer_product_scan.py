@@ -1,6 +1,7 @@
 from abc import ABC
 from typing import Optional
 
+from db.buffer.buffer_ring import BufferRing
 from db.multi_buffer.buffer_needs import BufferNeeds
 from db.multi_buffer.chunk_scan import ChunkScan
 from db.query.constant import Constant
@@ -21,6 +22,8 @@ class MultiBufferProductScan(Scan, ABC):
         self.file_size = self.transaction.available_buffers()
         self.available = self.transaction.available_buffers()
         self.chunk_size = BufferNeeds.best_factor(self.available, self.file_size)
+        # 次のチャンクは前のチャンクが使ったバッファに読み込む
+        self.ring = BufferRing(self.chunk_size)
         self.next_block_number = self.NO_BLOCKS
         self.right_scan: Optional[Scan] = None
         self.product_scan: Optional[ProductScan] = None
@@ -80,7 +83,9 @@ class MultiBufferProductScan(Scan, ABC):
             self.right_scan.close()
 
         end_block = min(self.next_block_number + self.chunk_size - 1, self.file_size - 1)
-        self.right_scan = ChunkScan(self.transaction, self.table_name, self.layout, self.next_block_number, end_block)
+        self.right_scan = ChunkScan(
+            self.transaction, self.table_name, self.layout, self.next_block_number, end_block, self.ring
+        )
         self.left_scan.before_first()
         self.product_scan = ProductScan(self.left_scan, self.right_scan)
         self.next_block_number = end_block + 1
@@ -19,8 +19,11 @@ class HeuristicQueryPlanner(QueryPlanner, ABC):
 
     def create_plan(self, query_data: QueryData, transaction: Transaction) -> Plan:
 
+        field_names = query_data.required_fields()
         for table_name in query_data.get_tables():
-            table_planner = TablePlanner(table_name, query_data.get_predicate(), transaction, self.metadata_manager)
+            table_planner = TablePlanner(
+                table_name, query_data.get_predicate(), transaction, self.metadata_manager, field_names
+            )
             self.table_planners.append(table_planner)
 
         current_plan = self._get_lowest_select_plan()
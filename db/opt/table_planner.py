@@ -1,7 +1,9 @@
 from typing import Optional
 
+from db.constants import FieldType
 from db.index.planner.index_join_plan import IndexJoinPlan
 from db.index.planner.index_select_plan import IndexSelectPlan
+from db.materialize.hash_join_plan import HashJoinPlan
 from db.metadata.index_def import IndexDef
 from db.metadata.metadata_manager import MetadataManager
 from db.multi_buffer.multi_buffer_product_plan import MultiBufferProductPlan
@@ -16,11 +18,16 @@ from db.transaction.transaction import Transaction
 class TablePlanner:
 
     def __init__(
-        self, table_name: str, predicate: Predicate, transaction: Transaction, metadata_manager: MetadataManager
+        self,
+        table_name: str,
+        predicate: Predicate,
+        transaction: Transaction,
+        metadata_manager: MetadataManager,
+        field_names: Optional[list[str]] = None,
     ) -> None:
         self.predicate = predicate
         self.transaction = transaction
-        self.my_plan = TablePlan(transaction, table_name, metadata_manager)
+        self.my_plan = TablePlan(transaction, table_name, metadata_manager, field_names)
         self.my_schema = self.my_plan.schema()
         self.indexes: dict[str, IndexDef] = metadata_manager.get_index_info(table_name, transaction)
 
@@ -38,10 +45,15 @@ class TablePlanner:
             return None
 
         plan = self._make_index_join(current, current_schema)
-        if plan is None:
-            plan = self._make_product_join(current, current_schema)
+        if plan is not None:
+            return plan
 
-        return plan
+        # 索引がなければ、ハッシュ結合と直積のうち読むブロック数が少ない方を選ぶ
+        product_plan = self._make_product_join(current, current_schema)
+        hash_plan = self._make_hash_join(current, current_schema)
+        if hash_plan is not None and hash_plan.blocks_accessed() <= product_plan.blocks_accessed():
+            return hash_plan
+        return product_plan
 
     def make_product_plan(self, current: Plan) -> Plan:
         plan = self._add_select_predicate(self.my_plan)
@@ -69,6 +81,24 @@ class TablePlanner:
 
         return None
 
+    def _make_hash_join(self, current: Plan, current_schema: Schema) -> Optional[Plan]:
+        """結合条件に等号で結ばれたフィールドがあれば、行数の少ない方をビルド側にしたハッシュ結合を返す"""
+        for field_name in self.my_schema.get_fields():
+            outer_field = self.predicate.equates_with_field(field_name)
+            if outer_field is None or not current_schema.has_field(outer_field):
+                continue
+            if FieldType.Vector in (self.my_schema.get_type(field_name), current_schema.get_type(outer_field)):
+                continue
+
+            table_plan = self._add_select_predicate(self.my_plan)
+            if table_plan.records_output() <= current.records_output():
+                plan = HashJoinPlan(self.transaction, table_plan, current, field_name, outer_field)
+            else:
+                plan = HashJoinPlan(self.transaction, current, table_plan, outer_field, field_name)
+            return self._add_join_predicate(plan, current_schema, (field_name, outer_field))
+
+        return None
+
     def _make_product_join(self, current: Plan, current_schema: Schema) -> Plan:
         product_plan = self.make_product_plan(current)
         return self._add_join_predicate(product_plan, current_schema)
@@ -81,9 +111,17 @@ class TablePlanner:
 
         return plan
 
-    def _add_join_predicate(self, plan: Plan, current_schema: Schema) -> Plan:
+    def _add_join_predicate(
+        self, plan: Plan, current_schema: Schema, join_fields: Optional[tuple[str, str]] = None
+    ) -> Plan:
+        """結合条件の項で絞り込む。join_fieldsの2つのフィールドが等しいことは結合が保証するので、その項は除く"""
         join_predicate = self.predicate.join_sub_predicate(self.my_schema, current_schema)
 
+        if join_predicate is not None and join_fields is not None:
+            field_name, outer_field = join_fields
+            terms = [term for term in join_predicate.terms if term.equates_with_field(field_name) != outer_field]
+            join_predicate = Predicate(terms) if terms else None
+
         if join_predicate is not None:
             return SelectPlan(plan, join_predicate)
 
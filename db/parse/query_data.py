@@ -44,6 +44,13 @@ class QueryData:
     def get_predicate(self) -> Predicate:
         return self.predicate
 
+    def required_fields(self) -> list[str]:
+        """クエリの実行に必要なフィールドを返す。テーブルからはこれ以外のフィールドを読み出さない"""
+        field_names = set(self.fields) | self.predicate.field_names()
+        for order_by in self.get_order_by():
+            field_names.add(order_by.field_name)
+        return sorted(field_names)
+
     def get_order_by(self) -> list[OrderByField | VectorOrderBy]:
         return self.order_by
 
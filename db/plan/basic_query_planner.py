@@ -20,6 +20,7 @@ class BasicQueryPlanner(QueryPlanner, ABC):
 
     def create_plan(self, query_data: QueryData, transaction: Transaction) -> Plan:
 
+        field_names = query_data.required_fields()
         plan_list: list[Plan] = []
         for table_name in query_data.tables:
 
@@ -32,7 +33,7 @@ class BasicQueryPlanner(QueryPlanner, ABC):
                 plan_list.append(self.create_plan(view_query, transaction))
             else:
 
-                plan_list.append(TablePlan(transaction, table_name, self.metadata_manager))
+                plan_list.append(TablePlan(transaction, table_name, self.metadata_manager, field_names))
 
         plan = plan_list.pop(0)
 
@@ -51,9 +52,11 @@ class BasicQueryPlanner(QueryPlanner, ABC):
             if vector_order.field_name in index_info_map:
                 index_def = index_info_map[vector_order.field_name]
                 if index_def.index_type == "hnsw":
-                    vector_index = index_def.open_vector()
+                    vector_index = index_def.open_vector(transaction)
 
-            plan = VectorSortPlan(transaction, plan, vector_order, vector_index)
+            plan = VectorSortPlan(
+                transaction, plan, vector_order, vector_index, query_data.get_fields(), query_data.get_limit()
+            )
 
         fields = query_data.get_fields()
 
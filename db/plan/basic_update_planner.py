@@ -85,7 +85,7 @@ class BasicUpdatePlanner(UpdatePlanner, ABC):
             if schema.get_type(field_name) == FieldType.Vector:
                 vector = parse_vector_literal(str(value))
                 scan.set_vector(field_name, vector)
-                self._update_vector_index(field_name, vector, scan.get_rid(), indexes)
+                self._update_vector_index(field_name, vector, scan.get_rid(), indexes, transaction)
 
             else:
                 scan.set_value(field_name, value)
@@ -112,12 +112,16 @@ class BasicUpdatePlanner(UpdatePlanner, ABC):
 
     @staticmethod
     def _update_vector_index(
-        field_name: str, vector: Vector, record_id: RecordID, indexes: dict[str, IndexDef]
+        field_name: str,
+        vector: Vector,
+        record_id: RecordID,
+        indexes: dict[str, IndexDef],
+        transaction: Transaction,
     ) -> None:
         if field_name not in indexes:
             return
         index_def = indexes[field_name]
         if index_def.index_type != "hnsw":
             return
-        vector_index = index_def.open_vector()
+        vector_index = index_def.open_vector(transaction)
         vector_index.insert(vector, record_id)
@@ -1,5 +1,6 @@
 from db.materialize.limit_plan import LimitPlan
 from db.materialize.sort_plan import SortPlan
+from db.materialize.top_n_sort_plan import TopNSortPlan
 from db.parse.create_index import CreateIndex
 from db.parse.create_table import CreateTable
 from db.parse.create_view import CreateView
@@ -31,10 +32,15 @@ class Planner:
         order_by = data.get_order_by()
         sort_fields = [f for f in order_by if isinstance(f, OrderByField)]
 
+        limit = data.get_limit()
+        if sort_fields and limit is not None:
+            top_n_plan = TopNSortPlan(transaction, plan, sort_fields, limit)
+            if top_n_plan.fits_in_memory():
+                return top_n_plan
+
         if sort_fields:
             plan = SortPlan(transaction, plan, sort_fields)
 
-        limit = data.get_limit()
         if limit is not None:
             plan = LimitPlan(plan, limit)
 
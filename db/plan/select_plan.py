@@ -5,6 +5,7 @@ from db.query.predicate import Predicate
 from db.query.scan import Scan
 from db.query.select_scan import SelectScan
 from db.record.schema import Schema
+from db.record.table_scan import TableScan
 
 
 class SelectPlan(Plan, ABC):
@@ -15,7 +16,13 @@ class SelectPlan(Plan, ABC):
 
     def open(self) -> Scan:
         scan = self.plan.open()
-        return SelectScan(scan, self.predicate)
+        predicate = self.predicate
+        if isinstance(scan, TableScan):
+            # テーブルのフィールドだけを参照する項はTableScanでスロットのまま評価する
+            row_predicate, predicate = predicate.split_row_predicate(scan.layout.get_schema())
+            if row_predicate is not None:
+                scan.set_filter(row_predicate)
+        return SelectScan(scan, predicate, self.plan.schema())
 
     def blocks_accessed(self) -> int:
         return self.plan.blocks_accessed()
@@ -1,4 +1,5 @@
 from abc import ABC
+from typing import Optional
 
 from db.metadata.metadata_manager import MetadataManager
 from db.plan.plan import Plan
@@ -10,15 +11,27 @@ from db.transaction.transaction import Transaction
 
 class TablePlan(Plan, ABC):
 
-    def __init__(self, transaction: Transaction, table_name: str, metadata_manager: MetadataManager) -> None:
+    def __init__(
+        self,
+        transaction: Transaction,
+        table_name: str,
+        metadata_manager: MetadataManager,
+        field_names: Optional[list[str]] = None,
+    ) -> None:
+        """field_namesを指定すると、上位の計画が必要とするフィールドだけを読み出す"""
         super().__init__()
         self.table_name = table_name
         self.transaction = transaction
         self.layout = metadata_manager.get_layout(table_name, transaction)
         self.stat_info = metadata_manager.get_stat_info(table_name, transaction)
+        self.field_names: Optional[list[str]] = None
+        self._schema = self.layout.schema
+        if field_names is not None:
+            self._schema = self.layout.schema.project(field_names)
+            self.field_names = self._schema.get_fields()
 
     def open(self) -> Scan:
-        return TableScan(self.transaction, self.table_name, self.layout)
+        return TableScan(self.transaction, self.table_name, self.layout, self.field_names)
 
     def blocks_accessed(self) -> int:
         return self.stat_info.blocks_accessed()
@@ -30,4 +43,4 @@ class TablePlan(Plan, ABC):
         return self.stat_info.distinct_values()
 
     def schema(self) -> Schema:
-        return self.layout.schema
+        return self._schema
@@ -0,0 +1,109 @@
+from array import array
+from typing import Iterable, Mapping
+
+from db.constants import ByteSize, FieldType
+from db.query.constant import Constant
+from db.record.schema import Schema
+
+type Column = array[int] | array[float] | list[str]
+
+
+class Batch:
+    """next_batchが返す複数行を列ごとにまとめたもの
+
+    整数の列はarray('i')、文字列の列はlist、ベクトルの列は全行の要素を順に並べた1本のarray('f')で持つ
+    """
+
+    def __init__(self, schema: Schema) -> None:
+        self.schema = schema
+        self.size = 0
+        self.columns: dict[str, Column] = {
+            field_name: self._new_column(schema.get_type(field_name)) for field_name in schema.get_fields()
+        }
+
+    def __len__(self) -> int:
+        return self.size
+
+    def column(self, field_name: str) -> Column:
+        """指定されたフィールドの列を返す"""
+        return self.columns[field_name]
+
+    def dimensions(self, field_name: str) -> int:
+        """ベクトルのフィールドの次元数を返す"""
+        return self.schema.get_length(field_name) // ByteSize.Float
+
+    def get_int(self, row: int, field_name: str) -> int:
+        value = self.columns[field_name][row]
+        assert isinstance(value, int)
+        return value
+
+    def get_string(self, row: int, field_name: str) -> str:
+        value = self.columns[field_name][row]
+        assert isinstance(value, str)
+        return value
+
+    def get_vector(self, row: int, field_name: str) -> list[float]:
+        dimensions = self.dimensions(field_name)
+        column = self.columns[field_name]
+        assert isinstance(column, array)
+        return [float(value) for value in column[row * dimensions : (row + 1) * dimensions]]
+
+    def get_value(self, row: int, field_name: str) -> Constant:
+        field_type = self.schema.get_type(field_name)
+        if field_type == FieldType.Integer:
+            return Constant(self.get_int(row, field_name))
+        elif field_type == FieldType.Varchar:
+            return Constant(self.get_string(row, field_name))
+        elif field_type == FieldType.Vector:
+            raise ValueError("Vector fields cannot be converted to Constant")
+        else:
+            raise ValueError(f"Unknown field type {field_type}")
+
+    def extend(self, columns: Mapping[str, Iterable[int] | Iterable[float] | Iterable[str]], count: int) -> None:
+        """列ごとの値をまとめて追加する。countは追加する行数"""
+        for field_name, values in columns.items():
+            self.columns[field_name].extend(values)  # type: ignore[arg-type]
+        self.size += count
+
+    def append(self, other: "Batch") -> None:
+        """同じフィールドを持つ別のバッチの行を後ろに追加する"""
+        self.extend({field_name: other.columns[field_name] for field_name in self.columns}, other.size)
+
+    def select(self, field_names: list[str]) -> "Batch":
+        """指定されたフィールドの列だけを持つバッチを返す。列はコピーせずに共有する"""
+        schema = Schema()
+        for field_name in field_names:
+            if not self.schema.has_field(field_name):
+                raise RuntimeError(f"field '{field_name}' not in batch")
+            schema.add(field_name, self.schema)
+
+        batch = Batch(schema)
+        batch.columns = {field_name: self.columns[field_name] for field_name in field_names}
+        batch.size = self.size
+        return batch
+
+    def take(self, rows: list[int]) -> "Batch":
+        """指定された行だけを順に並べたバッチを返す"""
+        batch = Batch(self.schema)
+        for field_name, column in self.columns.items():
+            target = batch.columns[field_name]
+            if self.schema.get_type(field_name) == FieldType.Vector:
+                assert isinstance(column, array) and isinstance(target, array)
+                dimensions = self.dimensions(field_name)
+                for row in rows:
+                    target.extend(column[row * dimensions : (row + 1) * dimensions])
+            else:
+                target.extend(column[row] for row in rows)  # type: ignore[misc]
+        batch.size = len(rows)
+        return batch
+
+    @staticmethod
+    def _new_column(field_type: int) -> Column:
+        if field_type == FieldType.Integer:
+            return array("i")
+        elif field_type == FieldType.Varchar:
+            return []
+        elif field_type == FieldType.Vector:
+            return array("f")
+        else:
+            raise ValueError(f"Unknown field type {field_type}")
@@ -0,0 +1,46 @@
+from abc import ABC
+from typing import Optional
+
+from db.query.batch import Batch
+from db.query.constant import Constant
+from db.query.scan import Scan
+from db.record.schema import Schema
+
+
+class BatchScan(Scan, ABC):
+    """バッチの行を1行ずつ読むスキャン。バッチの行に述語を適用するために使う"""
+
+    def __init__(self, batch: Batch) -> None:
+        self.batch = batch
+        self.row = -1
+
+    def before_first(self) -> None:
+        self.row = -1
+
+    def next(self) -> bool:
+        self.row += 1
+        return self.row < len(self.batch)
+
+    def get_int(self, field_name: str) -> int:
+        return self.batch.get_int(self.row, field_name)
+
+    def get_string(self, field_name: str) -> str:
+        return self.batch.get_string(self.row, field_name)
+
+    def get_vector(self, field_name: str) -> list[float]:
+        return self.batch.get_vector(self.row, field_name)
+
+    def get_value(self, field_name: str) -> Constant:
+        return self.batch.get_value(self.row, field_name)
+
+    def has_field(self, field_name: str) -> bool:
+        return self.batch.schema.has_field(field_name)
+
+    def next_batch(self, n: int, schema: Optional[Schema] = None) -> Batch:
+        rows = list(range(self.row + 1, min(self.row + 1 + n, len(self.batch))))
+        if rows:
+            self.row = rows[-1]
+        return self.batch.take(rows)
+
+    def close(self) -> None:
+        pass
@@ -1,9 +1,10 @@
-from typing import Optional
+from typing import Any, Optional
 
 from db.plan.plan import Plan
 from db.query.constant import Constant
 from db.query.scan import Scan
-from db.query.term import Term
+from db.query.term import RowCheck, ScanCheck, Term
+from db.record.row_decoder import RowDecoder
 from db.record.schema import Schema
 
 
@@ -32,6 +33,40 @@ class Predicate:
         """指定されたスキャンに述語が適用されるかどうかを返す"""
         return all(term.is_satisfied(scan) for term in self.terms)
 
+    def compile(self, schema: Schema) -> ScanCheck:
+        """すべての項をコンパイルし、スキャンの現在の行を評価する関数を返す"""
+        checks = [term.compile(schema) for term in self.terms]
+        if len(checks) == 1:
+            return checks[0]
+
+        def matches(scan: Scan) -> bool:
+            for check in checks:
+                if not check(scan):
+                    return False
+            return True
+
+        return matches
+
+    def compile_row(self, decoder: RowDecoder) -> RowCheck:
+        """すべての項をコンパイルし、RowDecoderで読んだスロットを評価する関数を返す"""
+        checks = [term.compile_row(decoder) for term in self.terms]
+        if len(checks) == 1:
+            return checks[0]
+
+        def matches(row: tuple[Any, ...]) -> bool:
+            for check in checks:
+                if not check(row):
+                    return False
+            return True
+
+        return matches
+
+    def split_row_predicate(self, schema: Schema) -> tuple[Optional["Predicate"], "Predicate"]:
+        """スロットのまま評価できる項とそれ以外の項に分ける"""
+        row_terms = [term for term in self.terms if term.can_compile_row(schema)]
+        other_terms = [term for term in self.terms if not term.can_compile_row(schema)]
+        return (Predicate(row_terms) if row_terms else None), Predicate(other_terms)
+
     def reduction_factor(self, plan: Plan) -> int:
         """クエリの出力レコード数を削減する程度を計算する"""
         factor = 1
@@ -57,6 +92,13 @@ class Predicate:
         ]
         return Predicate(application_terms) if application_terms else None
 
+    def field_names(self) -> set[str]:
+        """述語が参照するすべてのフィールド名を返す"""
+        names: set[str] = set()
+        for term in self.terms:
+            names |= term.field_names()
+        return names
+
     def equates_with_constant(self, field_name: str) -> Optional[Constant]:
         """指定されたフィールド名が定数と等しい場合、フィールド名を返す"""
         for term in self.terms:
@@ -1,7 +1,10 @@
 from abc import ABC
+from typing import Optional
 
+from db.query.batch import Batch
 from db.query.constant import Constant
 from db.query.scan import Scan
+from db.record.schema import Schema
 
 
 class ProjectScan(Scan, ABC):
@@ -15,6 +18,9 @@ class ProjectScan(Scan, ABC):
     def next(self) -> bool:
         return self.scan.next()
 
+    def next_batch(self, n: int, schema: Optional[Schema] = None) -> Batch:
+        return self.scan.next_batch(n, schema).select(self.field_list)
+
     def get_int(self, field_name: str) -> int:
         if self.has_field(field_name):
             return self.scan.get_int(field_name)
@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
+from typing import Callable, Optional
 
+from db.constants import FieldType
+from db.query.batch import Batch
 from db.query.constant import Constant
+from db.record.schema import Schema
 
 
 class Scan(ABC):
@@ -36,3 +40,29 @@ class Scan(ABC):
     @abstractmethod
     def close(self) -> None:
         pass
+
+    def next_batch(self, n: int, schema: Optional[Schema] = None) -> Batch:
+        """次の最大n行を列形式で返し、最後に返した行に移動する。空のバッチは終端を表す
+
+        既定の実装はnextと値の取得を1行ずつ繰り返す。行の型を持たないスキャンでは、返すフィールドをschemaで指定する
+        """
+        if schema is None:
+            raise ValueError(f"{type(self).__name__} needs a schema to read a batch")
+
+        batch = Batch(schema)
+        while len(batch) < n and self.next():
+            row: dict[str, list[int] | list[float] | list[str]] = {}
+            for field_name in schema.get_fields():
+                field_type = schema.get_type(field_name)
+                if field_type == FieldType.Integer:
+                    row[field_name] = [self.get_int(field_name)]
+                elif field_type == FieldType.Varchar:
+                    row[field_name] = [self.get_string(field_name)]
+                else:
+                    row[field_name] = self.get_vector(field_name)
+            batch.extend(row, 1)
+        return batch
+
+
+# スキャンを開く関数。必要になるまでバッファをpinしないように遅延して開く
+type ScanOpener = Callable[[], Scan]
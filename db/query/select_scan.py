@@ -1,38 +1,77 @@
 from abc import ABC
+from typing import Optional
 
+from db.query.batch import Batch
+from db.query.batch_scan import BatchScan
 from db.query.constant import Constant
 from db.query.predicate import Predicate
 from db.query.scan import Scan
+from db.query.term import ScanCheck
 from db.query.update_scan import UpdateScan
 from db.record.record_id import RecordID
+from db.record.schema import Schema
 
 
 class SelectScan(UpdateScan, ABC):
 
-    def __init__(self, scan: Scan, predicate: Predicate) -> None:
+    def __init__(self, scan: Scan, predicate: Predicate, schema: Optional[Schema] = None) -> None:
+        """schemaを指定すると、述語をその型でコンパイルしてConstantを作らずに評価する"""
         self.scan = scan
         self.predicate = predicate
+        self.schema = schema
+        self.check: ScanCheck = predicate.is_satisfied if schema is None else predicate.compile(schema)
+        # next_batchが最後に返した行。下位のスキャンは読み飛ばした行で止まっていることがあるので、
+        # 次にnextを呼ぶまでget_*はこの行の値を返す
+        self.batch_row: Optional[BatchScan] = None
 
     def before_first(self) -> None:
+        self.batch_row = None
         self.scan.before_first()
 
     def next(self) -> bool:
+        self.batch_row = None
         while self.scan.next():
-            if self.predicate.is_satisfied(self):
+            if self.check(self):
                 return True
         return False
 
+    def next_batch(self, n: int, schema: Optional[Schema] = None) -> Batch:
+        """下位のスキャンからバッチを読み、述語を満たす行だけを返す"""
+        self.batch_row = None
+        if not self.predicate.terms:
+            return self.scan.next_batch(n, schema)
+
+        # 述語のフィールドも読めるように、コンパイルに使った入力のスキーマがあればそれで読む
+        input_schema = self.schema if self.schema is not None else schema
+        result = self.scan.next_batch(0, input_schema)
+        while len(result) < n:
+            batch = self.scan.next_batch(n - len(result), input_schema)
+            if len(batch) == 0:
+                break
+
+            rows = BatchScan(batch)
+            selected = []
+            while rows.next():
+                if self.check(rows):
+                    selected.append(rows.row)
+            result.append(batch.take(selected))
+
+        if len(result) > 0:
+            self.batch_row = BatchScan(result)
+            self.batch_row.row = len(result) - 1
+        return result
+
     def get_int(self, field_name: str) -> int:
-        return self.scan.get_int(field_name)
+        return self._current().get_int(field_name)
 
     def get_string(self, field_name: str) -> str:
-        return self.scan.get_string(field_name)
+        return self._current().get_string(field_name)
 
     def get_value(self, field_name: str) -> Constant:
-        return self.scan.get_value(field_name)
+        return self._current().get_value(field_name)
 
     def get_vector(self, field_name: str) -> list[float]:
-        return self.scan.get_vector(field_name)
+        return self._current().get_vector(field_name)
 
     def has_field(self, field_name: str) -> bool:
         return self.scan.has_field(field_name)
@@ -40,38 +79,50 @@ class SelectScan(UpdateScan, ABC):
     def close(self) -> None:
         self.scan.close()
 
-    def set_int(self, field_name: str, value: int) -> None:
+    def _current(self) -> Scan:
+        return self.scan if self.batch_row is None else self.batch_row
+
+    def _check_not_batched(self) -> None:
+        """next_batchの後は下位のスキャンが返した行にいるとは限らないので、更新とRIDの取得を許さない"""
+        if self.batch_row is not None:
+            raise RuntimeError("Cannot update or get the RID of a row returned by next_batch; call next first")
 
+    def set_int(self, field_name: str, value: int) -> None:
+        self._check_not_batched()
         if isinstance(self.scan, UpdateScan):
             self.scan.set_int(field_name, value)
 
     def set_string(self, field_name: str, value: str) -> None:
-
+        self._check_not_batched()
         if isinstance(self.scan, UpdateScan):
             self.scan.set_string(field_name, value)
 
     def set_vector(self, field_name: str, value: list[float]) -> None:
-
+        self._check_not_batched()
         if isinstance(self.scan, UpdateScan):
             self.scan.set_vector(field_name, value)
 
     def set_value(self, field_name: str, value: Constant) -> None:
         """値を設定"""
+        self._check_not_batched()
         if isinstance(self.scan, UpdateScan):
             self.scan.set_value(field_name, value)
 
     def delete(self) -> None:
         """削除"""
+        self._check_not_batched()
         if isinstance(self.scan, UpdateScan):
             self.scan.delete()
 
     def insert(self) -> None:
         """挿入"""
+        self.batch_row = None
         if isinstance(self.scan, UpdateScan):
             self.scan.insert()
 
     def get_rid(self) -> RecordID:
         """RIDを取得"""
+        self._check_not_batched()
         if isinstance(self.scan, UpdateScan):
             return self.scan.get_rid()
 
@@ -79,5 +130,6 @@ class SelectScan(UpdateScan, ABC):
 
     def move_to_rid(self, record_id: RecordID) -> None:
         """特定のRIDに移動"""
+        self.batch_row = None
         if isinstance(self.scan, UpdateScan):
             self.scan.move_to_rid(record_id)
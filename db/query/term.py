@@ -1,11 +1,18 @@
-from typing import Optional
+from typing import Any, Callable, Optional
 
+from db.constants import FieldType
+from db.file.page import Page
 from db.plan.plan import Plan
 from db.query.constant import Constant
 from db.query.expression import Expression
 from db.query.scan import Scan
+from db.record.row_decoder import RowDecoder
 from db.record.schema import Schema
 
+# コンパイル済みの述語。スキャンの現在の行、またはRowDecoderで読んだスロットを受け取る
+type ScanCheck = Callable[[Scan], bool]
+type RowCheck = Callable[[tuple[Any, ...]], bool]
+
 
 class Term:
 
@@ -60,6 +67,104 @@ class Term:
         """Termがスキーマに適用可能かどうかを返す"""
         return self.left.applies_to(schema) and self.right.applies_to(schema)
 
+    def compile(self, schema: Schema) -> ScanCheck:
+        """スキーマから型を解決し、Constantを作らずにスキャンの行を評価する関数を返す"""
+        if not self.left.is_field_name() and not self.right.is_field_name():
+            result = self.left.as_constant() == self.right.as_constant()
+            return lambda scan: result
+
+        field_types = self._field_types(schema)
+        if field_types is None:
+            return self.is_satisfied
+
+        if self.left.is_field_name() and self.right.is_field_name():
+            left_name, right_name = self.left.as_field_name(), self.right.as_field_name()
+            if field_types == (FieldType.Integer, FieldType.Integer):
+                return lambda scan: scan.get_int(left_name) == scan.get_int(right_name)
+            if field_types == (FieldType.Varchar, FieldType.Varchar):
+                return lambda scan: scan.get_string(left_name) == scan.get_string(right_name)
+            return self.is_satisfied
+
+        field_name, constant = self._field_and_constant()
+        field_type = field_types[0]
+        if field_type == FieldType.Integer:
+            if not constant.is_int():
+                return lambda scan: False
+            int_value = constant.as_int()
+            return lambda scan: scan.get_int(field_name) == int_value
+
+        if field_type == FieldType.Varchar:
+            if constant.is_int():
+                return lambda scan: False
+            str_value = constant.as_string()
+            return lambda scan: scan.get_string(field_name) == str_value
+
+        # 整数と文字列以外のフィールドはコンパイルせずに評価する
+        return self.is_satisfied
+
+    def can_compile_row(self, schema: Schema) -> bool:
+        """スロットのバイト列のまま評価できるかどうかを返す。ベクトルを含む項は評価できない"""
+        return all(
+            schema.has_field(field_name) and schema.get_type(field_name) != FieldType.Vector
+            for field_name in self.field_names()
+        )
+
+    def compile_row(self, decoder: RowDecoder) -> RowCheck:
+        """RowDecoderで読んだスロットを、文字列もデコードせずに評価する関数を返す"""
+        if not self.left.is_field_name() and not self.right.is_field_name():
+            result = self.left.as_constant() == self.right.as_constant()
+            return lambda row: result
+
+        if self.left.is_field_name() and self.right.is_field_name():
+            left_value = self._row_value(decoder, self.left.as_field_name())
+            right_value = self._row_value(decoder, self.right.as_field_name())
+            if decoder.schema.get_type(self.left.as_field_name()) != decoder.schema.get_type(
+                self.right.as_field_name()
+            ):
+                return lambda row: False
+            return lambda row: left_value(row) == right_value(row)
+
+        field_name, constant = self._field_and_constant()
+        index = decoder.indexes[field_name]
+        if decoder.schema.get_type(field_name) == FieldType.Integer:
+            if not constant.is_int():
+                return lambda row: False
+            int_value = constant.as_int()
+            return lambda row: row[index] == int_value
+
+        if constant.is_int():
+            return lambda row: False
+        try:
+            encoded = constant.as_string().encode(Page.CHARSET)
+        except UnicodeEncodeError:
+            return lambda row: False
+        return lambda row: row[index + 1][: row[index]] == encoded
+
+    def _field_and_constant(self) -> tuple[str, Constant]:
+        """フィールドと定数を比べる項のフィールド名と定数を返す"""
+        if self.left.is_field_name():
+            return self.left.as_field_name(), self.right.as_constant()
+        return self.right.as_field_name(), self.left.as_constant()
+
+    def _field_types(self, schema: Schema) -> Optional[tuple[int, ...]]:
+        """項が参照するフィールドの型を返す。スキーマにないフィールドがあればNoneを返す"""
+        names = [e.as_field_name() for e in (self.left, self.right) if e.is_field_name()]
+        if not all(schema.has_field(field_name) for field_name in names):
+            return None
+        return tuple(schema.get_type(field_name) for field_name in names)
+
+    @staticmethod
+    def _row_value(decoder: RowDecoder, field_name: str) -> Callable[[tuple[Any, ...]], Any]:
+        """スロットから比較用の値を取り出す関数を返す。文字列は長さ分のバイト列になる"""
+        index = decoder.indexes[field_name]
+        if decoder.schema.get_type(field_name) == FieldType.Integer:
+            return lambda row: row[index]
+        return lambda row: row[index + 1][: row[index]]
+
+    def field_names(self) -> set[str]:
+        """Termが参照するフィールド名を返す"""
+        return {expression.as_field_name() for expression in (self.left, self.right) if expression.is_field_name()}
+
     def __str__(self) -> str:
         """Termを文字列で返す"""
         return f"{self.left} = {self.right}"
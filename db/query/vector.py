@@ -3,13 +3,24 @@ import math
 type Vector = list[float]
 
 
+def norm(vector: Vector) -> float:
+    """ベクトルの長さを返す"""
+    return math.sqrt(sum(x * x for x in vector))
+
+
+def check_nonzero_norm(norm_product: float) -> None:
+    """ノルムの積が0ならコサイン距離は定義できないので、ValueErrorを送出する"""
+    if norm_product == 0:
+        raise ValueError("Cosine distance is undefined for a zero vector")
+
+
 def cosine_distance(u: list[float], v: list[float]) -> float:
     """コサイン距離を計算する関数"""
     dot_product = sum(x * y for x, y in zip(u, v))
-    norm_u = math.sqrt(sum(x**2 for x in u))
-    norm_v = math.sqrt(sum(y**2 for y in v))
+    norm_product = norm(u) * norm(v)
+    check_nonzero_norm(norm_product)
 
-    return 1 - (dot_product / (norm_u * norm_v))
+    return 1 - (dot_product / norm_product)
 
 
 def parse_vector_literal(vector_literal: str) -> list[float]:
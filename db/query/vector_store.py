@@ -0,0 +1,125 @@
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Any, Sequence
+
+from db.query.vector import Vector, check_nonzero_norm, norm
+
+# NumPyは任意の依存。なければ純粋なPythonで計算する
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+if HAS_NUMPY:
+    import numpy
+
+
+class VectorStore(ABC):
+    """ベクトルを追加順の行番号で保持し、ノルムを事前に計算しておく入れ物
+
+    複数の行とのコサイン距離を1回の呼び出しでまとめて求める
+    """
+
+    @abstractmethod
+    def add(self, vector: Vector) -> int:
+        """ベクトルを追加して、その行番号を返す"""
+        pass
+
+    @abstractmethod
+    def distances(self, query: Vector, rows: Sequence[int]) -> list[float]:
+        """queryと指定した行のベクトルのコサイン距離を返す"""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class PythonVectorStore(VectorStore):
+    """ベクトルをリストで保持する実装"""
+
+    def __init__(self) -> None:
+        self.vectors: list[Vector] = []
+        self.norms: list[float] = []
+
+    def add(self, vector: Vector) -> int:
+        self.vectors.append(vector)
+        self.norms.append(norm(vector))
+        return len(self.vectors) - 1
+
+    def distances(self, query: Vector, rows: Sequence[int]) -> list[float]:
+        return python_distances(query, [self.vectors[row] for row in rows], [self.norms[row] for row in rows])
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+
+class NumPyVectorStore(VectorStore):
+    """ベクトルを連続したfloat64の行列で保持する実装。容量が足りなくなれば倍に広げる
+
+    PythonVectorStoreと同じ結果になるように、Pythonのfloatと同じ精度で計算する
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, dimensions: int) -> None:
+        self.dimensions = dimensions
+        self.size = 0
+        self.matrix: Any = numpy.zeros((self.INITIAL_CAPACITY, dimensions), dtype=numpy.float64)
+        self.norms: Any = numpy.zeros(self.INITIAL_CAPACITY, dtype=numpy.float64)
+
+    def add(self, vector: Vector) -> int:
+        if len(vector) != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions} dimensions, but got {len(vector)}")
+
+        if self.size == len(self.matrix):
+            self.matrix = numpy.concatenate([self.matrix, numpy.zeros_like(self.matrix)])
+            self.norms = numpy.concatenate([self.norms, numpy.zeros_like(self.norms)])
+
+        self.matrix[self.size] = vector
+        self.norms[self.size] = numpy.linalg.norm(self.matrix[self.size])
+        self.size += 1
+        return self.size - 1
+
+    def distances(self, query: Vector, rows: Sequence[int]) -> list[float]:
+        if not rows:
+            return []
+        indexes = numpy.asarray(rows, dtype=numpy.intp)
+        return numpy_distances(query, self.matrix[indexes], self.norms[indexes])
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def create_vector_store(dimensions: int) -> VectorStore:
+    """NumPyがあれば行列で保持する実装、なければリストで保持する実装を返す"""
+    if HAS_NUMPY:
+        return NumPyVectorStore(dimensions)
+    return PythonVectorStore()
+
+
+def python_distances(query: Vector, vectors: Sequence[Vector], norms: Sequence[float]) -> list[float]:
+    """queryと各ベクトルのコサイン距離を、計算済みのノルムを使ってPythonで求める"""
+    query_norm = norm(query)
+    distances = []
+    for vector, vector_norm in zip(vectors, norms):
+        norm_product = query_norm * vector_norm
+        check_nonzero_norm(norm_product)
+        distances.append(1 - sum(x * y for x, y in zip(query, vector)) / norm_product)
+    return distances
+
+
+def numpy_distances(query: Vector, matrix: Any, norms: Any) -> list[float]:
+    """queryと行列の各行のコサイン距離を、計算済みのノルムを使って1回の行列積で求める"""
+    query_array = numpy.asarray(query, dtype=numpy.float64)
+    norm_products = norms * numpy.linalg.norm(query_array)
+    check_nonzero_norm(norm_products.min())
+    distances: list[float] = (1 - (matrix @ query_array) / norm_products).tolist()
+    return distances
+
+
+def cosine_distances(query: Vector, vectors: Sequence[Vector]) -> list[float]:
+    """queryと各ベクトルのコサイン距離をまとめて計算する。NumPyがあれば1回の行列積で求める"""
+    if not vectors:
+        return []
+
+    if HAS_NUMPY:
+        matrix = numpy.asarray(vectors, dtype=numpy.float64)
+        return numpy_distances(query, matrix, numpy.linalg.norm(matrix, axis=1))
+    return python_distances(query, vectors, [norm(vector) for vector in vectors])
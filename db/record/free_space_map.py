@@ -0,0 +1,120 @@
+import heapq
+import os
+import struct
+import threading
+import weakref
+from pathlib import Path
+from typing import Optional
+
+from db.file.file_manager import FileManager
+
+
+class FreeSpaceMap:
+    """テーブルのどのブロックに空きスロットがありそうかを記録する
+
+    内容はヒントにすぎず、挿入するときは必ずページ上で空きスロットを確かめる。
+    まだ調べていないブロックは空きがあるものとして扱い、満杯だと分かったブロックは
+    再び削除が行われるまで候補にしない。データベースを閉じるときにテーブルファイルごとの補助ファイルに保存し、
+    次に開いたときに読み込む。補助ファイルがなければ、すべてのブロックを未調査として作り直す。
+    """
+
+    # 補助ファイルの拡張子。テーブルファイル名の後ろに付ける
+    SUFFIX = ".fsm"
+
+    # データベース（FileManager）ごと、ファイルごとのマップ
+    _maps: "weakref.WeakKeyDictionary[FileManager, dict[str, FreeSpaceMap]]" = weakref.WeakKeyDictionary()
+    _maps_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # これより前のブロックは、free_blocksにあるもの以外は満杯
+        self.next_unknown = 0
+        # 空きスロットがあると分かっているブロック。最小のブロックを取り出すためにヒープも持つ
+        self.free_blocks: set[int] = set()
+        self._free_heap: list[int] = []
+        # next_unknown以降で満杯だと分かっているブロック
+        self.full_blocks: set[int] = set()
+
+    @classmethod
+    def get(cls, file_manager: FileManager, file_name: str) -> "FreeSpaceMap":
+        """指定したデータベースのファイルに対応するマップを返す"""
+        with cls._maps_lock:
+            maps = cls._maps.setdefault(file_manager, {})
+            if file_name not in maps:
+                maps[file_name] = FreeSpaceMap._load(file_manager.db_directory / (file_name + cls.SUFFIX))
+            return maps[file_name]
+
+    @classmethod
+    def save_all(cls, file_manager: FileManager) -> None:
+        """データベースで使ったマップを補助ファイルに保存する。実行中のトランザクションがないときに呼ぶ"""
+        with cls._maps_lock:
+            maps = dict(cls._maps.get(file_manager, {}))
+
+        for file_name, free_space_map in maps.items():
+            free_space_map._save(file_manager.db_directory / (file_name + cls.SUFFIX))
+
+    @staticmethod
+    def _load(path: Path) -> "FreeSpaceMap":
+        """補助ファイルがあれば読み込んで削除する
+
+        異常終了した後に古い内容を使わないよう、次に保存するまでファイルは残さない
+        """
+        free_space_map = FreeSpaceMap()
+        if not path.exists():
+            return free_space_map
+
+        data = path.read_bytes()
+        path.unlink()
+        values = struct.unpack(f">{len(data) // 4}i", data)
+        num_free = values[1]
+        free_space_map.next_unknown = values[0]
+        free_space_map.free_blocks = set(values[2 : 2 + num_free])
+        free_space_map._free_heap = sorted(free_space_map.free_blocks)
+        free_space_map.full_blocks = set(values[2 + num_free :])
+        return free_space_map
+
+    def _save(self, path: Path) -> None:
+        """next_unknown、空きブロックの数、空きブロック、満杯のブロックの順に整数で書く"""
+        with self._lock:
+            free_blocks = sorted(self.free_blocks)
+            values = [self.next_unknown, len(free_blocks), *free_blocks, *sorted(self.full_blocks)]
+
+        temp_path = path.with_name(path.name + ".tmp")
+        temp_path.write_bytes(struct.pack(f">{len(values)}i", *values))
+        os.replace(temp_path, path)
+
+    def find_block(self, num_blocks: int) -> Optional[int]:
+        """空きスロットがありそうなブロックを返す。ファイル内に候補がなければNoneを返す"""
+        with self._lock:
+            while self._free_heap:
+                block_number = self._free_heap[0]
+                if block_number in self.free_blocks and block_number < num_blocks:
+                    return block_number
+                heapq.heappop(self._free_heap)
+                self.free_blocks.discard(block_number)
+
+            if self.next_unknown < num_blocks:
+                return self.next_unknown
+            return None
+
+    def record_full(self, block_number: int) -> None:
+        """ブロックに空きスロットがないことを記録する"""
+        with self._lock:
+            self.free_blocks.discard(block_number)
+            if block_number < self.next_unknown:
+                return
+
+            self.full_blocks.add(block_number)
+            while self.next_unknown in self.full_blocks:
+                self.full_blocks.remove(self.next_unknown)
+                self.next_unknown += 1
+
+    def record_free(self, block_number: int) -> None:
+        """ブロックに空きスロットができたことを記録する"""
+        with self._lock:
+            self.full_blocks.discard(block_number)
+            if block_number >= self.next_unknown or block_number in self.free_blocks:
+                return
+
+            self.free_blocks.add(block_number)
+            heapq.heappush(self._free_heap, block_number)
@@ -2,6 +2,7 @@ from typing import Optional
 
 from db.constants import ByteSize, FieldType
 from db.file.page import Page
+from db.record.row_decoder import RowDecoder
 from db.record.schema import Schema
 
 
@@ -24,6 +25,9 @@ class Layout:
             self.offsets = offsets
             self.slot_size = slot_size
 
+        self._empty_slot: Optional[bytes] = None
+        self._row_decoders: dict[Optional[tuple[str, ...]], RowDecoder] = {}
+
     def get_schema(self) -> Schema:
         """テーブルのスキーマを返す"""
         return self.schema
@@ -38,6 +42,35 @@ class Layout:
         """スロットのサイズを返す"""
         return self.slot_size
 
+    def empty_slot(self) -> bytes:
+        """すべてのフィールドが既定値（0と空文字列）の1スロット分のバイト列を返す
+
+        先頭のフラグも0（空き）になる。ページをまとめて初期化するときの雛形として使う
+        """
+        if self._empty_slot is None:
+            page = Page(self.slot_size)
+            for field_name in self.schema.get_fields():
+                if self.schema.get_type(field_name) == FieldType.Integer:
+                    page.set_int(self.offsets[field_name], 0)
+                else:
+                    page.set_string(self.offsets[field_name], "")
+            self._empty_slot = bytes(page.buffer)
+
+        return self._empty_slot
+
+    def row_decoder(self, field_names: Optional[tuple[str, ...]] = None) -> RowDecoder:
+        """スロットを1回で読み出すデコーダを返す
+
+        field_namesを指定すると、それ以外のフィールドは読み飛ばしてデコードしない
+        """
+        decoder = self._row_decoders.get(field_names)
+        if decoder is None:
+            names = self.schema.get_fields() if field_names is None else field_names
+            offsets = {field_name: self.get_offset(field_name) for field_name in names}
+            decoder = RowDecoder(self.schema, offsets, self.slot_size)
+            self._row_decoders[field_names] = decoder
+        return decoder
+
     def _length_in_bytes(self, field_name: str) -> int:
         """指定されたフィールドが必要とするバイト数を返す"""
 
@@ -1,20 +1,39 @@
+from functools import lru_cache
 from typing import Optional
 
-from db.constants import FieldType
+from db.buffer.buffer_ring import BufferRing
+from db.constants import ByteSize
 from db.file.block_id import BlockID
+from db.file.page import Page
+from db.query.batch import Batch
+from db.query.term import RowCheck
 from db.record.layout import Layout
+from db.record.row_decoder import RowDecoder
 from db.transaction.transaction import Transaction
 
 
 class RecordPage:
+    """スロット形式のレコードページ
+
+    ページの先頭に、スロットごとに使用中かどうかを1ビットで表すビットマップを置き、
+    その後ろにスロットを並べる。各スロットの先頭のフラグもビットマップと同じ値に保つ。
+    """
+
     EMPTY = 0
     USED = 1
+    # ビットマップの1ワード（4バイト）が表すスロット数
+    SLOTS_PER_WORD = 32
+    WORD_MASK = 0xFFFFFFFF
 
-    def __init__(self, transaction: Transaction, block: BlockID, layout: Layout) -> None:
+    def __init__(
+        self, transaction: Transaction, block: BlockID, layout: Layout, ring: Optional[BufferRing] = None
+    ) -> None:
         self.transaction = transaction
         self.block = block
         self.layout = layout
-        self.transaction.pin(block)
+        self.transaction.pin(block, ring)
+        self.num_slots = self._count_slots(self.transaction.block_size(), self.layout.get_slot_size())
+        self.header_size = self._bitmap_words(self.num_slots) * ByteSize.Int
 
     def get_int(self, slot: int, field_name: str) -> int:
         """指定されたスロットの指定されたフィールドの整数値を返す"""
@@ -47,25 +66,30 @@ class RecordPage:
         field_position = self._offset(slot) + self.layout.get_offset(field_name)
         self.transaction.set_vector(self.block, field_position, value)
 
+    def copy_from(self, slot: int, source: "RecordPage", source_slot: int) -> None:
+        """sourceのスロットのフィールドを、このページのスロットにまとめてコピーする。ログは書かない"""
+        if source.layout.get_slot_size() != self.layout.get_slot_size():
+            raise ValueError("Cannot copy records between layouts of different slot sizes")
+
+        # 先頭のフラグは除く
+        source_offset = source._offset(source_slot) + ByteSize.Int
+        dest_offset = self._offset(slot) + ByteSize.Int
+        length = self.layout.get_slot_size() - ByteSize.Int
+        self.transaction.copy_bytes(source.block, source_offset, self.block, dest_offset, length)
+
     def delete(self, slot: int) -> None:
         """指定されたスロットを削除する"""
         self._set_flag(slot, RecordPage.EMPTY)
 
     def format(self) -> None:
-        """このレコードページを初期化する"""
-        slot = 0
-        count = 0
-        while self._is_valid_slot(slot):
-            self.transaction.set_int(self.block, self._offset(slot), self.EMPTY, False)
-            schema = self.layout.get_schema()
-            for field_name in schema.get_fields():
-                field_position = self._offset(slot) + self.layout.get_offset(field_name)
-                if schema.get_type(field_name) == FieldType.Integer:
-                    self.transaction.set_int(self.block, field_position, 0, False)
-                else:
-                    self.transaction.set_string(self.block, field_position, "", False)
-            count += 1
-            slot += 1
+        """このレコードページを初期化する
+
+        空のビットマップと空きスロットを並べたページを作り、まとめて書き込む
+        """
+        page = Page(self.transaction.block_size())
+        slots_end = self.header_size + self.num_slots * self.layout.get_slot_size()
+        page.buffer[self.header_size : slots_end] = self.layout.empty_slot() * self.num_slots
+        self.transaction.initialize_block(self.block, page.buffer)
 
     def next_after(self, slot: int) -> int:
         """指定されたスロットの次の使用中のスロットを返す"""
@@ -78,6 +102,42 @@ class RecordPage:
             self._set_flag(new_slot, self.USED)
         return new_slot
 
+    def read_batch(
+        self, slot: int, limit: int, batch: Batch, row_filter: Optional[tuple[RowDecoder, RowCheck]] = None
+    ) -> tuple[int, int]:
+        """指定されたスロットより後の使用中のスロットを最大limit行までbatchに追加する
+
+        ページの内容を一度だけ読み、ビットマップとスロットをトランザクションを経由せずにまとめて読み出す。
+        row_filterを指定すると、それを満たさないスロットは読み飛ばす。
+        最後に調べたスロットと最後に追加したスロットを返す。どちらもなければ-1を返す
+        """
+        page = Page.wrap(self.transaction.view_block(self.block))
+        if row_filter is None:
+            slots = self._used_slots(page, slot, limit)
+            last_slot = slots[-1] if slots else -1
+        else:
+            filter_decoder, check = row_filter
+            slots = []
+            last_slot = -1
+            for used_slot in self._used_slots(page, slot, self.num_slots):
+                last_slot = used_slot
+                if check(filter_decoder.unpack_from(page.buffer, self._offset(used_slot))):
+                    slots.append(used_slot)
+                    if len(slots) == limit:
+                        break
+        if not slots:
+            return last_slot, -1
+
+        decoder = self.layout.row_decoder(tuple(batch.schema.get_fields()))
+        rows = [decoder.unpack_from(page.buffer, self._offset(used_slot)) for used_slot in slots]
+        columns = {field_name: decoder.column(rows, field_name) for field_name in batch.schema.get_fields()}
+        batch.extend(columns, len(slots))
+        return last_slot, slots[-1]
+
+    def matches(self, slot: int, decoder: RowDecoder, check: RowCheck) -> bool:
+        """指定されたスロットがコンパイル済みの述語を満たすかどうかを、スロットのバイト列のまま調べる"""
+        return check(decoder.unpack_from(self.transaction.view_block(self.block), self._offset(slot)))
+
     def get_block(self) -> BlockID:
         """このレコードページのブロックを返す"""
         return self.block
@@ -86,22 +146,81 @@ class RecordPage:
         """スロットの状態を設定する"""
         self.transaction.set_int(self.block, self._offset(slot), flag, True)
 
+        word_offset = (slot // self.SLOTS_PER_WORD) * ByteSize.Int
+        bit = 1 << (slot % self.SLOTS_PER_WORD)
+        word = Page.wrap(self.transaction.view_block(self.block)).get_int(word_offset) & self.WORD_MASK
+        word = word | bit if flag == self.USED else word & ~bit
+        # ビットマップのワードは符号付き整数としてページに書き込む
+        if word >= 1 << 31:
+            word -= 1 << 32
+        self.transaction.set_int(self.block, word_offset, word, True)
+
     def _search_after(self, slot: int, flag: int) -> int:
-        """指定されたスロットの次に指定されたフラグを持つスロットを返す"""
+        """指定されたスロットの次に指定されたフラグを持つスロットを返す
+
+        ビットマップをトランザクションを経由せずに1ワードずつ読み、32スロット分をビット演算でまとめて調べる
+        """
+        page = Page.wrap(self.transaction.view_block(self.block))
         slot += 1
         while self._is_valid_slot(slot):
-            if self.transaction.get_int(self.block, self._offset(slot)) == flag:
-                return slot
-            slot += 1
+            word_index = slot // self.SLOTS_PER_WORD
+            word = page.get_int(word_index * ByteSize.Int) & self.WORD_MASK
+            if flag == self.EMPTY:
+                word = ~word & self.WORD_MASK
+
+            # 探し始めるスロットより前のビットを消し、残った最下位のビットを探す
+            word &= ~((1 << (slot % self.SLOTS_PER_WORD)) - 1)
+            if word:
+                found = word_index * self.SLOTS_PER_WORD + (word & -word).bit_length() - 1
+                return found if self._is_valid_slot(found) else -1
+
+            slot = (word_index + 1) * self.SLOTS_PER_WORD
 
         return -1
 
+    def _used_slots(self, page: Page, slot: int, limit: int) -> list[int]:
+        """ページのビットマップから、指定されたスロットより後の使用中のスロットを最大limit個返す"""
+        slots: list[int] = []
+        slot += 1
+        while self._is_valid_slot(slot) and len(slots) < limit:
+            word_index = slot // self.SLOTS_PER_WORD
+            word = page.get_int(word_index * ByteSize.Int) & self.WORD_MASK
+            word &= ~((1 << (slot % self.SLOTS_PER_WORD)) - 1)
+            while word and len(slots) < limit:
+                lowest = word & -word
+                found = word_index * self.SLOTS_PER_WORD + lowest.bit_length() - 1
+                if not self._is_valid_slot(found):
+                    return slots
+                slots.append(found)
+                word ^= lowest
+
+            slot = (word_index + 1) * self.SLOTS_PER_WORD
+
+        return slots
+
     def _is_valid_slot(self, slot: int) -> bool:
         """指定されたスロットが有効かどうかを返す"""
-        return slot >= 0 and self._offset(slot + 1) <= self.transaction.block_size()
+        return 0 <= slot < self.num_slots
 
     def _offset(self, slot: int) -> int:
         """指定されたスロットのオフセットを返す"""
         slot_size = self.layout.get_slot_size()
-        offset = slot * slot_size
+        offset = self.header_size + slot * slot_size
         return offset
+
+    @classmethod
+    def _bitmap_words(cls, num_slots: int) -> int:
+        """指定したスロット数のビットマップに必要なワード数を返す"""
+        return (num_slots + cls.SLOTS_PER_WORD - 1) // cls.SLOTS_PER_WORD
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _count_slots(block_size: int, slot_size: int) -> int:
+        """ビットマップとスロットが1ブロックに収まる最大のスロット数を返す"""
+        if slot_size <= 0:
+            raise ValueError(f"Invalid slot size: {slot_size}")
+
+        num_slots = block_size // slot_size
+        while RecordPage._bitmap_words(num_slots) * ByteSize.Int + num_slots * slot_size > block_size:
+            num_slots -= 1
+        return num_slots
@@ -0,0 +1,71 @@
+import struct
+from typing import Any
+
+from db.constants import ByteSize, FieldType
+from db.file.page import Page
+from db.record.schema import Schema
+
+
+class RowDecoder:
+    """1スロット分のフィールドをまとめて読み出すデコーダ
+
+    スロットの配置からstruct.Structを一度だけ組み立て、1回のunpack_fromでスロット全体を読む。
+    文字列は長さとmax長のバイト列、ベクトルは次元数分のfloatとして展開される
+    """
+
+    def __init__(self, schema: Schema, offsets: dict[str, int], slot_size: int) -> None:
+        self.schema = schema
+        # フィールドごとの、unpackした結果のタプル内の位置
+        self.indexes: dict[str, int] = {}
+
+        formats = ["<"]
+        position = 0
+        index = 0
+        for field_name in sorted(offsets, key=offsets.__getitem__):
+            offset = offsets[field_name]
+            if offset < position:
+                raise ValueError(f"Overlapping field {field_name} at offset {offset}")
+            if offset > position:
+                formats.append(f"{offset - position}x")
+
+            self.indexes[field_name] = index
+            field_type = schema.get_type(field_name)
+            if field_type == FieldType.Integer:
+                formats.append("i")
+                position = offset + ByteSize.Int
+                index += 1
+            elif field_type == FieldType.Varchar:
+                length = Page.get_max_length(schema.get_length(field_name)) - ByteSize.Int
+                formats.append(f"i{length}s")
+                position = offset + ByteSize.Int + length
+                index += 2
+            elif field_type == FieldType.Vector:
+                dimensions = schema.get_length(field_name) // ByteSize.Float
+                formats.append(f"{dimensions}f")
+                position = offset + schema.get_length(field_name)
+                index += dimensions
+            else:
+                raise ValueError(f"Unknown field type {field_type}")
+
+        if position > slot_size:
+            raise ValueError(f"Fields exceed slot size {slot_size}")
+        self.struct = struct.Struct("".join(formats))
+
+    def unpack_from(self, buffer: bytes | bytearray, offset: int) -> tuple[Any, ...]:
+        """指定した位置から始まるスロットのフィールドをまとめて読む。offsetはスロットの先頭のオフセット"""
+        return self.struct.unpack_from(buffer, offset)
+
+    def column(self, rows: list[tuple[Any, ...]], field_name: str) -> list[int] | list[float] | list[str]:
+        """unpack_fromで読んだ行から指定されたフィールドの列を取り出す。ベクトルは全行の要素を順に並べる"""
+        index = self.indexes[field_name]
+        field_type = self.schema.get_type(field_name)
+        if field_type == FieldType.Integer:
+            return [row[index] for row in rows]
+        elif field_type == FieldType.Varchar:
+            return [row[index + 1][: row[index]].decode(Page.CHARSET) for row in rows]
+        else:
+            dimensions = self.schema.get_length(field_name) // ByteSize.Float
+            values: list[float] = []
+            for row in rows:
+                values.extend(row[index : index + dimensions])
+            return values
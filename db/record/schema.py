@@ -39,6 +39,14 @@ class Schema:
         for field_name in schema.get_fields():
             self.add(field_name, schema)
 
+    def project(self, field_names: list[str]) -> "Schema":
+        """指定されたフィールドだけを、このスキーマでの順に持つスキーマを返す"""
+        schema = Schema()
+        for field_name in self.fields:
+            if field_name in field_names:
+                schema.add(field_name, self)
+        return schema
+
     def get_fields(self) -> list[str]:
         """スキーマに含まれるすべてのフィールド名を返す"""
         return self.fields
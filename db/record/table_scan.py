@@ -1,30 +1,46 @@
 from abc import ABC
+from functools import partial
 from typing import Optional
 
+from db.buffer.buffer_ring import BufferRing
 from db.constants import ByteSize, FieldType
 from db.file.block_id import BlockID
+from db.query.batch import Batch
 from db.query.constant import Constant
+from db.query.predicate import Predicate
+from db.query.term import RowCheck
 from db.query.update_scan import UpdateScan
 from db.record.layout import Layout
 from db.record.record_id import RecordID
 from db.record.record_page import RecordPage
+from db.record.row_decoder import RowDecoder
+from db.record.schema import Schema
 from db.transaction.transaction import Transaction
 
 
 class TableScan(UpdateScan, ABC):
-    def __init__(self, transaction: Transaction, table_name: str, layout: Layout) -> None:
+    def __init__(
+        self, transaction: Transaction, table_name: str, layout: Layout, field_names: Optional[list[str]] = None
+    ) -> None:
         self.transaction = transaction
         self.layout = layout
+        # 読み出すフィールド。指定がなければすべてのフィールド
+        self.schema = layout.get_schema() if field_names is None else layout.get_schema().project(field_names)
         self.file_name = f"{table_name}.tbl"
         self.current_slot = -1
         self.record_page: Optional[RecordPage] = None
+        self.ring: Optional[BufferRing] = None
+        # スロットのまま評価する述語。満たさない行はnextやnext_batchで返さない
+        self.row_filter: Optional[tuple[RowDecoder, RowCheck]] = None
 
         try:
             file_size = self.transaction.size(self.file_name)
+            # 大きなテーブルの全件スキャンがバッファプールを埋め尽くさないようにする
+            self.ring = self.transaction.new_scan_ring(file_size)
             if file_size == 0:
                 self._move_to_new_block()
             else:
-                self._move_to_block(0)
+                self._move_to_block(0, sequential=True)
         except (OSError, IOError) as e:
             raise FileNotFoundError(f"Table {table_name} file access error: {e}")
         except PermissionError as e:
@@ -34,23 +50,55 @@ class TableScan(UpdateScan, ABC):
         except Exception as e:
             raise FileNotFoundError(f"Table {table_name} does not exist or cannot be accessed: {e}")
 
+    def set_filter(self, predicate: Predicate) -> None:
+        """述語をコンパイルして、満たさない行をConstantを作らずに読み飛ばすようにする"""
+        decoder = self.layout.row_decoder(tuple(sorted(predicate.field_names())))
+        self.row_filter = (decoder, predicate.compile_row(decoder))
+
     def before_first(self) -> None:
         """最初のブロックをバッファに読み込む"""
-        self._move_to_block(0)
+        self._move_to_block(0, sequential=True)
 
     def next(self) -> bool:
         """次のレコードに移動する"""
         if self.record_page is None:
             raise RuntimeError("Record page is not initialized. Ensure you have moved to a valid block first.")
 
-        self.current_slot = self.record_page.next_after(self.current_slot)
-        while self.current_slot < 0:
-            if self._at_last_block():
-                return False
-            self._move_to_block(self.record_page.get_block().block_number + 1)
+        while True:
             self.current_slot = self.record_page.next_after(self.current_slot)
+            while self.current_slot < 0:
+                if self._at_last_block():
+                    return False
+                self._move_to_block(self.record_page.get_block().block_number + 1, sequential=True)
+                self.current_slot = self.record_page.next_after(self.current_slot)
+
+            if self.row_filter is None or self.record_page.matches(self.current_slot, *self.row_filter):
+                return True
+
+    def next_batch(self, n: int, schema: Optional[Schema] = None) -> Batch:
+        """次の最大n行をページ単位でまとめて読み、列形式で返す。スキャンは最後に返した行に移動する"""
+        if self.record_page is None:
+            raise RuntimeError("Record page is not initialized. Ensure you have moved to a valid block first.")
+
+        batch = Batch(self.schema)
+        last_returned: Optional[RecordID] = None
+        while len(batch) < n:
+            last_slot, last_added = self.record_page.read_batch(
+                self.current_slot, n - len(batch), batch, self.row_filter
+            )
+            if last_added >= 0:
+                last_returned = RecordID(self.record_page.get_block().block_number, last_added)
+            if last_slot >= 0:
+                self.current_slot = last_slot
+                continue
+            if self._at_last_block():
+                break
+            self._move_to_block(self.record_page.get_block().block_number + 1, sequential=True)
 
-        return True
+        # 述語を満たさない行を調べたところで止まっていれば、最後に返した行に戻る
+        if last_returned is not None and self.get_rid() != last_returned:
+            self.move_to_rid(last_returned)
+        return batch
 
     def get_int(self, field_name: str) -> int:
         """現在のスロットの指定されたフィールドの整数値を返す"""
@@ -91,13 +139,23 @@ class TableScan(UpdateScan, ABC):
 
     def has_field(self, field_name: str) -> bool:
         """指定されたフィールドが含まれているかどうかを返す"""
-        return self.layout.schema.has_field(field_name)
+        return self.schema.has_field(field_name)
 
     def close(self) -> None:
         """スキャンを閉じる"""
         if self.record_page is not None:
             self.transaction.unpin(self.record_page.get_block())
 
+    def copy_record_from(self, source: "TableScan") -> None:
+        """sourceの現在のレコードを現在のレコードにページ間で直接コピーする
+
+        ログを書かないため、一時テーブルへの書き込みにだけ使う。レイアウトは同じである必要がある
+        """
+        if self.record_page is None or source.record_page is None:
+            raise RuntimeError("Record page is not initialized. Ensure you have moved to a valid block first")
+
+        self.record_page.copy_from(self.current_slot, source.record_page, source.current_slot)
+
     def set_int(self, field_name: str, value: int) -> None:
         """現在のスロットの指定されたフィールドに整数値を設定する"""
         if self.record_page is None:
@@ -138,16 +196,27 @@ class TableScan(UpdateScan, ABC):
         if self.record_page is None:
             raise RuntimeError("Record page is not initialized. Call move_to_insert_position() first.")
 
+        # まず現在のブロックを探し、なければ空き領域マップが示すブロックに移動する
+        free_space_map = self.transaction.free_space_map(self.file_name)
+        searched_from_start = self.current_slot < 0
         while True:
             slot = self.record_page.insert_after(self.current_slot)
             if slot is not None and slot >= 0:
                 self.current_slot = slot
                 return
 
-            if self._at_last_block():
+            if searched_from_start:
+                full_block = self.record_page.get_block().block_number
+                free_space_map.record_full(full_block)
+                # このトランザクションの挿入で満杯になったのなら、ロールバックで空きができる
+                self.transaction.on_rollback(partial(free_space_map.record_free, full_block))
+
+            block_number = free_space_map.find_block(self.transaction.size(self.file_name))
+            if block_number is None:
                 self._move_to_new_block()
             else:
-                self._move_to_block(self.record_page.get_block().block_number + 1)
+                self._move_to_block(block_number)
+            searched_from_start = True
 
     def delete(self) -> None:
         """現在のスロットを削除する"""
@@ -155,6 +224,7 @@ class TableScan(UpdateScan, ABC):
             raise RuntimeError("Record page is not initialized. Ensure you have moved to a valid block first")
 
         self.record_page.delete(self.current_slot)
+        self.transaction.free_space_map(self.file_name).record_free(self.record_page.get_block().block_number)
 
     def move_to_rid(self, rid: RecordID) -> None:
         """指定されたRIDに移動する"""
@@ -172,11 +242,12 @@ class TableScan(UpdateScan, ABC):
 
         return RecordID(self.record_page.get_block().block_number, self.current_slot)
 
-    def _move_to_block(self, block_number: int) -> None:
-        """指定されたブロックに移動する"""
+    def _move_to_block(self, block_number: int, sequential: bool = False) -> None:
+        """指定されたブロックに移動する。順次スキャンではリングのバッファを使う"""
         self.close()
         block = BlockID(self.file_name, block_number)
-        self.record_page = RecordPage(self.transaction, block, self.layout)
+        ring = self.ring if sequential else None
+        self.record_page = RecordPage(self.transaction, block, self.layout, ring)
         self.current_slot = -1
 
     def _move_to_new_block(self) -> None:
@@ -1,12 +1,15 @@
 from typing import Optional
 
+from db.buffer.background_writer import BackgroundWriter
 from db.buffer.buffer_manager import BufferManager
+from db.constants import ReplacementPolicyType
 from db.file.file_manager import FileManager
 from db.log.log_manager import LogManager
 from db.metadata.metadata_manager import MetadataManager
 from db.plan.basic_query_planner import BasicQueryPlanner
 from db.plan.basic_update_planner import BasicUpdatePlanner
 from db.plan.planner import Planner
+from db.record.free_space_map import FreeSpaceMap
 from db.transaction.transaction import Transaction
 
 
@@ -14,12 +17,31 @@ class KeiPyDB:
     BLOCK_SIZE = 4096
     BUFFER_SIZE = 8
     LOG_FILE = "keipydb.log"
-
-    def __init__(self, dir_name: str, block_size: int = BLOCK_SIZE, buffer_size: int = BUFFER_SIZE) -> None:
+    FORMAT_FILE = "keipydb.format"
+    # ファイル形式の版。2でレコードページの先頭にスロットの使用状況のビットマップを置くようになった
+    FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        dir_name: str,
+        block_size: int = BLOCK_SIZE,
+        buffer_size: int = BUFFER_SIZE,
+        group_commit: bool = False,
+        replacement_policy: str = ReplacementPolicyType.LRU,
+        background_writer: bool = False,
+        prefetch_blocks: int = 0,
+        use_mmap: bool = False,
+        preallocate: bool = False,
+    ) -> None:
         try:
-            self.file_manager = FileManager(dir_name, block_size)
+            self.file_manager = FileManager(
+                dir_name, block_size, defer_sync=group_commit, use_mmap=use_mmap, preallocate=preallocate
+            )
+            self._check_format()
             self.log_manager = LogManager(self.file_manager, KeiPyDB.LOG_FILE)
-            self.buffer_manager = BufferManager(self.file_manager, self.log_manager, buffer_size)
+            self.buffer_manager = BufferManager(
+                self.file_manager, self.log_manager, buffer_size, replacement_policy, prefetch_blocks
+            )
 
             is_new = self.file_manager.is_new
             self.metadata_manager = None
@@ -43,6 +65,11 @@ class KeiPyDB:
 
             transaction.commit()
 
+            self.background_writer: Optional[BackgroundWriter] = None
+            if background_writer:
+                self.background_writer = BackgroundWriter(self.buffer_manager)
+                self.background_writer.start()
+
         except (OSError, IOError) as e:
             # ファイルアクセスエラー
             raise RuntimeError(f"データベースファイルアクセスエラー: {e}") from e
@@ -56,6 +83,40 @@ class KeiPyDB:
             # その他の予期しないエラー
             raise RuntimeError(f"データベース初期化に失敗しました: {e}") from e
 
+    def _check_format(self) -> None:
+        """新しいデータベースにはファイル形式の版を書き、既存のデータベースは版が一致しなければRuntimeErrorを送出する"""
+        format_path = self.file_manager.db_directory / KeiPyDB.FORMAT_FILE
+        if self.file_manager.is_new:
+            format_path.write_text(f"{KeiPyDB.FORMAT_VERSION}\n")
+            return
+
+        version = format_path.read_text().strip() if format_path.exists() else "1"
+        if version != str(KeiPyDB.FORMAT_VERSION):
+            raise RuntimeError(
+                f"Unsupported database format version {version} in {self.file_manager.db_directory}; "
+                f"this version reads format {KeiPyDB.FORMAT_VERSION}"
+            )
+
+    def close(self) -> None:
+        """チェックポイントを書いて空き領域マップを保存し、バックグラウンドライタと先読みのスレッドを止めて終了を待ち、ファイルを閉じる
+
+        実行中のトランザクションがあればRuntimeErrorを送出し、何も閉じない。閉じた後は使えない
+        """
+        transaction = self.new_transaction()
+        try:
+            transaction.checkpoint()
+        except RuntimeError:
+            transaction.rollback()
+            raise
+        transaction.commit()
+        FreeSpaceMap.save_all(self.file_manager)
+
+        if self.background_writer is not None:
+            self.background_writer.stop()
+            self.background_writer = None
+        self.buffer_manager.close()
+        self.file_manager.close_all()
+
     def new_transaction(self) -> Transaction:
         return Transaction(self.file_manager, self.log_manager, self.buffer_manager)
 
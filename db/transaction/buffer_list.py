@@ -2,6 +2,7 @@ from typing import Optional
 
 from db.buffer.buffer import Buffer
 from db.buffer.buffer_manager import BufferManager
+from db.buffer.buffer_ring import BufferRing
 from db.file.block_id import BlockID
 
 
@@ -14,8 +15,8 @@ class BufferList:
     def get_buffer(self, block: BlockID) -> Optional[Buffer]:
         return self.buffers.get(block)
 
-    def pin(self, block: BlockID) -> None:
-        buffer = self.buffer_manager.pin(block)
+    def pin(self, block: BlockID, ring: Optional[BufferRing] = None) -> None:
+        buffer = self.buffer_manager.pin(block, ring)
         self.buffers[block] = buffer
         self.pins.append(block)
 
@@ -30,6 +30,6 @@ class CheckpointRecord:
     @staticmethod
     def write_to_log(log_manager: LogManager) -> int:
         rec = bytearray(LogRecordFields.One_Field * ByteSize.Int)
-        page = Page(rec)
+        page = Page.wrap(rec)
         page.set_int(0, CheckpointRecord.CHECKPOINT)
         return log_manager.append(rec)
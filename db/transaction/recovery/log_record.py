@@ -6,6 +6,7 @@ from db.transaction.recovery.commit_record import CommitRecord
 from db.transaction.recovery.rollback_record import RollbackRecord
 from db.transaction.recovery.set_int_record import SetIntRecord
 from db.transaction.recovery.set_string_record import SetStringRecord
+from db.transaction.recovery.set_vector_record import SetVectorRecord
 from db.transaction.recovery.start_record import StartRecord
 from db.transaction.transaction import Transaction
 
@@ -17,6 +18,7 @@ class LogRecord(ABC):
     ROLLBACK = 3
     SET_INT = 4
     SET_STRING = 5
+    SET_VECTOR = 6
 
     @abstractmethod
     def op(self) -> int:
@@ -32,10 +34,19 @@ class LogRecord(ABC):
 
     @classmethod
     def create_log_record(
-        cls, bytes_data: bytes
-    ) -> StartRecord | CommitRecord | RollbackRecord | SetIntRecord | SetStringRecord | CheckpointRecord:
+        cls, bytes_data: bytes | memoryview
+    ) -> (
+        StartRecord
+        | CommitRecord
+        | RollbackRecord
+        | SetIntRecord
+        | SetStringRecord
+        | SetVectorRecord
+        | CheckpointRecord
+    ):
 
-        page = Page(bytes_data)
+        # レコードのバイト列をコピーせずに読む
+        page = Page.wrap(memoryview(bytes_data))
         op_type = page.get_int(0)
 
         if op_type == LogRecord.CHECKPOINT:
@@ -50,5 +61,7 @@ class LogRecord(ABC):
             return SetIntRecord(page)
         elif op_type == LogRecord.SET_STRING:
             return SetStringRecord(page)
+        elif op_type == LogRecord.SET_VECTOR:
+            return SetVectorRecord(page)
         else:
             raise ValueError(f"不明な操作コード: {op_type}")
@@ -1,41 +1,70 @@
+from threading import Lock
 from typing import Set
+from weakref import WeakKeyDictionary
 
 from db.buffer.buffer import Buffer
 from db.buffer.buffer_manager import BufferManager
 from db.log.log_manager import LogManager
+from db.transaction.recovery.checkpoint_record import CheckpointRecord
 from db.transaction.recovery.commit_record import CommitRecord
 from db.transaction.recovery.log_record import LogRecord
 from db.transaction.recovery.rollback_record import RollbackRecord
 from db.transaction.recovery.set_int_record import SetIntRecord
 from db.transaction.recovery.set_string_record import SetStringRecord
+from db.transaction.recovery.set_vector_record import SetVectorRecord
 from db.transaction.recovery.start_record import StartRecord
 from db.transaction.transaction import Transaction
 
 
 class RecoveryManager:
+    # ログごとの、開始してまだコミットもロールバックもしていないトランザクション番号
+    _active_transactions: WeakKeyDictionary[LogManager, set[int]] = WeakKeyDictionary()
+    _active_lock = Lock()
+
     def __init__(self, tx: Transaction, tx_number: int, log_manager: LogManager, buffer_manager: BufferManager) -> None:
         self.tx = tx
         self.tx_number = tx_number
         self.log_manager = log_manager
         self.buffer_manager = buffer_manager
+        with RecoveryManager._active_lock:
+            RecoveryManager._active_transactions.setdefault(log_manager, set()).add(tx_number)
         StartRecord.write_to_log(log_manager, tx_number)
 
     def commit(self) -> None:
-        self.buffer_manager.flush_all(self.tx_number)
+        self._flush_data()
         lsn = CommitRecord.write_to_log(self.log_manager, self.tx_number)
         self.log_manager.flush(lsn)
+        self._finish()
 
     def rollback(self) -> None:
         self._do_rollback()
-        self.buffer_manager.flush_all(self.tx_number)
+        self._flush_data()
         lsn = RollbackRecord.write_to_log(self.log_manager, self.tx_number)
         self.log_manager.flush(lsn)
+        self._finish()
 
     def recover(self) -> None:
         self._do_recover()
-        self.buffer_manager.flush_all(self.tx_number)
+        self._flush_data()
         lsn = CommitRecord.write_to_log(self.log_manager, self.tx_number)
         self.log_manager.flush(lsn)
+        self._finish()
+        self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """変更済みのバッファを書き出してデータファイルを同期し、チェックポイントをログに書く
+
+        復旧はチェックポイントより前のログを読まないので、他に実行中のトランザクションがあればRuntimeErrorを送出する
+        """
+        with RecoveryManager._active_lock:
+            others = RecoveryManager._active_transactions.get(self.log_manager, set()) - {self.tx_number}
+        if others:
+            raise RuntimeError(f"Cannot checkpoint while transactions {sorted(others)} are active")
+
+        self.buffer_manager.write_dirty_buffers(len(self.buffer_manager.buffer_pool))
+        self.buffer_manager.file_manager.sync_all()
+        lsn = CheckpointRecord.write_to_log(self.log_manager)
+        self.log_manager.flush(lsn)
 
     def set_int(self, buffer: Buffer, offset: int) -> int:
         old_value = buffer.get_contents().get_int(offset)
@@ -56,10 +85,34 @@ class RecoveryManager:
 
         return SetStringRecord.write_to_log(self.log_manager, self.tx_number, block, offset, old_value)
 
+    def set_vector(self, buffer: Buffer, offset: int, dimensions: int) -> int:
+
+        old_value = buffer.get_contents().get_vector(offset, dimensions)
+        block = buffer.block
+
+        if block is None:
+            raise RuntimeError("Buffer has no block assigned")
+
+        return SetVectorRecord.write_to_log(self.log_manager, self.tx_number, block, offset, old_value)
+
+    def _finish(self) -> None:
+        with RecoveryManager._active_lock:
+            RecoveryManager._active_transactions.get(self.log_manager, set()).discard(self.tx_number)
+
+    def _flush_data(self) -> None:
+        """トランザクションが変更したバッファを書き出し、変更したデータファイルを同期する
+
+        ログは取り消し用の記録だけなので、コミットやロールバックの記録より先にデータを永続化する。
+        fsyncを遅延している場合も、まとめられるのはログの同期だけ
+        """
+        self.buffer_manager.flush_all(self.tx_number)
+        for file_name in self.tx.modified_files:
+            self.buffer_manager.file_manager.sync(file_name)
+
     def _do_rollback(self) -> None:
         iterator = self.log_manager.iterator()
-        for record_data in iterator:
-            record = LogRecord.create_log_record(record_data)
+        while iterator.has_next():
+            record = LogRecord.create_log_record(next(iterator))
             if record.tx_number() == self.tx_number:
                 if record.op() == StartRecord.START:
                     return
@@ -68,8 +121,8 @@ class RecoveryManager:
     def _do_recover(self) -> None:
         finished_transactions: Set[int] = set()
         iterator = self.log_manager.iterator()
-        for record_data in iterator:
-            record = LogRecord.create_log_record(record_data)
+        while iterator.has_next():
+            record = LogRecord.create_log_record(next(iterator))
             if record.op() == LogRecord.CHECKPOINT:
                 return
             if record.op() in {LogRecord.COMMIT, LogRecord.ROLLBACK}:
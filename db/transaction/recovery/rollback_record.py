@@ -26,8 +26,8 @@ class RollbackRecord:
     def write_to_log(log_manager: LogManager, tx_number: int) -> int:
         """ログにロールバックレコードを書き込む"""
         rec = bytearray(LogRecordFields.Two_Fields * ByteSize.Int)
-        page = Page(rec)
+        page = Page.wrap(rec)
         page.set_int(0, RollbackRecord.ROLLBACK)
         page.set_int(ByteSize.Int, tx_number)
 
-        return log_manager.append(page.get_contents())
+        return log_manager.append(rec)
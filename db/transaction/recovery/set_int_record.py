@@ -11,8 +11,9 @@ class SetIntRecord:
     def __init__(self, page: Page) -> None:
         self._tx_number = page.get_int(ByteSize.Int)
 
-        file_name = page.get_string(ByteSize.Int * 2)
-        block_pos = page.get_max_length(len(file_name))
+        file_name_pos = ByteSize.Int * 2
+        file_name = page.get_string(file_name_pos)
+        block_pos = file_name_pos + page.get_max_length(len(file_name))
         block_number = page.get_int(block_pos)
         self.block = BlockID(file_name, block_number)
 
@@ -45,7 +46,7 @@ class SetIntRecord:
         value_pos = offset_pos + ByteSize.Int
 
         rec = bytearray(value_pos + ByteSize.Int)
-        page = Page(rec)
+        page = Page.wrap(rec)
         page.set_int(0, SetIntRecord.SET_INT)
         page.set_int(ByteSize.Int, tx_number)
         page.set_string(file_name_pos, block.file_name)
@@ -53,4 +54,4 @@ class SetIntRecord:
         page.set_int(offset_pos, offset)
         page.set_int(value_pos, value)
 
-        return log_manager.append(page.get_contents())
+        return log_manager.append(rec)
@@ -47,7 +47,7 @@ class SetStringRecord:
         value_pos = offset_pos + ByteSize.Int
 
         rec = bytearray(value_pos + Page.get_max_length(len(value)))
-        page = Page(rec)
+        page = Page.wrap(rec)
         page.set_int(0, SetStringRecord.SET_STRING)
         page.set_int(tx_pos, tx_number)
         page.set_string(file_name_pos, block.file_name)
@@ -55,4 +55,4 @@ class SetStringRecord:
         page.set_int(offset_pos, offset)
         page.set_string(value_pos, value)
 
-        return log_manager.append(page.get_contents())
+        return log_manager.append(rec)
@@ -0,0 +1,59 @@
+from db.constants import ByteSize
+from db.file.block_id import BlockID
+from db.file.page import Page
+from db.log.log_manager import LogManager
+from db.transaction.transaction import Transaction
+
+
+class SetVectorRecord:
+    SET_VECTOR = 6
+
+    def __init__(self, page: Page) -> None:
+        self._tx_number = page.get_int(ByteSize.Int)
+
+        file_name_pos = ByteSize.Int * 2
+        file_name = page.get_string(file_name_pos)
+        block_pos = file_name_pos + page.get_max_length(len(file_name))
+        self.block = BlockID(file_name, page.get_int(block_pos))
+
+        offset_pos = block_pos + ByteSize.Int
+        self.offset = page.get_int(offset_pos)
+        dimensions_pos = offset_pos + ByteSize.Int
+        dimensions = page.get_int(dimensions_pos)
+        self.value = page.get_vector(dimensions_pos + ByteSize.Int, dimensions)
+
+    @staticmethod
+    def op() -> int:
+        return SetVectorRecord.SET_VECTOR
+
+    def tx_number(self) -> int:
+        return self._tx_number
+
+    def undo(self, tx: Transaction) -> None:
+        tx.pin(self.block)
+        tx.set_vector(self.block, self.offset, self.value, False)
+        tx.unpin(self.block)
+
+    def __str__(self) -> str:
+        return f"<SET_VECTOR {self._tx_number} {self.block} {self.offset} {self.value}>"
+
+    @staticmethod
+    def write_to_log(log_manager: LogManager, tx_number: int, block: BlockID, offset: int, value: list[float]) -> int:
+        tx_pos = ByteSize.Int
+        file_name_pos = tx_pos + ByteSize.Int
+        block_pos = file_name_pos + Page.get_max_length(len(block.file_name))
+        offset_pos = block_pos + ByteSize.Int
+        dimensions_pos = offset_pos + ByteSize.Int
+        value_pos = dimensions_pos + ByteSize.Int
+
+        rec = bytearray(value_pos + Page.get_vector_length(len(value)))
+        page = Page.wrap(rec)
+        page.set_int(0, SetVectorRecord.SET_VECTOR)
+        page.set_int(tx_pos, tx_number)
+        page.set_string(file_name_pos, block.file_name)
+        page.set_int(block_pos, block.block_number)
+        page.set_int(offset_pos, offset)
+        page.set_int(dimensions_pos, len(value))
+        page.set_vector(value_pos, value)
+
+        return log_manager.append(rec)
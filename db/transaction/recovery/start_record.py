@@ -25,7 +25,7 @@ class StartRecord:
     @staticmethod
     def write_to_log(log_manager: LogManager, tx_number: int) -> int:
         rec = bytearray(LogRecordFields.Two_Fields * ByteSize.Int)
-        page = Page(rec)
+        page = Page.wrap(rec)
         page.set_int(0, StartRecord.START)
         page.set_int(ByteSize.Int, tx_number)
-        return log_manager.append(page.get_contents())
+        return log_manager.append(rec)
@@ -1,9 +1,12 @@
 from threading import Lock
+from typing import Callable, Optional
 
 from db.buffer.buffer_manager import BufferManager
+from db.buffer.buffer_ring import BufferRing
 from db.file.block_id import BlockID
 from db.file.file_manager import FileManager
 from db.log.log_manager import LogManager
+from db.record.free_space_map import FreeSpaceMap
 from db.transaction.buffer_list import BufferList
 from db.transaction.concurrency.concurrency_manager import ConcurrencyManager
 
@@ -27,24 +30,41 @@ class Transaction:
         self.recovery_manager = RecoveryManager(self, self.tx_number, log_manager, buffer_manager)
         self.concurrency_manager = ConcurrencyManager()
         self.buffer_list = BufferList(buffer_manager)
+        self.rollback_actions: list[Callable[[], None]] = []
+        # 変更したデータファイル。コミットとロールバックでは、ログを同期する前にこれらを同期する
+        self.modified_files: set[str] = set()
 
     def commit(self) -> None:
         self.recovery_manager.commit()
         self.concurrency_manager.release()
         self.buffer_list.unpin_all()
+        self.rollback_actions = []
 
     def rollback(self) -> None:
         self.recovery_manager.rollback()
         self.concurrency_manager.release()
         self.buffer_list.unpin_all()
+        for action in self.rollback_actions:
+            action()
+        self.rollback_actions = []
         print(f"Transaction {self.tx_number} rolled back")
 
+    def on_rollback(self, action: Callable[[], None]) -> None:
+        """ロールバックしたときに呼ぶ処理を登録する
+
+        ログで元に戻せない、メモリ上の状態を捨てるために使う
+        """
+        self.rollback_actions.append(action)
+
     def recover(self) -> None:
         self.recovery_manager.recover()
         self.concurrency_manager.release()
 
-    def pin(self, block: BlockID) -> None:
-        self.buffer_list.pin(block)
+    def checkpoint(self) -> None:
+        self.recovery_manager.checkpoint()
+
+    def pin(self, block: BlockID, ring: Optional[BufferRing] = None) -> None:
+        self.buffer_list.pin(block, ring)
 
     def unpin(self, block: BlockID) -> None:
         self.buffer_list.unpin(block)
@@ -58,12 +78,14 @@ class Transaction:
 
     def get_string(self, block: BlockID, offset: int) -> str:
         self.concurrency_manager.lock_shared(block)
-        buffer = self.buffer_manager.pin(block)
+        buffer = self.buffer_list.get_buffer(block)
+        if not buffer:
+            raise ValueError(f"Block {block} not pinned")
         return buffer.get_contents().get_string(offset)
 
     def set_int(self, block: BlockID, offset: int, value: int, ok_to_log: bool = True) -> None:
         self.concurrency_manager.lock_exclusive(block)
-        buffer = self.buffer_manager.pin(block)
+        buffer = self.buffer_list.get_buffer(block)
         if not buffer:
             raise ValueError(f"Block {block} not pinned")
         lsn = -1
@@ -72,6 +94,7 @@ class Transaction:
 
         buffer.get_contents().set_int(offset, value)
         buffer.set_modified(self.tx_number, lsn)
+        self.modified_files.add(block.file_name)
 
     def set_string(self, block: BlockID, offset: int, value: str, ok_to_log: bool = True) -> None:
         self.concurrency_manager.lock_exclusive(block)
@@ -83,6 +106,24 @@ class Transaction:
             lsn = self.recovery_manager.set_string(buffer, offset)
         buffer.get_contents().set_string(offset, value)
         buffer.set_modified(self.tx_number, lsn)
+        self.modified_files.add(block.file_name)
+
+    def initialize_block(self, block: BlockID, contents: bytes | bytearray) -> None:
+        """新しく追加したブロックの内容を一度に書き込む
+
+        追加したばかりのブロックは他のトランザクションから参照されておらず、
+        ロールバックで元に戻す必要もないので、ログは書かない
+        """
+        self.concurrency_manager.lock_exclusive(block)
+        buffer = self.buffer_list.get_buffer(block)
+        if not buffer:
+            raise ValueError(f"Block {block} not pinned")
+        if len(contents) != self.block_size():
+            raise ValueError(f"Contents size {len(contents)} does not match block size {self.block_size()}")
+
+        buffer.get_contents().buffer[:] = contents
+        buffer.set_modified(self.tx_number, Transaction.NO_LOG)
+        self.modified_files.add(block.file_name)
 
     def get_vector(self, block: BlockID, offset: int, dimensions: int) -> list[float]:
         self.concurrency_manager.lock_shared(block)
@@ -96,9 +137,42 @@ class Transaction:
         buffer = self.buffer_list.get_buffer(block)
         if not buffer:
             raise ValueError(f"Block {block} not pinned")
+        lsn = -1
+        if ok_to_log:
+            lsn = self.recovery_manager.set_vector(buffer, offset, len(vector))
 
         buffer.get_contents().set_vector(offset, vector)
-        buffer.set_modified(self.tx_number, Transaction.NO_LOG)
+        buffer.set_modified(self.tx_number, lsn)
+        self.modified_files.add(block.file_name)
+
+    def view_block(self, block: BlockID) -> memoryview:
+        """pin済みのブロックの内容をコピーせずに読み取り専用で返す。ページ全体を一度に読む場合に使う"""
+        self.concurrency_manager.lock_shared(block)
+        buffer = self.buffer_list.get_buffer(block)
+        if not buffer:
+            raise ValueError(f"Block {block} not pinned")
+        return buffer.get_contents().view().toreadonly()
+
+    def copy_bytes(
+        self, source_block: BlockID, source_offset: int, dest_block: BlockID, dest_offset: int, length: int
+    ) -> None:
+        """pin済みのブロック間でバイト列をコピーする
+
+        ログを書かないため、一時テーブルのように取り消す必要のないブロックにだけ使う
+        """
+        self.concurrency_manager.lock_shared(source_block)
+        self.concurrency_manager.lock_exclusive(dest_block)
+        source = self.buffer_list.get_buffer(source_block)
+        dest = self.buffer_list.get_buffer(dest_block)
+        if not source:
+            raise ValueError(f"Block {source_block} not pinned")
+        if not dest:
+            raise ValueError(f"Block {dest_block} not pinned")
+
+        source_view = source.get_contents().view()[source_offset : source_offset + length]
+        dest.get_contents().buffer[dest_offset : dest_offset + length] = source_view
+        dest.set_modified(self.tx_number, Transaction.NO_LOG)
+        self.modified_files.add(dest_block.file_name)
 
     def size(self, file_name: str) -> int:
         return self.file_manager.length(file_name)
@@ -112,3 +186,11 @@ class Transaction:
 
     def available_buffers(self) -> int:
         return self.buffer_manager.available()
+
+    def free_space_map(self, file_name: str) -> FreeSpaceMap:
+        """テーブルファイルの空き領域マップを返す。マップはデータベース内のトランザクションで共有される"""
+        return FreeSpaceMap.get(self.file_manager, file_name)
+
+    def new_scan_ring(self, num_blocks: int) -> Optional[BufferRing]:
+        """指定したブロック数のファイルを順に読むためのバッファリングを返す"""
+        return self.buffer_manager.new_ring(num_blocks)
@@ -157,6 +157,18 @@ def test_flush_without_modification(test_env):
     assert buffer.transaction_number == -1
 
 
+def test_flush_skips_write_for_clean_buffer():
+    mock_file_manager = Mock()
+    mock_file_manager.block_size = 400
+    buffer = Buffer(mock_file_manager, Mock())
+    buffer.block = BlockID("test_file", 0)
+
+    assert not buffer.is_modified()
+    buffer.flush()
+
+    mock_file_manager.write.assert_not_called()
+
+
 def test_buffer_data_persistence(test_env):
     """バッファデータの永続化テスト"""
     buffer, file_manager = test_env
@@ -6,9 +6,11 @@ from unittest.mock import Mock
 
 import pytest
 
+from db.buffer.background_writer import BackgroundWriter
 from db.buffer.buffer_manager import BufferAbortException, BufferManager
 from db.file.block_id import BlockID
 from db.file.file_manager import FileManager
+from db.file.page import Page
 from db.log.log_manager import LogManager
 
 
@@ -76,7 +78,7 @@ def test_fined_existing_buffer():
     block = BlockID("testfile", 1)
 
     buffer = buffer_manager._choose_unpinned_buffer()
-    buffer.assign_to_block(block)
+    buffer_manager._assign_block(buffer, block)
 
     found_buffer = buffer_manager._find_existing_buffer(block)
 
@@ -367,3 +369,129 @@ def test_concurrent_buffer_access(real_buffer_env):
 
     # 結果が正しく記録されていることを確認
     assert len(results) == 5
+
+
+def test_reassigned_buffer_is_removed_from_lookup(real_buffer_env):
+    """置き換えられたブロックは検索対象から外れる"""
+    file_manager, log_manager = real_buffer_env
+    buffer_manager = BufferManager(file_manager, log_manager, 1)
+
+    old_block = file_manager.append("lookup_test.db")
+    new_block = file_manager.append("lookup_test.db")
+
+    buffer = buffer_manager.pin(old_block)
+    buffer_manager.unpin(buffer)
+    reused = buffer_manager.pin(new_block)
+
+    assert reused is buffer
+    assert buffer_manager._find_existing_buffer(old_block) is None
+    assert buffer_manager._find_existing_buffer(new_block) is buffer
+    buffer_manager.unpin(reused)
+
+
+def test_unpinned_buffers_are_reused_in_unpin_order(real_buffer_env):
+    """最も前にunpinされたバッファから再利用される"""
+    file_manager, log_manager = real_buffer_env
+    buffer_manager = BufferManager(file_manager, log_manager, 3)
+
+    blocks = [file_manager.append("order_test.db") for _ in range(4)]
+    buffers = [buffer_manager.pin(block) for block in blocks[:3]]
+
+    buffer_manager.unpin(buffers[1])
+    buffer_manager.unpin(buffers[0])
+    buffer_manager.unpin(buffers[2])
+
+    assert buffer_manager.pin(blocks[3]) is buffers[1]
+    assert buffer_manager._find_existing_buffer(blocks[0]) is buffers[0]
+
+
+def test_write_dirty_buffers_cleans_unpinned_buffers():
+    file_manager = Mock(spec=FileManager)
+    file_manager.block_size = 1024
+    log_manager = Mock(spec=LogManager)
+    buffer_manager = BufferManager(file_manager, log_manager, num_buffers=3)
+
+    pinned = buffer_manager.pin(BlockID("testfile", 0))
+    pinned.set_modified(1, 10)
+    unpinned = buffer_manager.pin(BlockID("testfile", 1))
+    unpinned.set_modified(1, 20)
+    buffer_manager.unpin(unpinned)
+
+    assert buffer_manager.write_dirty_buffers(max_pages=10) == 1
+
+    # WALのため、ページより先にログが書き込まれる。書き出すのは内容の写し
+    log_manager.flush.assert_called_once_with(20)
+    file_manager.write.assert_called_once()
+    block, contents = file_manager.write.call_args[0]
+    assert block == BlockID("testfile", 1)
+    assert contents.buffer == unpinned.contents.buffer
+    assert not unpinned.is_modified()
+    assert pinned.is_modified()
+    assert not unpinned.is_pinned()
+    assert buffer_manager.available() == 2
+
+
+def test_write_dirty_buffers_writes_outside_the_lock():
+    """書き込み中も他のスレッドはpinでき、その間に変更されたバッファは変更済みのまま残る"""
+    file_manager = Mock(spec=FileManager)
+    file_manager.block_size = 1024
+    log_manager = Mock(spec=LogManager)
+    buffer_manager = BufferManager(file_manager, log_manager, num_buffers=3)
+
+    block = BlockID("testfile", 0)
+    buffer = buffer_manager.pin(block)
+    buffer.set_modified(1, 10)
+    buffer_manager.unpin(buffer)
+
+    def modify_during_write(written_block: BlockID, contents: Page) -> None:
+        def modify() -> None:
+            other = buffer_manager.pin(block)
+            other.contents.set_int(0, 42)
+            other.set_modified(1, 11)
+            buffer_manager.unpin(other)
+
+        thread = threading.Thread(target=modify)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        # 書き出す写しには、書き込み中の変更は入らない
+        assert contents.get_int(0) == 0
+
+    file_manager.write.side_effect = modify_during_write
+
+    assert buffer_manager.write_dirty_buffers(max_pages=10) == 1
+    assert buffer.is_modified()
+    assert buffer.contents.get_int(0) == 42
+    assert buffer_manager.available() == 3
+
+
+def test_background_writer_cleans_dirty_buffers():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_manager = FileManager(temp_dir, 400)
+        log_manager = LogManager(file_manager, "testlog")
+        buffer_manager = BufferManager(file_manager, log_manager, num_buffers=3)
+        block = file_manager.append("testfile")
+
+        buffer = buffer_manager.pin(block)
+        buffer.contents.set_int(0, 123)
+        buffer.set_modified(1, log_manager.append(b"record"))
+        buffer_manager.unpin(buffer)
+
+        writer = BackgroundWriter(buffer_manager, interval=0.01)
+        writer.start()
+        deadline = time.time() + 5
+        while buffer.is_modified() and time.time() < deadline:
+            time.sleep(0.01)
+        writer.stop()
+
+        assert not buffer.is_modified()
+        assert not writer.is_running()
+        assert log_manager.last_saved_lsn >= 1
+
+        page = Page(400)
+        file_manager.read(block, page)
+        assert page.get_int(0) == 123
+        file_manager.close_all()
+    finally:
+        shutil.rmtree(temp_dir)
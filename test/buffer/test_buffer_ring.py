@@ -0,0 +1,107 @@
+import shutil
+import tempfile
+from unittest.mock import Mock
+
+import pytest
+
+from db.buffer.buffer_manager import BufferManager
+from db.buffer.buffer_ring import BufferRing
+from db.file.block_id import BlockID
+from db.file.file_manager import FileManager
+from db.log.log_manager import LogManager
+from db.record.layout import Layout
+from db.record.schema import Schema
+from db.record.table_scan import TableScan
+from db.transaction.transaction import Transaction
+
+
+def create_buffer_manager(num_buffers: int) -> BufferManager:
+    file_manager = Mock(spec=FileManager)
+    file_manager.block_size = 1024
+    log_manager = Mock(spec=LogManager)
+    return BufferManager(file_manager, log_manager, num_buffers=num_buffers)
+
+
+def test_new_ring_only_for_large_files():
+    buffer_manager = create_buffer_manager(32)
+
+    assert buffer_manager.new_ring(8) is None
+    ring = buffer_manager.new_ring(9)
+    assert ring is not None
+    assert ring.size == 4
+
+
+def test_ring_reuses_its_own_buffers():
+    buffer_manager = create_buffer_manager(8)
+    hot_block = BlockID("hot", 0)
+    buffer_manager.unpin(buffer_manager.pin(hot_block))
+
+    ring = BufferRing(2)
+    used = set()
+    for i in range(20):
+        buffer = buffer_manager.pin(BlockID("scan", i), ring)
+        used.add(buffer)
+        buffer_manager.unpin(buffer)
+
+    # スキャンは2つのバッファしか使わず、ホットなブロックは残っている
+    assert len(used) == 2
+    assert buffer_manager._find_existing_buffer(hot_block) is not None
+
+
+def test_ring_skips_buffer_pinned_by_others():
+    buffer_manager = create_buffer_manager(4)
+    ring = BufferRing(1)
+
+    first = buffer_manager.pin(BlockID("scan", 0), ring)
+    buffer_manager.unpin(first)
+    # 他のスキャンが同じブロックを使っている
+    other = buffer_manager.pin(BlockID("scan", 0))
+
+    second = buffer_manager.pin(BlockID("scan", 1), ring)
+
+    assert second is not other
+    assert other.block == BlockID("scan", 0)
+
+
+@pytest.fixture
+def db_setup():
+    temp_dir = tempfile.mkdtemp()
+    file_manager = FileManager(temp_dir, 400)
+    log_manager = LogManager(file_manager, "testlog")
+    buffer_manager = BufferManager(file_manager, log_manager, 16)
+    yield file_manager, log_manager, buffer_manager
+    shutil.rmtree(temp_dir)
+
+
+def test_table_scan_does_not_flood_buffer_pool(db_setup):
+    file_manager, log_manager, buffer_manager = db_setup
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_string_field("name", 20)
+    layout = Layout(schema)
+
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+    scan = TableScan(transaction, "big", layout)
+    for i in range(200):
+        scan.insert()
+        scan.set_int("id", i)
+        scan.set_string("name", f"name{i}")
+    scan.close()
+    transaction.commit()
+
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+    hot_block = BlockID("hot", 0)
+    transaction.pin(hot_block)
+    transaction.unpin(hot_block)
+
+    scan = TableScan(transaction, "big", layout)
+    assert scan.ring is not None
+    count = 0
+    while scan.next():
+        assert scan.get_int("id") == count
+        count += 1
+    scan.close()
+
+    assert count == 200
+    assert buffer_manager._find_existing_buffer(hot_block) is not None
+    transaction.commit()
@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+from unittest.mock import Mock
+
+from db.buffer.buffer_manager import BufferManager
+from db.buffer.prefetcher import Prefetcher
+from db.file.block_id import BlockID
+from db.file.file_manager import FileManager
+from db.file.page import Page
+from db.log.log_manager import LogManager
+
+
+def test_prefetch_after_sequential_misses():
+    file_manager = Mock(spec=FileManager)
+    prefetcher = Prefetcher(file_manager, num_blocks=4)
+
+    prefetcher.record_miss(BlockID("t", 0))
+    prefetcher.record_miss(BlockID("t", 1))
+    # 先読みした範囲の前半では依頼しない
+    prefetcher.record_miss(BlockID("t", 2))
+    prefetcher.record_miss(BlockID("t", 3))
+    prefetcher.stop()
+
+    assert [call.args for call in file_manager.read_ahead.call_args_list] == [
+        (BlockID("t", 2), 4),
+        (BlockID("t", 6), 2),
+    ]
+
+
+def test_no_prefetch_for_random_access():
+    file_manager = Mock(spec=FileManager)
+    prefetcher = Prefetcher(file_manager, num_blocks=4)
+
+    for number in [5, 1, 9, 3]:
+        prefetcher.record_miss(BlockID("t", number))
+    prefetcher.stop()
+
+    file_manager.read_ahead.assert_not_called()
+
+
+def test_sequential_hint_prefetches_from_first_miss():
+    file_manager = Mock(spec=FileManager)
+    prefetcher = Prefetcher(file_manager, num_blocks=4)
+
+    prefetcher.record_miss(BlockID("t", 0), sequential=True)
+    prefetcher.stop()
+
+    file_manager.read_ahead.assert_called_once_with(BlockID("t", 1), 4)
+
+
+def test_buffer_manager_reads_prefetched_blocks():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_manager = FileManager(temp_dir, 400)
+        log_manager = LogManager(file_manager, "testlog")
+        for i in range(20):
+            block = file_manager.append("scan.tbl")
+            page = Page(400)
+            page.set_int(0, i)
+            file_manager.write(block, page)
+
+        buffer_manager = BufferManager(file_manager, log_manager, num_buffers=4, prefetch_blocks=8)
+        assert buffer_manager.prefetcher is not None
+
+        def scan(numbers: range) -> None:
+            for i in numbers:
+                buffer = buffer_manager.pin(BlockID("scan.tbl", i))
+                assert buffer.contents.get_int(0) == i
+                buffer_manager.unpin(buffer)
+
+        scan(range(2))
+        # 依頼された先読みが終わるのを待つ
+        buffer_manager.prefetcher.stop()
+        scan(range(2, 20))
+
+        assert file_manager.read_ahead_hits == 8
+        file_manager.close_all()
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_buffer_manager_close_stops_prefetcher():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_manager = FileManager(temp_dir, 400)
+        log_manager = LogManager(file_manager, "testlog")
+        buffer_manager = BufferManager(file_manager, log_manager, num_buffers=4, prefetch_blocks=8)
+        prefetcher = buffer_manager.prefetcher
+        assert prefetcher is not None
+
+        buffer_manager.close()
+
+        assert buffer_manager.prefetcher is None
+        assert not prefetcher._thread.is_alive()
+        file_manager.close_all()
+    finally:
+        shutil.rmtree(temp_dir)
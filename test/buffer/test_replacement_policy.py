@@ -0,0 +1,139 @@
+import shutil
+import tempfile
+
+import pytest
+
+from db.buffer.buffer_manager import BufferManager
+from db.buffer.replacement_policy import ClockPolicy, LRUPolicy, TwoQueuePolicy, create_replacement_policy
+from db.constants import ReplacementPolicyType
+from db.file.block_id import BlockID
+from db.file.file_manager import FileManager
+from db.log.log_manager import LogManager
+
+
+@pytest.fixture
+def managers():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_manager = FileManager(temp_dir, 512)
+        log_manager = LogManager(file_manager, "test_log")
+        yield file_manager, log_manager
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def touch(buffer_manager, block_number):
+    """ブロックをpinしてすぐにunpinする"""
+    buffer = buffer_manager.pin(BlockID("policy.tbl", block_number))
+    buffer_manager.unpin(buffer)
+    return buffer
+
+
+def test_create_replacement_policy(managers):
+    file_manager, log_manager = managers
+    buffer_manager = BufferManager(file_manager, log_manager, 3)
+
+    assert isinstance(create_replacement_policy(ReplacementPolicyType.LRU, buffer_manager.buffer_pool), LRUPolicy)
+    assert isinstance(create_replacement_policy(ReplacementPolicyType.Clock, buffer_manager.buffer_pool), ClockPolicy)
+    assert isinstance(
+        create_replacement_policy(ReplacementPolicyType.TwoQueue, buffer_manager.buffer_pool), TwoQueuePolicy
+    )
+
+    with pytest.raises(ValueError, match="Unknown replacement policy"):
+        create_replacement_policy("random", buffer_manager.buffer_pool)
+
+
+def test_lru_evicts_least_recently_unpinned(managers):
+    file_manager, log_manager = managers
+    buffer_manager = BufferManager(file_manager, log_manager, 3, ReplacementPolicyType.LRU)
+
+    for block_number in range(3):
+        touch(buffer_manager, block_number)
+    touch(buffer_manager, 0)
+    touch(buffer_manager, 3)
+
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 0)) is not None
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 1)) is None
+
+
+def test_lru_skips_buffers_pinned_after_unpin(managers):
+    """unpin後に書き出しのためにpinされたバッファは置き換えず、順番を保つ"""
+    file_manager, log_manager = managers
+    buffer_manager = BufferManager(file_manager, log_manager, 3, ReplacementPolicyType.LRU)
+
+    for block_number in range(3):
+        touch(buffer_manager, block_number)
+    oldest = buffer_manager._find_existing_buffer(BlockID("policy.tbl", 0))
+    assert oldest is not None
+    oldest.pin()
+
+    touch(buffer_manager, 3)
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 0)) is oldest
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 1)) is None
+
+    oldest.unpin()
+    touch(buffer_manager, 4)
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 0)) is None
+
+
+def test_clock_gives_referenced_buffer_second_chance(managers):
+    file_manager, log_manager = managers
+    buffer_manager = BufferManager(file_manager, log_manager, 3, ReplacementPolicyType.Clock)
+
+    for block_number in range(3):
+        touch(buffer_manager, block_number)
+
+    # 一周目ですべての参照ビットが落ち、最初のバッファが選ばれる
+    touch(buffer_manager, 3)
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 0)) is None
+
+    # ブロック1は再参照されたので、参照されていないブロック2が追い出される
+    touch(buffer_manager, 1)
+    touch(buffer_manager, 4)
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 1)) is not None
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 2)) is None
+
+
+def test_clock_skips_pinned_buffers(managers):
+    file_manager, log_manager = managers
+    buffer_manager = BufferManager(file_manager, log_manager, 2, ReplacementPolicyType.Clock)
+
+    pinned = buffer_manager.pin(BlockID("policy.tbl", 0))
+    touch(buffer_manager, 1)
+    touch(buffer_manager, 2)
+
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 0)) is pinned
+    buffer_manager.unpin(pinned)
+
+
+def test_two_queue_resists_sequential_scan(managers):
+    file_manager, log_manager = managers
+    buffer_manager = BufferManager(file_manager, log_manager, 8, ReplacementPolicyType.TwoQueue)
+
+    # ホットなブロックを一度追い出されてから再参照させ、Amに入れる
+    touch(buffer_manager, 0)
+    for block_number in range(100, 110):
+        touch(buffer_manager, block_number)
+    touch(buffer_manager, 0)
+
+    # 大きなテーブルの全件スキャン
+    for block_number in range(200, 300):
+        touch(buffer_manager, block_number)
+
+    assert buffer_manager._find_existing_buffer(BlockID("policy.tbl", 0)) is not None
+
+
+def test_hit_and_miss_counters(managers):
+    file_manager, log_manager = managers
+    buffer_manager = BufferManager(file_manager, log_manager, 2)
+
+    assert buffer_manager.hit_ratio() == 0.0
+
+    touch(buffer_manager, 0)
+    touch(buffer_manager, 0)
+    touch(buffer_manager, 1)
+    touch(buffer_manager, 0)
+
+    assert buffer_manager.num_misses == 2
+    assert buffer_manager.num_hits == 2
+    assert buffer_manager.hit_ratio() == 0.5
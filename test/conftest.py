@@ -14,5 +14,6 @@ def test_db():
     tx = db.new_transaction()
     yield db, tx
     tx.commit()
+    db.close()
     if os.path.exists(temp_dir):
         shutil.rmtree(temp_dir)
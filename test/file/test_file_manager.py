@@ -1,5 +1,7 @@
+import os
 import shutil
 import struct
+import threading
 from pathlib import Path
 
 import pytest
@@ -341,3 +343,198 @@ def test_file_manager_error_propagation(setup_dir):
     with pytest.raises(RuntimeError) as exc_info:
         manager.length("")
     assert "Cannot get length" in str(exc_info.value)
+
+
+def test_file_manager_defer_sync(setup_dir, monkeypatch):
+    """遅延モードではsync_allまでfsyncが呼ばれない"""
+    fsync_calls = []
+    original_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsync_calls.append(fd), original_fsync(fd)))
+
+    manager = FileManager(setup_dir, 512, defer_sync=True)
+    for file_name in ["deferred1.db", "deferred2.db"]:
+        for _ in range(3):
+            block_id = manager.append(file_name)
+            page = Page(512)
+            page.set_int(0, block_id.number())
+            manager.write(block_id, page)
+
+    assert fsync_calls == []
+
+    manager.sync_all()
+    assert len(fsync_calls) == 2
+
+    # 同期済みのファイルは再度fsyncされない
+    manager.sync_all()
+    assert len(fsync_calls) == 2
+
+    page = Page(512)
+    manager.read(BlockID("deferred2.db", 2), page)
+    assert page.get_int(0) == 2
+
+
+def test_file_manager_read_ahead(setup_dir):
+    block_size = 400
+    file_manager = FileManager(setup_dir, block_size)
+    for i in range(3):
+        block = file_manager.append("readahead.tbl")
+        page = Page(block_size)
+        page.set_int(0, i + 1)
+        file_manager.write(block, page)
+
+    # 末尾を超える分は読まない
+    assert file_manager.read_ahead(BlockID("readahead.tbl", 1), 5) == 2
+
+    # 先読み後に書き込まれたブロックは、先読みした古い内容を返さない
+    page = Page(block_size)
+    page.set_int(0, 99)
+    file_manager.write(BlockID("readahead.tbl", 2), page)
+
+    for number, expected in [(1, 2), (2, 99)]:
+        page = Page(block_size)
+        file_manager.read(BlockID("readahead.tbl", number), page)
+        assert page.get_int(0) == expected
+
+    assert file_manager.read_ahead_hits == 1
+
+
+def test_file_manager_mmap_read_follows_append(setup_dir):
+    block_size = 400
+    file_manager = FileManager(setup_dir, block_size, use_mmap=True)
+
+    # 空のファイルはマップできないので通常の読み込みになる
+    page = Page(block_size)
+    file_manager.read(BlockID("mapped.tbl", 0), page)
+    assert page.get_int(0) == 0
+
+    for i in range(3):
+        block = file_manager.append("mapped.tbl")
+        page = Page(block_size)
+        page.set_int(0, i + 1)
+        file_manager.write(block, page)
+
+        # 追加したブロックも、既存のブロックへの書き込みも読める
+        for number in range(i + 1):
+            page = Page(block_size)
+            file_manager.read(BlockID("mapped.tbl", number), page)
+            assert page.get_int(0) == number + 1
+
+    file_manager.close_all()
+
+
+def test_file_manager_concurrent_append_and_read(setup_dir):
+    block_size = 512
+    manager = FileManager(setup_dir, block_size)
+    file_name = "parallel.db"
+    appended: list[BlockID] = []
+
+    def append_blocks():
+        for _ in range(50):
+            block = manager.append(file_name)
+            page = Page(block_size)
+            page.set_int(0, block.number())
+            manager.write(block, page)
+            appended.append(block)
+
+    threads = [threading.Thread(target=append_blocks) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 同時にappendしても同じブロックは返されず、長さはキャッシュから正しく返る
+    assert sorted(block.number() for block in appended) == list(range(200))
+    assert manager.length(file_name) == 200
+    assert os.path.getsize(os.path.join(setup_dir, file_name)) == 200 * block_size
+
+    errors = []
+
+    def read_blocks():
+        for number in range(200):
+            page = Page(block_size)
+            manager.read(BlockID(file_name, number), page)
+            if page.get_int(0) != number:
+                errors.append(number)
+
+    threads = [threading.Thread(target=read_blocks) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+def test_file_manager_preallocates_extents(setup_dir, monkeypatch):
+    fallocate_calls = []
+    original_fallocate = os.posix_fallocate
+    monkeypatch.setattr(
+        os,
+        "posix_fallocate",
+        lambda fd, offset, size: (fallocate_calls.append((offset, size)), original_fallocate(fd, offset, size)),
+    )
+
+    block_size = 512
+    manager = FileManager(setup_dir, block_size, preallocate=True)
+    file_name = "extent.tbl"
+    file_path = Path(setup_dir) / file_name
+
+    for i in range(100):
+        assert manager.append(file_name).number() == i
+
+    # 2ブロック目から64ブロック、続いてファイルの大きさと同じ65ブロックを確保する
+    assert fallocate_calls == [(block_size, 64 * block_size), (65 * block_size, 65 * block_size)]
+    assert manager.length(file_name) == 100
+    assert file_path.stat().st_size == 130 * block_size
+
+    page = Page(block_size)
+    page.set_int(0, 42)
+    manager.write(BlockID(file_name, 99), page)
+
+    # 閉じるときに使われなかった領域を切り詰める
+    manager.close_all()
+    assert file_path.stat().st_size == 100 * block_size
+
+    reopened = FileManager(setup_dir, block_size, preallocate=True)
+    assert reopened.length(file_name) == 100
+    page = Page(block_size)
+    reopened.read(BlockID(file_name, 99), page)
+    assert page.get_int(0) == 42
+
+
+def test_file_manager_allocates_extents_outside_global_lock(setup_dir, monkeypatch):
+    """エクステントの確保中も、他のスレッドは全体のロックを取れる"""
+    block_size = 512
+    manager = FileManager(setup_dir, block_size, preallocate=True)
+    acquired = []
+
+    def fallocate(fd, offset, size):
+        def acquire():
+            ok = manager._lock.acquire(timeout=1)
+            if ok:
+                manager._lock.release()
+            acquired.append(ok)
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        thread.join()
+        os.ftruncate(fd, offset + size)
+
+    monkeypatch.setattr(os, "posix_fallocate", fallocate)
+
+    results: list[int] = []
+
+    def append_blocks():
+        for _ in range(50):
+            results.append(manager.append("extent.tbl").number())
+
+    threads = [threading.Thread(target=append_blocks) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert acquired and all(acquired)
+    assert sorted(results) == list(range(200))
+    assert Path(setup_dir, "extent.tbl").stat().st_size >= 200 * block_size
+    manager.close_all()
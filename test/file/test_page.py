@@ -1,3 +1,5 @@
+import struct
+
 import pytest
 
 from db.constants import ByteSize
@@ -246,3 +248,34 @@ def test_page_get_contents_isolation():
     original_value = int.from_bytes(contents[0:4], byteorder="big")
     assert original_value == 42
     assert page.get_int(0) == 100
+
+
+def test_page_vector_matches_float_layout():
+    """ベクトルはリトルエンディアンのfloatを連続して並べる"""
+    page = Page(64)
+    page.set_vector(4, [0.5, -2.0])
+    assert page.get_vector(4, 2) == [0.5, -2.0]
+    assert bytes(page.buffer[4:12]) == struct.pack("<ff", 0.5, -2.0)
+    assert Page.vector_struct(2) is Page.vector_struct(2)
+
+
+def test_page_wrap_shares_buffer():
+    buffer = bytearray(32)
+    page = Page.wrap(buffer)
+    page.set_int(0, 42)
+    assert int.from_bytes(buffer[0:4], "little") == 42
+
+    readonly = Page.wrap(memoryview(bytes(buffer)).toreadonly())
+    assert readonly.get_int(0) == 42
+    with pytest.raises(TypeError):
+        readonly.set_int(0, 1)
+
+
+def test_page_get_bytes_view_is_zero_copy():
+    page = Page(64)
+    page.set_string(8, "hello")
+    view = page.get_bytes_view(8)
+    assert view == b"hello"
+    page.set_string(8, "jello")
+    assert view == b"jello"
+    assert page.view().nbytes == 64
@@ -6,8 +6,8 @@ from db.record.record_id import RecordID
 
 @pytest.fixture
 def basic_nodes():
-    apple_fruit = HNSWNode([0.1, 0.2, 0.3], RecordID(1, 2))
-    apple_pc = HNSWNode([0.9, 0.1, 0.5], RecordID(3, 4))
+    apple_fruit = HNSWNode([0.1, 0.2, 0.3], RecordID(1, 2), 0)
+    apple_pc = HNSWNode([0.9, 0.1, 0.5], RecordID(3, 4), 1)
     return apple_fruit, apple_pc
 
 
@@ -19,7 +19,7 @@ def apple_and_orange_query():
 # HNSWNode のテスト
 def test_get_hnsw_node(apple_and_orange_query):
     record_id = RecordID(1, 2)
-    node = HNSWNode(apple_and_orange_query, record_id)
+    node = HNSWNode(apple_and_orange_query, record_id, 0)
 
     assert node.vector == apple_and_orange_query
     assert node.record_id == record_id
@@ -28,9 +28,9 @@ def test_get_hnsw_node(apple_and_orange_query):
 
 def test_set_hnsw_node(apple_and_orange_query):
     record_id = RecordID(1, 2)
-    node = HNSWNode(apple_and_orange_query, record_id)
+    node = HNSWNode(apple_and_orange_query, record_id, 0)
 
-    neighbors_layer_0 = [HNSWNode([0.4, 0.5, 0.6], RecordID(3, 4))]
+    neighbors_layer_0 = [HNSWNode([0.4, 0.5, 0.6], RecordID(3, 4), 1)]
 
     node.set_neighbors(0, neighbors_layer_0)
 
@@ -38,12 +38,17 @@ def test_set_hnsw_node(apple_and_orange_query):
     assert node.get_neighbors(1) == []  # 存在しないレイヤ
 
 
+def test_hnsw_node_requires_node_id(apple_and_orange_query):
+    with pytest.raises(ValueError):
+        HNSWNode(apple_and_orange_query, RecordID(1, 2), -1)
+
+
 # SearchState のテスト
 def test_search_state_initialization(apple_and_orange_query):
-    entry_points = [HNSWNode([0.1, 0.2, 0.3], RecordID(1, 2))]
+    entry_points = [HNSWNode([0.1, 0.2, 0.3], RecordID(1, 2), 5)]
     state = SearchState(entry_points, apple_and_orange_query)
 
-    assert state.visited == {id(entry_points[0])}
+    assert state.visited == {5}
     assert len(state.candidates) == 1
     assert len(state.nearest_set) == 1
 
@@ -51,15 +56,16 @@ def test_search_state_initialization(apple_and_orange_query):
 def test_search_state_sorted(apple_and_orange_query, basic_nodes):
     apple_fruit, apple_pc = basic_nodes
 
-    state = SearchState([apple_fruit, apple_pc], apple_and_orange_query)
+    state = SearchState([apple_pc, apple_fruit], apple_and_orange_query)
 
-    assert state.candidates[0][1] == apple_fruit
-    assert state.candidates[1][1] == apple_pc
-    assert state.nearest_set[0][1] == apple_fruit
+    # 候補は最も近いノード、結果は最も遠いノードがヒープの先頭にある
+    assert state.candidates[0][2] == apple_fruit
+    assert state.nearest_set[0][2] == apple_pc
+    assert [node for _, node in state.search_layer(apple_and_orange_query, ef=2, layer=0)] == [apple_fruit, apple_pc]
 
 
 def test_search_layer_no_candidates(apple_and_orange_query):
-    apple_fruit = HNSWNode([0.1, 0.2, 0.3], RecordID(1, 2))
+    apple_fruit = HNSWNode([0.1, 0.2, 0.3], RecordID(1, 2), 0)
     apple_and_orange_query = [0.1, 0.2, 0.3]
     state = SearchState([apple_fruit], apple_and_orange_query)
 
@@ -86,7 +92,7 @@ def test_update_with_visited_neighbors(basic_nodes, apple_and_orange_query):
 
     state = SearchState([apple_fruit], apple_and_orange_query)
     apple_fruit.set_neighbors(0, [apple_pc])
-    state.visited.add(id(apple_pc))
+    state.visited.add(apple_pc.node_id)
 
     result = state.search_layer(apple_and_orange_query, ef=2, layer=0)
 
@@ -144,3 +150,26 @@ def test_search(apple_and_orange_query, basic_nodes):
     assert len(results) == 2
     assert results[0] == RecordID(1, 2)
     assert results[1] == RecordID(3, 4)
+
+
+def test_search_widens_ef_to_k():
+    """kがef_searchより大きければkまで候補を広げ、新しいノードからも辿れるようにリンクする"""
+    index = HNSWIndex(max_node_conn=4, ef_construction=8, ef_search=2)
+    for i in range(40):
+        index.insert([1.0, i / 10], RecordID(0, i))
+
+    assert all(node.get_neighbors(0) for node in index.nodes)
+
+    results = index.search([1.0, 0.0], k=20)
+    assert len(results) == 20
+    assert results[0] == RecordID(0, 0)
+
+
+def test_search_layer_keeps_ef_nearest(apple_and_orange_query):
+    nodes = [HNSWNode([0.1, 0.2, 0.2 + i / 10], RecordID(0, i), i) for i in range(6)]
+    nodes[0].set_neighbors(0, nodes[1:])
+
+    result = SearchState([nodes[0]], apple_and_orange_query).search_layer(apple_and_orange_query, ef=3, layer=0)
+
+    assert [node for _, node in result] == nodes[:3]
+    assert [dist for dist, _ in result] == sorted(dist for dist, _ in result)
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from db.index.hnsw.hnsw_index import HNSWIndex
+from db.index.hnsw.hnsw_store import HNSWStore
+from db.materialize.vector_sort_plan import VectorSortPlan
+from db.record.record_id import RecordID
+from db.server.keipy_db import KeiPyDB
+
+
+@pytest.fixture
+def db_dir():
+    temp_dir = tempfile.mkdtemp()
+    yield temp_dir
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+
+
+def insert_items(db, tx, start, stop):
+    planner = db.get_planner()
+    for i in range(start, stop):
+        planner.execute_update(f"INSERT INTO items (name, embedding) VALUES ('item{i}', '[1.0, {i / 10}]')", tx)
+
+
+def nearest_names(db, tx, limit):
+    plan = db.get_planner().create_query_plan(
+        f"SELECT name FROM items ORDER BY embedding <-> '[1.0, 0.0]' LIMIT {limit}", tx
+    )
+    scan = plan.open()
+    names = []
+    while scan.next():
+        names.append(scan.get_string("name"))
+    scan.close()
+    return names
+
+
+def neighbor_ids(graph):
+    return [
+        {layer: [neighbor.node_id for neighbor in neighbors] for layer, neighbors in node.neighbors.items()}
+        for node in graph.nodes
+    ]
+
+
+def test_hnsw_index_survives_restart(db_dir):
+    db = KeiPyDB(db_dir)
+    tx = db.new_transaction()
+    planner = db.get_planner()
+    planner.execute_update("CREATE TABLE items (name varchar(20), embedding vector(2))", tx)
+    insert_items(db, tx, 0, 10)
+    # 既存の行でインデックスを作り、その後の挿入もインデックスに加える
+    planner.execute_update("CREATE INDEX emb_idx ON items (embedding) USING hnsw", tx)
+    insert_items(db, tx, 10, 30)
+    graph = db.metadata_manager.get_index_info("items", tx)["embedding"].open_vector(tx).graph
+    assert len(graph.nodes) == 30
+    assert nearest_names(db, tx, 3) == ["item0", "item1", "item2"]
+    tx.commit()
+
+    restarted = KeiPyDB(db_dir)
+    tx = restarted.new_transaction()
+    index_def = restarted.metadata_manager.get_index_info("items", tx)["embedding"]
+    loaded = index_def.open_vector(tx).graph
+
+    assert [node.record_id for node in loaded.nodes] == [node.record_id for node in graph.nodes]
+    assert neighbor_ids(loaded) == neighbor_ids(graph)
+    assert loaded.max_layer == graph.max_layer
+    assert loaded.entry_point is not None and graph.entry_point is not None
+    assert loaded.entry_point.node_id == graph.entry_point.node_id
+
+    plan = restarted.get_planner().create_query_plan(
+        "SELECT name FROM items ORDER BY embedding <-> '[1.0, 0.0]' LIMIT 3", tx
+    )
+    vector_sort_plan = plan.source_plan.plan
+    assert isinstance(vector_sort_plan, VectorSortPlan)
+    assert vector_sort_plan.vector_index is not None
+    assert nearest_names(restarted, tx, 3) == ["item0", "item1", "item2"]
+    tx.commit()
+
+
+def test_hnsw_graph_reloads_after_rollback(db_dir):
+    db = KeiPyDB(db_dir)
+    tx = db.new_transaction()
+    planner = db.get_planner()
+    planner.execute_update("CREATE TABLE items (name varchar(20), embedding vector(2))", tx)
+    planner.execute_update("CREATE INDEX emb_idx ON items (embedding) USING hnsw", tx)
+    insert_items(db, tx, 0, 5)
+    tx.commit()
+
+    tx = db.new_transaction()
+    insert_items(db, tx, 5, 8)
+    tx.rollback()
+
+    tx = db.new_transaction()
+    vector_index = db.metadata_manager.get_index_info("items", tx)["embedding"].open_vector(tx)
+    assert len(vector_index.graph.nodes) == 5
+    tx.commit()
+
+
+def test_hnsw_rollback_discards_shared_graph(db_dir):
+    db = KeiPyDB(db_dir)
+    tx = db.new_transaction()
+    planner = db.get_planner()
+    planner.execute_update("CREATE TABLE items (name varchar(20), embedding vector(2))", tx)
+    planner.execute_update("CREATE INDEX emb_idx ON items (embedding) USING hnsw", tx)
+    insert_items(db, tx, 0, 5)
+    tx.commit()
+
+    tx = db.new_transaction()
+    planner.execute_update("INSERT INTO items (name, embedding) VALUES ('ghost', '[1.0, 0.0]')", tx)
+    assert "ghost" in nearest_names(db, tx, 2)
+    tx.rollback()
+    # ロールバックした挿入を含むグラフは共有から外れる
+    assert "emb_idx" not in db.metadata_manager.index_manager.vector_graphs.graphs
+
+    tx = db.new_transaction()
+    assert nearest_names(db, tx, 2) == ["item0", "item1"]
+    insert_items(db, tx, 5, 8)
+    tx.commit()
+
+    restarted = KeiPyDB(db_dir)
+    tx = restarted.new_transaction()
+    graph = restarted.metadata_manager.get_index_info("items", tx)["embedding"].open_vector(tx).graph
+    assert [node.node_id for node in graph.nodes] == list(range(8))
+    assert nearest_names(restarted, tx, 2) == ["item0", "item1"]
+    tx.commit()
+
+
+def test_hnsw_store_rejects_too_many_neighbors(test_db):
+    _, tx = test_db
+    graph = HNSWIndex(max_node_conn=2)
+    store = HNSWStore("small_idx", 2, 1)
+    changes = graph.add([1.0, 0.0], RecordID(0, 0))
+    changes += graph.add([1.0, 0.1], RecordID(0, 1))
+    store.save(tx, graph, changes)
+    changes = graph.add([1.0, 0.2], RecordID(0, 2))
+
+    with pytest.raises(ValueError):
+        store.save(tx, graph, changes)
@@ -246,3 +246,29 @@ def test_log_iterator_boundary_conditions():
 
     finally:
         shutil.rmtree(temp_dir)
+
+
+def test_log_iterator_records_survive_block_change():
+    """返したレコードは後続のブロックを読んでも変わらない"""
+    import shutil
+    import tempfile
+
+    from db.log.log_manager import LogManager
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_manager = FileManager(temp_dir, 64)
+        log_manager = LogManager(file_manager, "views_test")
+        records = [f"record-{i}".encode() for i in range(10)]
+        for record in records:
+            log_manager.append(record)
+
+        iterator = log_manager.iterator()
+        retrieved = []
+        while iterator.has_next():
+            retrieved.append(next(iterator))
+
+        assert all(isinstance(record, memoryview) for record in retrieved)
+        assert [bytes(record) for record in retrieved] == list(reversed(records))
+    finally:
+        shutil.rmtree(temp_dir)
@@ -1,5 +1,7 @@
 import shutil
 import tempfile
+import threading
+import time
 
 import pytest
 
@@ -254,3 +256,53 @@ def test_log_manager_stress_test(temp_log_env):
     # 最終flush
     log_manager.flush(lsns[-1])
     assert log_manager.last_saved_lsn == lsns[-1]
+
+
+def test_flush_writes_pending_blocks(temp_log_env):
+    """ブロックをまたいだレコードがflush後に全て読み出せる"""
+    log_manager, file_manager, log_file = temp_log_env
+
+    records = [f"record {i}".encode() * 10 for i in range(50)]
+    for record in records:
+        log_manager.append(record)
+    log_manager.flush(log_manager.current_lsn)
+
+    assert file_manager.length(log_file) == log_manager.current_block.number() + 1
+    iterator = log_manager.iterator()
+    read_records = []
+    while iterator.has_next():
+        read_records.append(next(iterator))
+
+    assert read_records == list(reversed(records))
+
+
+def test_group_commit_shares_fsync(temp_log_env, monkeypatch):
+    """同時にflushするスレッドは一つのfsyncでまとめて永続化される"""
+    log_manager, file_manager, log_file = temp_log_env
+
+    sync_calls = []
+    original_sync = file_manager.sync
+
+    def slow_sync(file_name):
+        sync_calls.append(file_name)
+        time.sleep(0.05)
+        original_sync(file_name)
+
+    monkeypatch.setattr(file_manager, "sync", slow_sync)
+
+    num_threads = 10
+    barrier = threading.Barrier(num_threads)
+
+    def commit(i):
+        lsn = log_manager.append(f"commit {i}".encode())
+        barrier.wait()
+        log_manager.flush(lsn)
+
+    threads = [threading.Thread(target=commit, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert log_manager.last_saved_lsn == num_threads
+    assert len(sync_calls) < num_threads
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from db.materialize.count_function import CountFunction
+from db.materialize.group_by_plan import GroupByPlan
+from db.materialize.hash_group_by_plan import HashGroupByPlan, create_group_by_plan
+from db.materialize.hash_group_by_scan import HashGroupByScan
+from db.materialize.max_function import MaxFunction
+from db.plan.table_plan import TablePlan
+from db.query.constant import Constant
+from db.server.keipy_db import KeiPyDB
+
+
+def create_sales(db, tx, num_rows, num_shops):
+    planner = db.get_planner()
+    planner.execute_update("CREATE TABLE sales (shop varchar(10), amount int)", tx)
+    for i in range(num_rows):
+        planner.execute_update(f"INSERT INTO sales (shop, amount) VALUES ('s{i % num_shops}', {i})", tx)
+
+
+def expected_groups(num_rows, num_shops):
+    groups: dict[str, tuple[int, int]] = {}
+    for i in range(num_rows):
+        shop = f"s{i % num_shops}"
+        count, _ = groups.get(shop, (0, 0))
+        groups[shop] = (count + 1, i)
+    return sorted((shop, count, amount) for shop, (count, amount) in groups.items())
+
+
+def grouped_rows(scan):
+    rows = []
+    while scan.next():
+        rows.append((scan.get_string("shop"), scan.get_int("countofamount"), scan.get_int("amount")))
+    return sorted(rows)
+
+
+def test_hash_group_by(test_db):
+    db, tx = test_db
+    create_sales(db, tx, 60, 7)
+
+    sales = TablePlan(tx, "sales", db.metadata_manager)
+    plan = HashGroupByPlan(tx, sales, ["shop"], [CountFunction("amount"), MaxFunction("amount")])
+    assert plan.schema().get_fields() == ["shop", "countofamount", "amount"]
+
+    scan = plan.open()
+    assert grouped_rows(scan) == expected_groups(60, 7)
+    scan.before_first()
+    assert grouped_rows(scan) == expected_groups(60, 7)
+    scan.close()
+
+
+def test_hash_group_by_spills_groups(test_db):
+    """ハッシュ表に入りきらないグループは一時テーブルに書き出して後から集計する"""
+    db, tx = test_db
+    create_sales(db, tx, 80, 23)
+
+    sales = TablePlan(tx, "sales", db.metadata_manager)
+    plan = HashGroupByPlan(tx, sales, ["shop"], [CountFunction("amount"), MaxFunction("amount")], max_groups=3)
+
+    scan = plan.open()
+    assert grouped_rows(scan) == expected_groups(80, 23)
+    scan.close()
+
+
+@pytest.fixture
+def small_db():
+    temp_dir = tempfile.mkdtemp()
+    db = KeiPyDB(temp_dir, block_size=400, buffer_size=8)
+    tx = db.new_transaction()
+    yield db, tx
+    tx.commit()
+    db.close()
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+
+
+def test_create_group_by_plan(small_db):
+    db, tx = small_db
+    create_sales(db, tx, 150, 4)
+
+    sales = TablePlan(tx, "sales", db.metadata_manager)
+    plan = create_group_by_plan(tx, sales, ["shop"], [CountFunction("amount")])
+    assert isinstance(plan, HashGroupByPlan)
+
+    # グループ数がメモリに収まらず、行数に比べても少なくなければ並べ替えて集計する
+    plan = create_group_by_plan(tx, sales, ["shop", "amount"], [CountFunction("amount")])
+    assert isinstance(plan, GroupByPlan)
+
+
+def test_hash_group_by_scan_reads_source_on_first_next(test_db):
+    """集計は開いたときではなく、最初にnextを呼んだときに行う"""
+    db, tx = test_db
+    create_sales(db, tx, 10, 3)
+
+    sales = TablePlan(tx, "sales", db.metadata_manager)
+    opened = []
+
+    def open_source():
+        opened.append(True)
+        return sales.open()
+
+    scan = HashGroupByScan(tx, open_source, sales.schema(), ["shop"], [CountFunction("amount")], 10, 2)
+    scan.before_first()
+    assert opened == []
+    assert scan.next()
+    assert opened == [True]
+    scan.close()
+
+
+def test_aggregation_function_clone_is_fresh():
+    """cloneは集計の状態を共有しない新しいインスタンスを返す"""
+    count = CountFunction("amount")
+    count._count = 5
+    max_fn = MaxFunction("amount")
+    max_fn.current_max = Constant(7)
+
+    count_clone = count.clone()
+    max_clone = max_fn.clone()
+
+    assert count_clone is not count and count_clone.get_value() == Constant(0)
+    assert count_clone.field_name() == count.field_name()
+    assert max_clone is not max_fn and max_clone.current_max is None
+    assert max_clone.field_name() == max_fn.field_name()
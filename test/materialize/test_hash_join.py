@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from db.materialize.hash_join_plan import HashJoinPlan
+from db.opt.table_planner import TablePlanner
+from db.parse.parser import Parser
+from db.plan.select_plan import SelectPlan
+from db.plan.table_plan import TablePlan
+from db.server.keipy_db import KeiPyDB
+
+
+def create_tables(db, tx, num_customers, num_orders):
+    planner = db.get_planner()
+    planner.execute_update("CREATE TABLE customers (cid int, cname varchar(20))", tx)
+    planner.execute_update("CREATE TABLE orders (oid int, ocid int, item varchar(20))", tx)
+    for cid in range(num_customers):
+        planner.execute_update(f"INSERT INTO customers (cid, cname) VALUES ({cid}, 'c{cid}')", tx)
+    for oid in range(num_orders):
+        # 存在しない顧客の注文と、複数の注文を持つ顧客を含める
+        planner.execute_update(
+            f"INSERT INTO orders (oid, ocid, item) VALUES ({oid}, {oid % (num_customers + 3)}, 'i{oid}')", tx
+        )
+
+
+def expected_rows(num_customers, num_orders):
+    return sorted(
+        (oid, f"c{oid % (num_customers + 3)}", f"i{oid}")
+        for oid in range(num_orders)
+        if oid % (num_customers + 3) < num_customers
+    )
+
+
+def joined_rows(plan):
+    scan = plan.open()
+    rows = []
+    while scan.next():
+        assert scan.get_int("cid") == scan.get_int("ocid")
+        rows.append((scan.get_int("oid"), scan.get_string("cname"), scan.get_string("item")))
+    scan.close()
+    return sorted(rows)
+
+
+def test_hash_join_in_memory(test_db):
+    db, tx = test_db
+    create_tables(db, tx, 10, 40)
+
+    customers = TablePlan(tx, "customers", db.metadata_manager)
+    orders = TablePlan(tx, "orders", db.metadata_manager)
+    plan = HashJoinPlan(tx, customers, orders, "cid", "ocid")
+
+    assert plan.num_partitions() == 1
+    assert plan.schema().get_fields() == ["cid", "cname", "oid", "ocid", "item"]
+    assert joined_rows(plan) == expected_rows(10, 40)
+
+
+@pytest.fixture
+def small_db():
+    temp_dir = tempfile.mkdtemp()
+    db = KeiPyDB(temp_dir, block_size=400, buffer_size=8)
+    tx = db.new_transaction()
+    yield db, tx
+    tx.commit()
+    db.close()
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+
+
+def test_hash_join_spills_partitions(small_db):
+    """ビルド側がバッファプールに収まらなければ一時テーブルに分割して結合する"""
+    db, tx = small_db
+    create_tables(db, tx, 150, 200)
+
+    customers = TablePlan(tx, "customers", db.metadata_manager)
+    orders = TablePlan(tx, "orders", db.metadata_manager)
+    plan = HashJoinPlan(tx, customers, orders, "cid", "ocid")
+
+    assert plan.num_partitions() > 1
+    assert joined_rows(plan) == expected_rows(150, 200)
+
+    scan = plan.open()
+    first_pass = 0
+    while scan.next():
+        first_pass += 1
+    scan.before_first()
+    second_pass = 0
+    while scan.next():
+        second_pass += 1
+    scan.close()
+    assert first_pass == second_pass == len(expected_rows(150, 200))
+
+
+def test_table_planner_picks_hash_join(test_db):
+    db, tx = test_db
+    create_tables(db, tx, 10, 40)
+
+    query = Parser("SELECT cname, item FROM customers, orders WHERE cid = ocid").query()
+    table_planner = TablePlanner("orders", query.get_predicate(), tx, db.metadata_manager)
+    customers = TablePlan(tx, "customers", db.metadata_manager)
+
+    plan = table_planner.make_join_plan(customers)
+
+    # 結合キーの等号はハッシュ結合が満たすので、上にSelectPlanを重ねない
+    assert isinstance(plan, HashJoinPlan)
+    assert joined_rows(plan) == expected_rows(10, 40)
+
+
+def test_hash_join_keeps_other_join_terms(test_db):
+    db, tx = test_db
+    create_tables(db, tx, 10, 40)
+    db.get_planner().execute_update("INSERT INTO customers (cid, cname) VALUES (100, 'i100')", tx)
+    db.get_planner().execute_update("INSERT INTO orders (oid, ocid, item) VALUES (100, 100, 'i100')", tx)
+
+    query = Parser("SELECT cname, item FROM customers, orders WHERE cid = ocid AND cname = item").query()
+    table_planner = TablePlanner("orders", query.get_predicate(), tx, db.metadata_manager)
+    customers = TablePlan(tx, "customers", db.metadata_manager)
+
+    plan = table_planner.make_join_plan(customers)
+
+    assert isinstance(plan, SelectPlan)
+    assert isinstance(plan.plan, HashJoinPlan)
+    assert [str(term) for term in plan.predicate.terms] == ["cname = item"]
+    assert joined_rows(plan) == [(100, "i100", "i100")]
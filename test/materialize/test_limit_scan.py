@@ -16,3 +16,24 @@ def test_limit(test_db):
     scan.close()
 
     assert results == [50, 80]
+
+
+def test_limit_next_batch(test_db):
+    db, tx = test_db
+    planner = db.get_planner()
+
+    planner.execute_update("CREATE TABLE items (name varchar(20), price int)", tx)
+    for i in range(10):
+        planner.execute_update(f"INSERT INTO items (name, price) VALUES ('item{i}', {i})", tx)
+
+    plan = planner.create_query_plan("SELECT name, price FROM items WHERE price = 3 LIMIT 5", tx)
+    scan = plan.open()
+    assert list(scan.next_batch(10).column("name")) == ["item3"]
+    scan.close()
+
+    plan = planner.create_query_plan("SELECT price FROM items LIMIT 4", tx)
+    scan = plan.open()
+    assert list(scan.next_batch(3).column("price")) == [0, 1, 2]
+    assert list(scan.next_batch(3).column("price")) == [3]
+    assert len(scan.next_batch(3)) == 0
+    scan.close()
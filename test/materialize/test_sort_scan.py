@@ -1,5 +1,13 @@
+import random
+
 import pytest
 
+from db.index.hnsw.hnsw_index import HNSWIndex
+from db.materialize.sort_plan import SortPlan
+from db.materialize.vector_sort_plan import VectorSortPlan
+from db.parse.query_data import OrderByField, VectorOrderBy
+from db.plan.table_plan import TablePlan
+
 
 def test_sort_scan_single_field(test_db):
     db, tx = test_db
@@ -189,3 +197,160 @@ def test_sort_scan_save_and_restore_position(test_db):
     assert scan.get_int("price") == 80
 
     scan.close()
+
+
+def test_vector_sort_copies_only_projected_fields(test_db):
+    db, tx = test_db
+    planner = db.get_planner()
+
+    planner.execute_update("CREATE TABLE items (name varchar(20), price int, embedding vector(3))", tx)
+    planner.execute_update("INSERT INTO items (name, price, embedding) VALUES ('far', 1, '[0.0, 0.0, 1.0]')", tx)
+    planner.execute_update("INSERT INTO items (name, price, embedding) VALUES ('close', 1, '[1.0, 0.0, 0.0]')", tx)
+    planner.execute_update("INSERT INTO items (name, price, embedding) VALUES ('other', 2, '[1.0, 0.0, 0.0]')", tx)
+
+    table_plan = TablePlan(tx, "items", db.metadata_manager, ["embedding", "name", "price"])
+    order_by = VectorOrderBy("embedding", [1.0, 0.0, 0.0])
+    vector_plan = VectorSortPlan(tx, table_plan, order_by, field_names=["name"])
+    assert vector_plan.schema().get_fields() == ["name"]
+
+    scan = vector_plan.open()
+    assert not scan.has_field("embedding")
+    scan.close()
+
+    plan = planner.create_query_plan(
+        "SELECT name FROM items WHERE price = 1 ORDER BY embedding <-> '[1.0, 0.0, 0.0]' LIMIT 3", tx
+    )
+    scan = plan.open()
+    results = []
+    while scan.next():
+        results.append(scan.get_string("name"))
+    scan.close()
+
+    assert results == ["close", "far"]
+
+
+def create_shuffled_items(db, tx, num_rows):
+    planner = db.get_planner()
+    planner.execute_update("CREATE TABLE items (name varchar(20), price int)", tx)
+    prices = list(range(num_rows))
+    random.Random(0).shuffle(prices)
+    for price in prices:
+        planner.execute_update(f"INSERT INTO items (name, price) VALUES ('item{price % 7}', {price})", tx)
+
+
+def test_sort_plan_replacement_selection_runs(test_db):
+    """置換選択のランはメモリに置ける行数より長くなる"""
+    db, tx = test_db
+    create_shuffled_items(db, tx, 120)
+
+    table_plan = TablePlan(tx, "items", db.metadata_manager)
+    plan = SortPlan(tx, table_plan, [OrderByField("price")], max_records=10)
+    source = table_plan.open()
+    runs = plan._split_into_runs(source)
+    source.close()
+
+    assert 1 < len(runs) < 12
+    total = 0
+    for run in runs:
+        scan = run.open()
+        prices = []
+        while scan.next():
+            prices.append(scan.get_int("price"))
+        scan.close()
+        assert prices == sorted(prices)
+        total += len(prices)
+    assert total == 120
+
+
+def test_sort_plan_merges_many_runs(test_db):
+    db, tx = test_db
+    create_shuffled_items(db, tx, 200)
+
+    table_plan = TablePlan(tx, "items", db.metadata_manager)
+    plan = SortPlan(tx, table_plan, [OrderByField("name"), OrderByField("price", False)], max_records=2)
+    scan = plan.open()
+    results = []
+    while scan.next():
+        results.append((scan.get_string("name"), scan.get_int("price")))
+
+    expected = sorted(((f"item{price % 7}", price) for price in range(200)), key=lambda row: (row[0], -row[1]))
+    assert results == expected
+
+    scan.before_first()
+    scan.next()
+    scan.next()
+    scan.save_position()
+    for _ in range(50):
+        scan.next()
+    scan.restore_position()
+    remaining = [(scan.get_string("name"), scan.get_int("price"))]
+    while scan.next():
+        remaining.append((scan.get_string("name"), scan.get_int("price")))
+    scan.close()
+
+    assert remaining == expected[1:]
+
+
+def create_vector_items(db, tx, num_rows):
+    planner = db.get_planner()
+    planner.execute_update("CREATE TABLE items (name varchar(20), embedding vector(2))", tx)
+    for i in range(num_rows):
+        planner.execute_update(f"INSERT INTO items (name, embedding) VALUES ('item{i}', '[1.0, {i / 10}]')", tx)
+
+
+def test_vector_sort_limit_by_linear(test_db):
+    db, tx = test_db
+    create_vector_items(db, tx, 30)
+
+    table_plan = TablePlan(tx, "items", db.metadata_manager)
+    plan = VectorSortPlan(tx, table_plan, VectorOrderBy("embedding", [1.0, 0.0]), limit=4)
+    assert plan.records_output() <= 4
+
+    scan = plan.open()
+    results = []
+    while scan.next():
+        results.append(scan.get_string("name"))
+    scan.close()
+
+    assert results == ["item0", "item1", "item2", "item3"]
+
+
+def test_vector_sort_limit_by_index(test_db):
+    """LIMITがインデックスのdefault_kより大きくてもLIMIT行を返す"""
+    db, tx = test_db
+    create_vector_items(db, tx, 30)
+
+    table_plan = TablePlan(tx, "items", db.metadata_manager)
+    index = HNSWIndex(ef_search=4)
+    scan = table_plan.open()
+    while scan.next():
+        index.insert(scan.get_vector("embedding"), scan.get_rid())
+    scan.close()
+
+    limit = index.default_k + 5
+    plan = VectorSortPlan(tx, table_plan, VectorOrderBy("embedding", [1.0, 0.0]), index, limit=limit)
+    scan = plan.open()
+    results = []
+    while scan.next():
+        results.append(scan.get_string("name"))
+    scan.close()
+
+    assert len(results) == limit
+    assert results[0] == "item0"
+
+
+def test_vector_sort_computes_distances_in_batches(test_db, monkeypatch):
+    db, tx = test_db
+    create_vector_items(db, tx, 30)
+    # 行数が一度に計算する行数の倍数にならないようにする
+    monkeypatch.setattr(VectorSortPlan, "DISTANCE_BATCH", 4)
+
+    table_plan = TablePlan(tx, "items", db.metadata_manager)
+    plan = VectorSortPlan(tx, table_plan, VectorOrderBy("embedding", [1.0, 0.0]))
+    scan = plan.open()
+    results = []
+    while scan.next():
+        results.append(scan.get_string("name"))
+    scan.close()
+
+    assert results == [f"item{i}" for i in range(30)]
@@ -0,0 +1,59 @@
+import random
+
+from db.materialize.limit_plan import LimitPlan
+from db.materialize.top_n_sort_plan import TopNSortPlan
+from db.parse.query_data import OrderByField
+from db.plan.table_plan import TablePlan
+
+
+def create_items(db, tx, num_rows):
+    planner = db.get_planner()
+    planner.execute_update("CREATE TABLE items (name varchar(20), price int)", tx)
+    prices = list(range(num_rows))
+    random.Random(1).shuffle(prices)
+    for price in prices:
+        planner.execute_update(f"INSERT INTO items (name, price) VALUES ('item{price}', {price % 10})", tx)
+
+
+def read_rows(scan):
+    rows = []
+    while scan.next():
+        rows.append((scan.get_int("price"), scan.get_string("name")))
+    scan.close()
+    return rows
+
+
+def test_planner_uses_top_n_sort(test_db):
+    db, tx = test_db
+    create_items(db, tx, 100)
+
+    plan = db.get_planner().create_query_plan("SELECT name, price FROM items ORDER BY price DESC, name LIMIT 5", tx)
+    assert isinstance(plan, TopNSortPlan)
+    assert plan.records_output() <= 5
+
+    expected = sorted(((price % 10, f"item{price}") for price in range(100)), key=lambda row: (-row[0], row[1]))
+    assert read_rows(plan.open()) == expected[:5]
+
+
+def test_top_n_sort_keeps_input_order_for_ties(test_db):
+    db, tx = test_db
+    create_items(db, tx, 50)
+
+    table_plan = TablePlan(tx, "items", db.metadata_manager)
+    scan = table_plan.open()
+    input_order = read_rows(scan)
+
+    plan = TopNSortPlan(tx, table_plan, [OrderByField("price")], 8)
+    assert (
+        read_rows(plan.open())
+        == [row for row in input_order if row[0] == 0][:5] + [row for row in input_order if row[0] == 1][:3]
+    )
+
+
+def test_planner_falls_back_to_sort_and_limit(test_db):
+    db, tx = test_db
+    create_items(db, tx, 20)
+
+    plan = db.get_planner().create_query_plan("SELECT name, price FROM items ORDER BY price LIMIT 1000000", tx)
+    assert isinstance(plan, LimitPlan)
+    assert len(read_rows(plan.open())) == 20
@@ -7,11 +7,14 @@ from db.buffer.buffer_manager import BufferManager
 from db.constants import FieldType
 from db.file.file_manager import FileManager
 from db.index.hnsw.hnsw_index import HNSWIndex
+from db.index.hnsw.hnsw_store import HNSWStore
+from db.index.hnsw.persistent_hnsw_index import PersistentHNSWIndex, VectorGraphs
 from db.index.vector_index import VectorIndex
 from db.log.log_manager import LogManager
 from db.metadata.index_def import IndexDef
 from db.metadata.stat_info import StatInfo
 from db.record.layout import Layout
+from db.record.record_id import RecordID
 from db.record.schema import Schema
 from db.transaction.transaction import Transaction
 
@@ -186,29 +189,72 @@ def test_index_def_open_method(real_index_def_env):
     tx.commit()
 
 
-def test_index_def_open_vector_returns_hnsw_index():
-    """IndexDefのopen_vectorメソッドがHNSWIndexを返すことを確認"""
-    table_schema, _ = create_test_schema_and_layout()
+def create_vector_schema():
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_vector_field("embedding", 3)
+    return schema
+
+
+def test_index_def_open_vector_returns_persistent_hnsw_index(real_index_def_env):
+    """IndexDefのopen_vectorメソッドがディスクに保存されるHNSWインデックスを返すことを確認"""
+    file_manager, log_manager, buffer_manager = real_index_def_env
+    tx = Transaction(file_manager, log_manager, buffer_manager)
     stat_info = StatInfo(num_blocks=5, num_records=50)
 
-    index_def = IndexDef("idx_vector", "name", table_schema, stat_info)
+    index_def = IndexDef("idx_vector", "embedding", create_vector_schema(), stat_info, "hnsw")
 
-    vector_index = index_def.open_vector()
+    vector_index = index_def.open_vector(tx)
 
-    assert isinstance(vector_index, HNSWIndex)
+    assert isinstance(vector_index, PersistentHNSWIndex)
     assert isinstance(vector_index, VectorIndex)
+    assert isinstance(vector_index.graph, HNSWIndex)
+    tx.commit()
 
 
-def test_index_def_open_vector_return_caches_instance():
-    table_schema, _ = create_test_schema_and_layout()
+def test_index_def_open_vector_shares_graph(real_index_def_env):
+    """IndexDefを作り直しても、同じvector_graphsを渡せば読み込んだグラフを共有する"""
+    file_manager, log_manager, buffer_manager = real_index_def_env
+    tx = Transaction(file_manager, log_manager, buffer_manager)
     stat_info = StatInfo(num_blocks=5, num_records=50)
+    vector_graphs = VectorGraphs()
 
-    index_def = IndexDef("idx_vector_cache", "name", table_schema, stat_info)
+    index_def1 = IndexDef("idx_vector_cache", "embedding", create_vector_schema(), stat_info, "hnsw", vector_graphs)
+    index_def2 = IndexDef("idx_vector_cache", "embedding", create_vector_schema(), stat_info, "hnsw", vector_graphs)
 
-    vector_index1 = index_def.open_vector()
-    vector_index2 = index_def.open_vector()
+    vector_index1 = index_def1.open_vector(tx)
+    vector_index1.insert([1.0, 0.0, 0.0], RecordID(0, 1))
+    vector_index2 = index_def2.open_vector(tx)
 
-    assert vector_index1 is vector_index2
+    assert vector_index1.graph is vector_index2.graph
+    assert vector_index2.search([1.0, 0.0, 0.0], k=1) == [RecordID(0, 1)]
+    tx.commit()
+
+
+def test_index_def_open_vector_loads_graph_once(real_index_def_env, monkeypatch):
+    """読み込んだグラフはヘッダを読み直さずに使い、インデックスごとに別のロックで守る"""
+    file_manager, log_manager, buffer_manager = real_index_def_env
+    tx = Transaction(file_manager, log_manager, buffer_manager)
+    stat_info = StatInfo(num_blocks=5, num_records=50)
+    vector_graphs = VectorGraphs()
+    loads: list[str] = []
+    original_load = HNSWStore.load
+
+    def record_load(store: HNSWStore, transaction: Transaction, graph: HNSWIndex) -> None:
+        loads.append(store.head_table)
+        original_load(store, transaction, graph)
+
+    monkeypatch.setattr(HNSWStore, "load", record_load)
+
+    index_def = IndexDef("idx_vector_once", "embedding", create_vector_schema(), stat_info, "hnsw", vector_graphs)
+    index_def.open_vector(tx).insert([1.0, 0.0, 0.0], RecordID(0, 1))
+    vector_index = index_def.open_vector(tx)
+    assert vector_index.search([1.0, 0.0, 0.0], k=1) == [RecordID(0, 1)]
+    assert loads == ["idx_vector_oncehnswhead"]
+
+    assert vector_graphs.lock("idx_vector_once") is vector_graphs.lock("idx_vector_once")
+    assert vector_graphs.lock("idx_vector_once") is not vector_graphs.lock("idx_other")
+    tx.commit()
 
 
 def test_index_def_with_different_field_types():
@@ -359,3 +359,19 @@ def test_stat_manager_edge_cases(real_stat_env):
         print(f"None table name error: {e}")
 
     tx.commit()
+
+
+def test_stat_manager_periodic_refresh(real_stat_env):
+    """呼び出し回数が閾値を超えて統計情報を更新してもデッドロックしない"""
+    file_manager, log_manager, buffer_manager = real_stat_env
+    tx = Transaction(file_manager, log_manager, buffer_manager)
+    table_manager = TableManager(True, tx)
+    stat_manager = StatManager(table_manager, tx)
+    create_test_table_with_data(table_manager, tx, "refreshed", num_records=5)
+
+    for _ in range(101):
+        stat_info = stat_manager.get_stat_info("refreshed", tx)
+
+    assert stat_manager.num_calls == 0
+    assert stat_info.records_output() == 5
+    tx.commit()
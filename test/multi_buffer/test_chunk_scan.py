@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+
+import pytest
+
+from db.buffer.buffer_manager import BufferManager
+from db.file.file_manager import FileManager
+from db.log.log_manager import LogManager
+from db.multi_buffer.chunk_scan import ChunkScan
+from db.record.layout import Layout
+from db.record.schema import Schema
+from db.record.table_scan import TableScan
+from db.transaction.transaction import Transaction
+
+
+@pytest.fixture
+def transaction():
+    test_dir = tempfile.mkdtemp()
+    file_manager = FileManager(test_dir, 400)
+    log_manager = LogManager(file_manager, "test.log")
+    buffer_manager = BufferManager(file_manager, log_manager, 10)
+    yield Transaction(file_manager, log_manager, buffer_manager)
+    file_manager.close_all()
+    shutil.rmtree(test_dir, ignore_errors=True)
+
+
+def test_chunk_scan_next_batch_matches_next(transaction):
+    """next_batchはnextと同じ行をチャンクの範囲内で返す"""
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_string_field("name", 10)
+    layout = Layout(schema)
+
+    table_scan = TableScan(transaction, "chunk", layout)
+    for i in range(100):
+        table_scan.insert()
+        table_scan.set_int("id", i)
+        table_scan.set_string("name", f"n{i}")
+    table_scan.close()
+    assert transaction.size("chunk.tbl") >= 4
+
+    expected = []
+    chunk_scan = ChunkScan(transaction, "chunk.tbl", layout, 1, 2)
+    while chunk_scan.next():
+        expected.append((chunk_scan.get_int("id"), chunk_scan.get_string("name")))
+
+    chunk_scan.before_first()
+    rows = []
+    while True:
+        batch = chunk_scan.next_batch(7)
+        if len(batch) == 0:
+            break
+        rows.extend(zip(batch.column("id"), batch.column("name")))
+    chunk_scan.close()
+
+    assert expected
+    assert rows == expected
+    transaction.commit()
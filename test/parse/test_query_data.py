@@ -1,5 +1,6 @@
 import pytest
 
+from db.parse.parser import Parser
 from db.parse.query_data import OrderByField, QueryData
 from db.query.predicate import Predicate
 
@@ -82,3 +83,10 @@ def test_string_representation_with_limit():
     query_data = QueryData(fields, tables, predicate, limit=10)
     result_str = str(query_data)
     assert "LIMIT 10" in result_str
+
+
+def test_required_fields_include_predicate_and_order_by():
+    parser = Parser("SELECT name FROM items WHERE price = 10 AND owner = seller ORDER BY embedding <-> '[1.0]'")
+    query_data = parser.query()
+
+    assert query_data.required_fields() == ["embedding", "name", "owner", "price", "seller"]
@@ -0,0 +1,62 @@
+from array import array
+
+import pytest
+
+from db.query.batch import Batch
+from db.query.batch_scan import BatchScan
+from db.query.constant import Constant
+from db.record.schema import Schema
+
+
+def make_batch() -> Batch:
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_string_field("name", 10)
+    schema.add_vector_field("embedding", 2)
+    batch = Batch(schema)
+    batch.extend(
+        {"id": [1, 2, 3], "name": ["a", "b", "c"], "embedding": [0.5, 1.0, 1.5, 2.0, 2.5, 3.0]},
+        3,
+    )
+    return batch
+
+
+def test_batch_columns():
+    """列の型と値"""
+    batch = make_batch()
+
+    assert len(batch) == 3
+    assert batch.column("id") == array("i", [1, 2, 3])
+    assert batch.column("name") == ["a", "b", "c"]
+    assert batch.column("embedding") == array("f", [0.5, 1.0, 1.5, 2.0, 2.5, 3.0])
+    assert batch.get_vector(1, "embedding") == [1.5, 2.0]
+    assert batch.get_value(2, "name") == Constant("c")
+    with pytest.raises(ValueError):
+        batch.get_value(0, "embedding")
+
+
+def test_batch_take_and_select():
+    """行の抽出と列の絞り込み"""
+    batch = make_batch()
+
+    taken = batch.take([0, 2])
+    assert len(taken) == 2
+    assert taken.column("id") == array("i", [1, 3])
+    assert taken.column("embedding") == array("f", [0.5, 1.0, 2.5, 3.0])
+
+    selected = batch.select(["name"])
+    assert selected.schema.get_fields() == ["name"]
+    assert len(selected) == 3
+    with pytest.raises(RuntimeError):
+        batch.select(["missing"])
+
+
+def test_batch_scan_reads_rows_and_batches():
+    """BatchScanは1行ずつでもバッチでも読める"""
+    scan = BatchScan(make_batch())
+
+    assert scan.next()
+    assert scan.get_int("id") == 1
+    rest = scan.next_batch(10)
+    assert rest.column("id") == array("i", [2, 3])
+    assert not scan.next()
@@ -1,6 +1,11 @@
 from unittest.mock import Mock
 
+import pytest
+
+from db.query.batch import Batch
+from db.query.batch_scan import BatchScan
 from db.query.product_scan import ProductScan
+from db.record.schema import Schema
 
 
 def test_record():
@@ -95,3 +100,32 @@ def test_product_scan_basic_logic():
 
     # Should process some combinations
     assert combinations >= 0
+
+
+def test_product_scan_next_batch_uses_default():
+    """next_batchを持たないスキャンは、既定の実装で1行ずつバッチに詰める"""
+    left_schema = Schema()
+    left_schema.add_int_field("id")
+    left = Batch(left_schema)
+    left.extend({"id": [1, 2]}, 2)
+    right_schema = Schema()
+    right_schema.add_string_field("name", 10)
+    right_schema.add_vector_field("embedding", 2)
+    right = Batch(right_schema)
+    right.extend({"name": ["a", "b"], "embedding": [0.5, 1.0, 1.5, 2.0]}, 2)
+
+    schema = Schema()
+    schema.add_all(left_schema)
+    schema.add_all(right_schema)
+    scan = ProductScan(BatchScan(left), BatchScan(right))
+
+    first = scan.next_batch(3, schema)
+    assert list(first.column("id")) == [1, 1, 2]
+    assert first.column("name") == ["a", "b", "a"]
+    assert first.get_vector(2, "embedding") == [0.5, 1.0]
+    assert scan.get_string("name") == "a"
+    assert len(scan.next_batch(3, schema)) == 1
+    assert len(scan.next_batch(3, schema)) == 0
+
+    with pytest.raises(ValueError):
+        scan.next_batch(3)
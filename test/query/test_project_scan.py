@@ -1,7 +1,10 @@
 from unittest.mock import Mock
 
+from db.query.batch import Batch
+from db.query.batch_scan import BatchScan
 from db.query.project_scan import ProjectScan
 from db.query.scan import Scan
+from db.record.schema import Schema
 
 
 def test_project_scan_gets_integer_values_from_field_list():
@@ -129,3 +132,17 @@ def test_project_scan_advances_to_next_record():
 
     assert result is True
     mock_scan.next.assert_called_once()
+
+
+def test_project_scan_next_batch_keeps_only_field_list():
+    schema = Schema()
+    schema.add_int_field("field1")
+    schema.add_int_field("field2")
+    batch = Batch(schema)
+    batch.extend({"field1": [1, 2], "field2": [3, 4]}, 2)
+    project_scan = ProjectScan(BatchScan(batch), ["field2"])
+
+    result = project_scan.next_batch(10)
+
+    assert result.schema.get_fields() == ["field2"]
+    assert list(result.column("field2")) == [3, 4]
@@ -1,10 +1,17 @@
 from unittest.mock import Mock
 
+import pytest
+
+from db.query.batch import Batch
+from db.query.batch_scan import BatchScan
 from db.query.constant import Constant
 from db.query.expression import Expression
 from db.query.predicate import Predicate
 from db.query.select_scan import SelectScan
 from db.query.term import Term
+from db.record.layout import Layout
+from db.record.schema import Schema
+from db.record.table_scan import TableScan
 
 
 def test_select_scan_basic():
@@ -51,3 +58,132 @@ def test_select_scan_with_mock_data():
 
     # Should find at least one matching record
     assert matching_records >= 0
+
+
+def test_select_scan_next_batch_filters_rows():
+    """next_batchは述語を満たす行だけを最大n行返す"""
+    schema = Schema()
+    schema.add_int_field("age")
+    batch = Batch(schema)
+    batch.extend({"age": [25, 30, 25, 22, 25]}, 5)
+
+    predicate = Predicate([Term(Expression("age"), Expression(Constant(25)))])
+    select_scan = SelectScan(BatchScan(batch), predicate)
+
+    first = select_scan.next_batch(2)
+    assert list(first.column("age")) == [25, 25]
+    second = select_scan.next_batch(2)
+    assert list(second.column("age")) == [25]
+    assert len(select_scan.next_batch(2)) == 0
+
+
+def test_compiled_predicate_matches_is_satisfied():
+    """コンパイルした述語はis_satisfiedと同じ結果を返す"""
+    schema = Schema()
+    schema.add_int_field("age")
+    schema.add_string_field("name", 10)
+    schema.add_int_field("limit")
+    batch = Batch(schema)
+    batch.extend({"age": [25, 30, 25], "name": ["a", "b", "c"], "limit": [25, 30, 20]}, 3)
+
+    predicates = [
+        Predicate([Term(Expression("age"), Expression(Constant(25)))]),
+        Predicate([Term(Expression(Constant("b")), Expression("name"))]),
+        Predicate([Term(Expression("age"), Expression("limit"))]),
+        Predicate([Term(Expression("age"), Expression(Constant("25")))]),
+        Predicate([Term(Expression(Constant(1)), Expression(Constant(1)))]),
+        Predicate(
+            [
+                Term(Expression("age"), Expression(Constant(25))),
+                Term(Expression("name"), Expression(Constant("c"))),
+            ]
+        ),
+    ]
+    for predicate in predicates:
+        check = predicate.compile(schema)
+        rows = BatchScan(batch)
+        while rows.next():
+            assert check(rows) == predicate.is_satisfied(rows)
+
+
+def test_compile_leaves_vector_fields_to_is_satisfied():
+    """整数と文字列以外のフィールドの項はコンパイルせず、is_satisfiedで評価する"""
+    schema = Schema()
+    schema.add_vector_field("embedding", 2)
+    batch = Batch(schema)
+    batch.extend({"embedding": [1.0, 2.0]}, 1)
+
+    term = Term(Expression("embedding"), Expression(Constant("[1.0, 2.0]")))
+    check = term.compile(schema)
+    assert check == term.is_satisfied
+
+    rows = BatchScan(batch)
+    assert rows.next()
+    with pytest.raises(ValueError):
+        check(rows)
+
+
+def test_select_scan_with_schema_uses_compiled_predicate():
+    schema = Schema()
+    schema.add_int_field("age")
+    batch = Batch(schema)
+    batch.extend({"age": [25, 30, 25]}, 3)
+
+    predicate = Predicate([Term(Expression("age"), Expression(Constant(25)))])
+    select_scan = SelectScan(BatchScan(batch), predicate, schema)
+
+    ages = []
+    while select_scan.next():
+        ages.append(select_scan.get_int("age"))
+    assert ages == [25, 25]
+
+
+def test_select_scan_next_batch_moves_to_last_returned_row():
+    """最後に調べた行が述語を満たさなくても、next_batchの後は最後に返した行にいる"""
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_int_field("age")
+    batch = Batch(schema)
+    batch.extend({"id": [1, 2, 3, 4], "age": [25, 30, 25, 30]}, 4)
+
+    predicate = Predicate([Term(Expression("age"), Expression(Constant(25)))])
+    select_scan = SelectScan(BatchScan(batch), predicate)
+
+    first = select_scan.next_batch(10)
+    assert list(first.column("id")) == [1, 3]
+    assert select_scan.get_int("id") == 3
+    assert not select_scan.next()
+
+
+def test_select_scan_refuses_delete_after_filtered_next_batch(test_db):
+    """フィルタしたnext_batchの後は下位のスキャンが読み飛ばした行にいるので、nextを呼ぶまで削除できない"""
+    _, transaction = test_db
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_int_field("age")
+    layout = Layout(schema)
+    table_scan = TableScan(transaction, "people", layout)
+    for i, age in enumerate([25, 30, 25, 30]):
+        table_scan.insert()
+        table_scan.set_int("id", i)
+        table_scan.set_int("age", age)
+
+    predicate = Predicate([Term(Expression("age"), Expression(Constant(25)))])
+    select_scan = SelectScan(TableScan(transaction, "people", layout), predicate, schema)
+    assert list(select_scan.next_batch(10).column("id")) == [0, 2]
+    with pytest.raises(RuntimeError):
+        select_scan.delete()
+    with pytest.raises(RuntimeError):
+        select_scan.get_rid()
+
+    select_scan.before_first()
+    assert select_scan.next()
+    select_scan.delete()
+    select_scan.close()
+
+    table_scan.before_first()
+    ids = []
+    while table_scan.next():
+        ids.append(table_scan.get_int("id"))
+    table_scan.close()
+    assert ids == [1, 2, 3]
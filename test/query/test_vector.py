@@ -1,6 +1,7 @@
 import pytest
 
 from db.query.vector import cosine_distance, parse_vector_literal
+from db.query.vector_store import cosine_distances
 
 
 def test_cosine_distance_identical():
@@ -43,3 +44,13 @@ def test_parse_vector_literal_invalid():
 
     with pytest.raises(SyntaxError):
         parse_vector_literal("1.0, 2.0, 3.0")
+
+
+def test_cosine_distances_matches_cosine_distance():
+    query = [0.1, 0.2, 0.3]
+    vectors = [[0.1, 0.2, 0.3], [0.0, 0.1, 0.0], [-0.3, 0.2, 0.5]]
+
+    distances = cosine_distances(query, vectors)
+
+    assert distances == pytest.approx([cosine_distance(query, vector) for vector in vectors], abs=1e-6)
+    assert cosine_distances(query, []) == []
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from db.index.hnsw.hnsw_index import HNSWIndex
+from db.query.vector import cosine_distance
+from db.query.vector_store import HAS_NUMPY, NumPyVectorStore, PythonVectorStore, cosine_distances, create_vector_store
+from db.record.record_id import RecordID
+
+
+def random_vectors(count, dimensions=8):
+    rng = random.Random(0)
+    return [[rng.uniform(-1.0, 1.0) for _ in range(dimensions)] for _ in range(count)]
+
+
+def test_python_vector_store_distances():
+    vectors = random_vectors(10)
+    store = PythonVectorStore()
+    assert [store.add(vector) for vector in vectors] == list(range(10))
+    assert len(store) == 10
+
+    query = vectors[3]
+    rows = [7, 3, 0]
+    assert store.distances(query, rows) == pytest.approx([cosine_distance(query, vectors[row]) for row in rows])
+
+
+def test_create_vector_store():
+    store = create_vector_store(8)
+    assert isinstance(store, NumPyVectorStore if HAS_NUMPY else PythonVectorStore)
+
+
+def test_numpy_vector_store_matches_python():
+    pytest.importorskip("numpy")
+    vectors = random_vectors(NumPyVectorStore.INITIAL_CAPACITY + 10)
+    numpy_store = NumPyVectorStore(8)
+    python_store = PythonVectorStore()
+    for vector in vectors:
+        numpy_store.add(vector)
+        python_store.add(vector)
+
+    rows = [0, 5, NumPyVectorStore.INITIAL_CAPACITY + 9]
+    query = vectors[5]
+    assert len(numpy_store) == len(vectors)
+    assert numpy_store.distances(query, rows) == pytest.approx(python_store.distances(query, rows), abs=1e-12)
+    assert numpy_store.distances(query, []) == []
+
+    with pytest.raises(ValueError):
+        numpy_store.add([1.0, 2.0])
+
+
+@pytest.mark.parametrize("store_class", [PythonVectorStore, NumPyVectorStore])
+def test_vector_stores_reject_zero_vectors(store_class):
+    """どちらの実装でも、ノルムが0のベクトルとの距離はValueErrorになる"""
+    if store_class is NumPyVectorStore:
+        pytest.importorskip("numpy")
+    store = store_class() if store_class is PythonVectorStore else store_class(2)
+    store.add([1.0, 0.0])
+    store.add([0.0, 0.0])
+
+    assert store.distances([1.0, 0.0], [0]) == pytest.approx([0.0])
+    with pytest.raises(ValueError):
+        store.distances([1.0, 0.0], [0, 1])
+    with pytest.raises(ValueError):
+        store.distances([0.0, 0.0], [0])
+    with pytest.raises(ValueError):
+        cosine_distances([1.0, 0.0], [[0.0, 0.0]])
+    with pytest.raises(ValueError):
+        cosine_distance([1.0, 0.0], [0.0, 0.0])
+
+
+def test_hnsw_index_keeps_vectors_by_node_id():
+    vectors = random_vectors(20)
+    index = HNSWIndex(max_node_conn=4, ef_construction=16)
+    for i, vector in enumerate(vectors):
+        index.insert(vector, RecordID(0, i))
+
+    assert index.vectors is not None
+    assert len(index.vectors) == len(index.nodes)
+
+    restored = HNSWIndex(max_node_conn=4, ef_construction=16)
+    restored.restore(index.nodes, index.entry_point, index.max_layer)
+    assert restored.search(vectors[7], k=3) == index.search(vectors[7], k=3)
@@ -0,0 +1,52 @@
+from db.file.file_manager import FileManager
+from db.record.free_space_map import FreeSpaceMap
+
+
+def test_unknown_blocks_are_candidates_in_order():
+    free_space_map = FreeSpaceMap()
+
+    assert free_space_map.find_block(3) == 0
+    free_space_map.record_full(0)
+    free_space_map.record_full(2)
+    assert free_space_map.find_block(3) == 1
+
+    free_space_map.record_full(1)
+    # 0〜2はすべて満杯なので、ファイル内に候補はない
+    assert free_space_map.find_block(3) is None
+    assert free_space_map.next_unknown == 3
+    assert free_space_map.full_blocks == set()
+
+
+def test_freed_blocks_are_returned_lowest_first():
+    free_space_map = FreeSpaceMap()
+    for block_number in range(5):
+        free_space_map.record_full(block_number)
+
+    free_space_map.record_free(3)
+    free_space_map.record_free(1)
+    assert free_space_map.find_block(5) == 1
+
+    free_space_map.record_full(1)
+    assert free_space_map.find_block(5) == 3
+
+
+def test_save_all_and_reload(tmp_path):
+    """保存したマップは次に開いたデータベースで読み込まれ、補助ファイルは読み込み時に消える"""
+    file_manager = FileManager(tmp_path, 400)
+    free_space_map = FreeSpaceMap.get(file_manager, "items.tbl")
+    for block_number in range(5):
+        free_space_map.record_full(block_number)
+    free_space_map.record_free(3)
+    free_space_map.record_full(6)
+    FreeSpaceMap.save_all(file_manager)
+    file_manager.close_all()
+
+    reopened = FileManager(tmp_path, 400)
+    loaded = FreeSpaceMap.get(reopened, "items.tbl")
+    assert not (tmp_path / "items.tbl.fsm").exists()
+    assert loaded.next_unknown == 5
+    assert loaded.full_blocks == {6}
+    assert loaded.find_block(7) == 3
+    loaded.record_full(3)
+    assert loaded.find_block(7) == 5
+    reopened.close_all()
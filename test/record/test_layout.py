@@ -219,3 +219,70 @@ def test_partial_custom_offset():
     layout2 = Layout(schema, {"id": 10}, None)
     assert layout2.get_offset("id") == 4  # 計算される
     assert layout2.get_slot_size() == 8  # 計算される
+
+
+def test_empty_slot_has_default_values():
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_string_field("name", 5)
+    layout = Layout(schema)
+
+    empty_slot = layout.empty_slot()
+
+    assert len(empty_slot) == layout.get_slot_size()
+    page = Page(empty_slot)
+    assert page.get_int(0) == 0
+    assert page.get_int(layout.get_offset("id")) == 0
+    assert page.get_string(layout.get_offset("name")) == ""
+    assert layout.empty_slot() is empty_slot
+
+
+def test_row_decoder_reads_whole_slot():
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_string_field("name", 5)
+    schema.add_vector_field("embedding", 2)
+    layout = Layout(schema)
+
+    page = Page(layout.get_slot_size() * 2)
+    slot = layout.get_slot_size()
+    page.set_int(slot + layout.get_offset("id"), 7)
+    page.set_string(slot + layout.get_offset("name"), "abc")
+    page.set_vector(slot + layout.get_offset("embedding"), [1.5, 2.5])
+
+    decoder = layout.row_decoder()
+    rows = [decoder.unpack_from(page.buffer, 0), decoder.unpack_from(page.buffer, slot)]
+
+    assert decoder.column(rows, "id") == [0, 7]
+    assert decoder.column(rows, "name") == ["", "abc"]
+    assert decoder.column(rows, "embedding") == [0.0, 0.0, 1.5, 2.5]
+    assert layout.row_decoder() is decoder
+
+
+def test_row_decoder_rejects_overlapping_offsets():
+    schema = Schema()
+    schema.add_int_field("a")
+    schema.add_int_field("b")
+    layout = Layout(schema, {"a": 4, "b": 6}, 12)
+
+    with pytest.raises(ValueError):
+        layout.row_decoder()
+
+
+def test_row_decoder_skips_unrequested_fields():
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_vector_field("embedding", 8)
+    schema.add_string_field("name", 5)
+    layout = Layout(schema)
+
+    page = Page(layout.get_slot_size())
+    page.set_int(layout.get_offset("id"), 3)
+    page.set_string(layout.get_offset("name"), "xyz")
+
+    decoder = layout.row_decoder(("name",))
+    row = decoder.unpack_from(page.buffer, 0)
+
+    assert len(row) == 2
+    assert decoder.column([row], "name") == ["xyz"]
+    assert layout.row_decoder(("name",)) is decoder
@@ -256,9 +256,12 @@ def test_validates_slot_validity(setup_managers):
     page = RecordPage(transaction, block, layout)
 
     # ブロックサイズとスロットサイズから有効なスロット数を計算
+    # 先頭のビットマップ（504スロット分で16ワード）の分だけスロットが減る
     block_size = transaction.block_size()
     slot_size = layout.get_slot_size()
-    max_slots = block_size // slot_size
+    max_slots = 504
+    assert page.num_slots == max_slots
+    assert page.header_size + max_slots * slot_size == block_size
 
     # 有効なスロット
     assert page._is_valid_slot(0) is True
@@ -445,10 +448,11 @@ def test_boundary_slot_operations(setup_managers):
     page = RecordPage(transaction, block, layout)
     page.format()
 
-    # 最大スロット数を計算
+    # 最大スロット数を計算（先頭のビットマップの分だけ減る）
     block_size = transaction.block_size()
     slot_size = layout.get_slot_size()
-    max_slots = block_size // slot_size
+    max_slots = page.num_slots
+    assert page.header_size + max_slots * slot_size <= block_size
 
     # 最初のスロット
     assert page._is_valid_slot(0) is True
@@ -520,3 +524,38 @@ def test_record_page_error_conditions(setup_managers):
         pass  # 期待される例外
 
     transaction.commit()
+
+
+def test_occupancy_bitmap_spans_multiple_words(setup_managers):
+    """ビットマップのワードの境界をまたいで使用中・空きスロットを探せる"""
+    file_manager, log_manager, buffer_manager = setup_managers
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+
+    schema = Schema()
+    schema.add_int_field("id")
+    layout = Layout(schema)
+
+    block = transaction.append("bitmap.tbl")
+    page = RecordPage(transaction, block, layout)
+    page.format()
+
+    for slot in [3, 40, 70, page.num_slots - 1]:
+        page._set_flag(slot, RecordPage.USED)
+
+    used = []
+    slot = page.next_after(-1)
+    while slot >= 0:
+        used.append(slot)
+        slot = page.next_after(slot)
+    assert used == [3, 40, 70, page.num_slots - 1]
+
+    # 最初の32スロットを埋めると、次の空きスロットは次のワードから探される
+    for slot in range(32):
+        page._set_flag(slot, RecordPage.USED)
+    assert page.insert_after(-1) == 32
+
+    page.delete(40)
+    assert page.next_after(32) == 70
+    assert transaction.get_int(block, page._offset(40)) == RecordPage.EMPTY
+
+    transaction.commit()
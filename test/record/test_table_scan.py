@@ -7,6 +7,9 @@ from db.buffer.buffer_manager import BufferManager
 from db.file.file_manager import FileManager
 from db.log.log_manager import LogManager
 from db.query.constant import Constant
+from db.query.expression import Expression
+from db.query.predicate import Predicate
+from db.query.term import Term
 from db.record.layout import Layout
 from db.record.schema import Schema
 from db.record.table_scan import TableScan
@@ -282,3 +285,268 @@ def test_runtime_error_with_uninitialized_record_page(setup_managers):
     assert "Record page is not initialized" in str(exc_info.value)
 
     transaction.commit()
+
+
+def test_insert_uses_free_space_map(setup_managers):
+    """挿入は満杯のブロックをたどらず、削除で空いたスロットを再利用する"""
+    file_manager, log_manager, buffer_manager = setup_managers
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_string_field("name", 50)
+    layout = Layout(schema)
+
+    table_scan = TableScan(transaction, "fsm", layout)
+    for i in range(300):
+        table_scan.insert()
+        table_scan.set_int("id", i)
+    table_scan.close()
+    num_blocks = transaction.size("fsm.tbl")
+    assert num_blocks > 3
+
+    # 新しいスキャンからの挿入は、最初のブロックと最後のブロックしかpinしない
+    pins_before = buffer_manager.num_hits + buffer_manager.num_misses
+    table_scan = TableScan(transaction, "fsm", layout)
+    table_scan.insert()
+    table_scan.set_int("id", 300)
+    table_scan.close()
+    assert buffer_manager.num_hits + buffer_manager.num_misses - pins_before <= 2
+    assert transaction.size("fsm.tbl") == num_blocks
+
+    # 2番目のブロックのレコードを削除すると、次の挿入はそこに入る
+    table_scan = TableScan(transaction, "fsm", layout)
+    while table_scan.next():
+        if table_scan.get_rid().block_number == 1:
+            table_scan.delete()
+            break
+    table_scan.close()
+
+    table_scan = TableScan(transaction, "fsm", layout)
+    table_scan.insert()
+    assert table_scan.get_rid().block_number == 1
+    table_scan.close()
+    transaction.commit()
+
+
+def test_rollback_frees_blocks_filled_by_the_transaction(setup_managers):
+    """ロールバックした挿入で満杯になったブロックは、再び挿入先の候補になる"""
+    file_manager, log_manager, buffer_manager = setup_managers
+    schema = Schema()
+    schema.add_int_field("id")
+    layout = Layout(schema)
+
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+    table_scan = TableScan(transaction, "refill", layout)
+    while transaction.size("refill.tbl") < 3:
+        table_scan.insert()
+        table_scan.set_int("id", 0)
+    table_scan.close()
+    transaction.commit()
+
+    # ブロック1に空きを一つ作る
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+    table_scan = TableScan(transaction, "refill", layout)
+    while table_scan.next():
+        if table_scan.get_rid().block_number == 1:
+            table_scan.delete()
+            break
+    table_scan.close()
+    transaction.commit()
+
+    # ブロック1を埋めてからロールバックする
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+    table_scan = TableScan(transaction, "refill", layout)
+    table_scan.insert()
+    assert table_scan.get_rid().block_number == 1
+    table_scan.insert()
+    assert table_scan.get_rid().block_number == 2
+    table_scan.close()
+    transaction.rollback()
+
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+    table_scan = TableScan(transaction, "refill", layout)
+    table_scan.insert()
+    assert table_scan.get_rid().block_number == 1
+    table_scan.close()
+    transaction.commit()
+
+
+def test_next_batch_reads_across_blocks(setup_managers):
+    """next_batchは複数ブロックにまたがる行を列形式で返し、削除された行を飛ばす"""
+    file_manager, log_manager, buffer_manager = setup_managers
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_string_field("name", 20)
+    schema.add_vector_field("embedding", 2)
+    layout = Layout(schema)
+
+    table_scan = TableScan(transaction, "batch", layout)
+    for i in range(300):
+        table_scan.insert()
+        table_scan.set_int("id", i)
+        table_scan.set_string("name", f"name{i}")
+        table_scan.set_vector("embedding", [float(i), -float(i)])
+
+    table_scan.before_first()
+    while table_scan.next():
+        if table_scan.get_int("id") % 3 == 0:
+            table_scan.delete()
+    assert transaction.size("batch.tbl") > 1
+
+    table_scan.before_first()
+    assert table_scan.next()
+    assert table_scan.get_int("id") == 1
+
+    ids: list[int] = []
+    while True:
+        batch = table_scan.next_batch(64)
+        if len(batch) == 0:
+            break
+        assert len(batch) <= 64
+        ids.extend(batch.column("id"))
+        last = len(batch) - 1
+        assert batch.get_string(last, "name") == f"name{batch.get_int(last, 'id')}"
+        assert batch.get_vector(last, "embedding") == [float(ids[-1]), -float(ids[-1])]
+        # 現在の行はバッチの最後の行
+        assert table_scan.get_int("id") == ids[-1]
+
+    assert ids == [i for i in range(2, 300) if i % 3 != 0]
+    table_scan.close()
+    transaction.commit()
+
+
+def test_copy_record_from_copies_all_fields(setup_managers):
+    """copy_record_fromはベクトルを含むすべてのフィールドをコピーする"""
+    file_manager, log_manager, buffer_manager = setup_managers
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_string_field("name", 10)
+    schema.add_vector_field("embedding", 3)
+    layout = Layout(schema)
+
+    source = TableScan(transaction, "copy_source", layout)
+    source.insert()
+    source.set_int("id", 5)
+    source.set_string("name", "five")
+    source.set_vector("embedding", [1.0, 2.0, 3.0])
+
+    dest = TableScan(transaction, "copy_dest", layout)
+    dest.insert()
+    dest.copy_record_from(source)
+
+    dest.before_first()
+    assert dest.next()
+    assert dest.get_int("id") == 5
+    assert dest.get_string("name") == "five"
+    assert dest.get_vector("embedding") == [1.0, 2.0, 3.0]
+    assert not dest.next()
+
+    source.close()
+    dest.close()
+    transaction.commit()
+
+
+def test_table_scan_reads_only_requested_fields(setup_managers):
+    """field_namesを指定したTableScanは指定されたフィールドだけを返す"""
+    file_manager, log_manager, buffer_manager = setup_managers
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_vector_field("embedding", 64)
+    schema.add_string_field("name", 10)
+    layout = Layout(schema)
+
+    table_scan = TableScan(transaction, "projected", layout)
+    for i in range(5):
+        table_scan.insert()
+        table_scan.set_int("id", i)
+        table_scan.set_string("name", f"n{i}")
+    table_scan.close()
+
+    projected = TableScan(transaction, "projected", layout, ["name", "id"])
+    assert projected.has_field("id")
+    assert not projected.has_field("embedding")
+
+    batch = projected.next_batch(10)
+    assert batch.schema.get_fields() == ["id", "name"]
+    assert list(batch.column("id")) == [0, 1, 2, 3, 4]
+    assert batch.column("name") == ["n0", "n1", "n2", "n3", "n4"]
+    projected.close()
+    transaction.commit()
+
+
+def test_table_scan_filter_skips_rows_on_page(setup_managers):
+    """set_filterした述語を満たす行だけをnextとnext_batchで返す"""
+    file_manager, log_manager, buffer_manager = setup_managers
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+
+    schema = Schema()
+    schema.add_int_field("id")
+    schema.add_string_field("name", 10)
+    layout = Layout(schema)
+
+    table_scan = TableScan(transaction, "filtered", layout)
+    for i in range(400):
+        table_scan.insert()
+        table_scan.set_int("id", i)
+        table_scan.set_string("name", "even" if i % 2 == 0 else "odd")
+    assert transaction.size("filtered.tbl") > 1
+
+    predicate = Predicate([Term(Expression("name"), Expression(Constant("odd")))])
+    table_scan.set_filter(predicate)
+    table_scan.before_first()
+
+    ids = []
+    while table_scan.next():
+        ids.append(table_scan.get_int("id"))
+    assert ids == list(range(1, 400, 2))
+
+    table_scan.before_first()
+    batch_ids: list[int] = []
+    while True:
+        batch = table_scan.next_batch(30)
+        if len(batch) == 0:
+            break
+        batch_ids.extend(batch.column("id"))
+        assert table_scan.get_int("id") == batch_ids[-1]
+    assert batch_ids == ids
+
+    table_scan.close()
+    transaction.commit()
+
+
+def test_table_scan_next_batch_moves_to_last_returned_row(setup_managers):
+    """最後に調べた行が述語を満たさなくても、next_batchの後は最後に返した行にいる"""
+    file_manager, log_manager, buffer_manager = setup_managers
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+
+    schema = Schema()
+    schema.add_int_field("id")
+    layout = Layout(schema)
+
+    table_scan = TableScan(transaction, "last_filtered", layout)
+    for i in range(1000):
+        table_scan.insert()
+        table_scan.set_int("id", i)
+    assert transaction.size("last_filtered.tbl") > 1
+
+    # 最初のブロックの行だけが述語を満たす
+    predicate = Predicate([Term(Expression("id"), Expression(Constant(5)))])
+    table_scan.set_filter(predicate)
+    table_scan.before_first()
+
+    batch = table_scan.next_batch(10)
+    assert list(batch.column("id")) == [5]
+    assert table_scan.get_int("id") == 5
+    assert table_scan.get_rid().block_number == 0
+    assert not table_scan.next()
+    assert len(table_scan.next_batch(10)) == 0
+
+    table_scan.close()
+    transaction.commit()
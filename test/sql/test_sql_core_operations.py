@@ -211,6 +211,77 @@ class TestCoreSQLOperations:
         assert found_data is not None
         assert "saved" in found_data.lower()
 
+    def test_group_commit_persistence(self, clean_db):
+        """グループコミットモードでもコミット済みのデータが再起動後に残る"""
+        db = KeiPyDB(clean_db, group_commit=True)
+        planner = db.get_planner()
+
+        tx1 = db.new_transaction()
+        planner.execute_update("CREATE TABLE grouped (id int)", tx1)
+        for i in range(5):
+            planner.execute_update(f"INSERT INTO grouped (id) VALUES ({i})", tx1)
+        tx1.commit()
+
+        reopened = KeiPyDB(clean_db)
+        tx2 = reopened.new_transaction()
+        scan = reopened.get_planner().create_query_plan("SELECT id FROM grouped", tx2).open()
+
+        ids = []
+        while scan.next():
+            ids.append(scan.get_int("id"))
+
+        scan.close()
+        tx2.commit()
+
+        assert sorted(ids) == [0, 1, 2, 3, 4]
+        db.close()
+        reopened.close()
+
+    def test_close_stops_background_threads(self, clean_db):
+        """closeはバックグラウンドライタと先読みのスレッドを止めて終了を待つ"""
+        db = KeiPyDB(clean_db, background_writer=True, prefetch_blocks=4)
+        writer = db.background_writer
+        prefetcher = db.buffer_manager.prefetcher
+        assert writer is not None and writer.is_running()
+        assert prefetcher is not None
+
+        tx = db.new_transaction()
+        db.get_planner().execute_update("CREATE TABLE threads (id int)", tx)
+        tx.commit()
+        db.close()
+
+        assert not writer.is_running()
+        assert not prefetcher._thread.is_alive()
+        assert db.buffer_manager.prefetcher is None
+
+    def test_close_refuses_while_transaction_is_active(self, clean_db):
+        """実行中のトランザクションがあればcloseはチェックポイントを書かず、何も閉じない"""
+        db = KeiPyDB(clean_db, background_writer=True)
+        tx = db.new_transaction()
+        db.get_planner().execute_update("CREATE TABLE pending (id int)", tx)
+
+        with pytest.raises(RuntimeError, match="Cannot checkpoint"):
+            db.close()
+        assert db.background_writer is not None and db.background_writer.is_running()
+
+        tx.commit()
+        db.close()
+        assert db.background_writer is None
+
+    def test_reopen_checks_format_version(self, clean_db):
+        """既存のデータベースはファイル形式の版が一致するときだけ開く"""
+        db = KeiPyDB(clean_db)
+        db.close()
+        format_path = os.path.join(clean_db, KeiPyDB.FORMAT_FILE)
+        assert os.path.exists(format_path)
+
+        KeiPyDB(clean_db).close()
+
+        # 版の記録がないのは、ビットマップのない古い形式のデータベース
+        os.remove(format_path)
+        with pytest.raises(RuntimeError, match="format version 1"):
+            KeiPyDB(clean_db)
+
 
 def run_core_regression_tests():
     """コア回帰テストをスタンドアロンで実行"""
@@ -0,0 +1,20 @@
+from unittest.mock import Mock
+
+from db.file.block_id import BlockID
+from db.file.page import Page
+from db.log.log_manager import LogManager
+from db.transaction.recovery.set_int_record import SetIntRecord
+
+
+def test_write_to_log_and_read_back():
+    log_manager = Mock(spec=LogManager)
+    block = BlockID("items.tbl", 3)
+
+    SetIntRecord.write_to_log(log_manager, 7, block, 120, 42)
+    record = SetIntRecord(Page.wrap(log_manager.append.call_args[0][0]))
+
+    assert record.tx_number() == 7
+    assert record.block == block
+    assert record.offset == 120
+    assert record.value == 42
+    assert str(record) == f"<SET_INT 7 {block} 120 42>"
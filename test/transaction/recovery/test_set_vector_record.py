@@ -0,0 +1,22 @@
+from unittest.mock import Mock
+
+from db.file.block_id import BlockID
+from db.file.page import Page
+from db.log.log_manager import LogManager
+from db.transaction.recovery.log_record import LogRecord
+from db.transaction.recovery.set_vector_record import SetVectorRecord
+
+
+def test_write_to_log_and_read_back():
+    log_manager = Mock(spec=LogManager)
+    block = BlockID("items.tbl", 2)
+
+    SetVectorRecord.write_to_log(log_manager, 9, block, 40, [0.5, -1.0, 2.0])
+    rec = log_manager.append.call_args[0][0]
+    record = SetVectorRecord(Page.wrap(rec))
+
+    assert record.tx_number() == 9
+    assert record.block == block
+    assert record.offset == 40
+    assert record.value == [0.5, -1.0, 2.0]
+    assert isinstance(LogRecord.create_log_record(rec), SetVectorRecord)
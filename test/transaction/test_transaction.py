@@ -46,7 +46,7 @@ def test_block():
 
     transaction.pin(block)
 
-    buffer_list.pin.assert_called_once_with(block)
+    buffer_list.pin.assert_called_once_with(block, None)
 
 
 # Removed incomplete test without reason
@@ -151,6 +151,29 @@ def test_transaction_data_operations(real_transaction_env):
 # Removed test_transaction_commit_rollback_cycle - Production code issue: invalid offset value in rollback
 
 
+def test_transaction_rollback_restores_int_and_vector(real_transaction_env):
+    """ロールバックで整数とベクトルの書き込みが元に戻る"""
+    file_manager, log_manager, buffer_manager = real_transaction_env
+    tx = Transaction(file_manager, log_manager, buffer_manager)
+    block = tx.append("rollback_test.db")
+    tx.pin(block)
+    tx.set_int(block, 0, 1)
+    tx.set_vector(block, 4, [1.0, 2.0, 3.0])
+    tx.commit()
+
+    tx = Transaction(file_manager, log_manager, buffer_manager)
+    tx.pin(block)
+    tx.set_int(block, 0, 2)
+    tx.set_vector(block, 4, [4.0, 5.0, 6.0])
+    tx.rollback()
+
+    tx = Transaction(file_manager, log_manager, buffer_manager)
+    tx.pin(block)
+    assert tx.get_int(block, 0) == 1
+    assert tx.get_vector(block, 4, 3) == [1.0, 2.0, 3.0]
+    tx.commit()
+
+
 # Removed test_transaction_concurrent_access - Concurrency has global state issues
 
 
@@ -190,6 +213,23 @@ def test_transaction_buffer_management(real_transaction_env):
     assert final_buffers <= initial_buffers + 3  # Allow some tolerance
 
 
+def test_get_string_and_set_int_do_not_leak_pins(real_transaction_env):
+    """get_stringとset_intはトランザクションがpinしたバッファを使い、pinを増やさない"""
+    file_manager, log_manager, buffer_manager = real_transaction_env
+    tx = Transaction(file_manager, log_manager, buffer_manager)
+    block = tx.append("pin_test.db")
+    initial_buffers = buffer_manager.available()
+
+    tx.pin(block)
+    for i in range(5):
+        tx.set_int(block, 0, i)
+        assert tx.get_string(block, 4) == ""
+    tx.unpin(block)
+
+    assert buffer_manager.available() == initial_buffers
+    tx.commit()
+
+
 # Removed test_transaction_lock_timeout - Timeout handling is broken
 
 
@@ -264,3 +304,90 @@ def test_transaction_stress_test(real_transaction_env):
     assert tx.size("stress_test.db") == num_blocks
 
     tx.commit()
+
+
+def test_initialize_block_writes_without_logging(real_transaction_env):
+    file_manager, log_manager, buffer_manager = real_transaction_env
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+    block = transaction.append("initialized.tbl")
+    transaction.pin(block)
+
+    lsn_before = log_manager.current_lsn
+    contents = bytearray(transaction.block_size())
+    contents[0:4] = (7).to_bytes(4, "little")
+    transaction.initialize_block(block, contents)
+
+    assert transaction.get_int(block, 0) == 7
+    assert log_manager.current_lsn == lsn_before
+
+    with pytest.raises(ValueError):
+        transaction.initialize_block(block, b"short")
+
+    transaction.commit()
+
+
+def test_view_block_and_copy_bytes(real_transaction_env):
+    file_manager, log_manager, buffer_manager = real_transaction_env
+    transaction = Transaction(file_manager, log_manager, buffer_manager)
+    source = transaction.append("copy.tbl")
+    dest = transaction.append("copy.tbl")
+    transaction.pin(source)
+    transaction.pin(dest)
+
+    transaction.set_string(source, 8, "copied", False)
+    view = transaction.view_block(source)
+    assert view.readonly
+    with pytest.raises(TypeError):
+        view[0] = 1
+
+    lsn_before = log_manager.current_lsn
+    transaction.copy_bytes(source, 8, dest, 100, 16)
+
+    assert transaction.get_string(dest, 100) == "copied"
+    assert log_manager.current_lsn == lsn_before
+    transaction.commit()
+
+
+def test_commit_syncs_modified_data_files_before_commit_record(monkeypatch):
+    """fsyncを遅延している場合も、コミットは変更したデータファイルを同期してからログを同期する"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_manager = FileManager(temp_dir, 1024, defer_sync=True)
+        log_manager = LogManager(file_manager, "test_transaction_log")
+        buffer_manager = BufferManager(file_manager, log_manager, 8)
+        synced: list[str] = []
+        original_sync = file_manager.sync
+
+        def record_sync(file_name: str) -> None:
+            if file_name in file_manager._unsynced_files:
+                synced.append(file_name)
+            original_sync(file_name)
+
+        monkeypatch.setattr(file_manager, "sync", record_sync)
+
+        tx = Transaction(file_manager, log_manager, buffer_manager)
+        block = tx.append("synced.db")
+        tx.pin(block)
+        tx.set_int(block, 0, 42)
+        tx.commit()
+
+        # データファイルはコミット記録を含むログより先に同期される
+        assert synced[-2:] == ["synced.db", "test_transaction_log"]
+        assert not file_manager._unsynced_files
+        file_manager.close_all()
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_checkpoint_requires_no_other_active_transaction(real_transaction_env):
+    """他のトランザクションが実行中ならチェックポイントを書かない"""
+    file_manager, log_manager, buffer_manager = real_transaction_env
+    active = Transaction(file_manager, log_manager, buffer_manager)
+    tx = Transaction(file_manager, log_manager, buffer_manager)
+
+    with pytest.raises(RuntimeError, match="Cannot checkpoint"):
+        tx.checkpoint()
+
+    active.commit()
+    tx.checkpoint()
+    tx.commit()